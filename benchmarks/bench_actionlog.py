@@ -0,0 +1,106 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Throughput of the action log synced every batch records (and at the
+# end of each hand, which bounds the records of a group). The
+# records of tables of bots are collected first, then appended to a
+# log for each batch size, so that the cost of the log is measured
+# apart from the cost of the hands, which is shown for comparison.
+# The log is written in directory (a temporary directory by
+# default), which must be on the disk to measure: fsync is free on a
+# tmpfs. The time to recover the tables from the log ends the run.
+#
+#   python benchmarks/bench_actionlog.py [hands] [directory]
+#
+import sys, os, shutil, tempfile
+from os import path
+from timeit import default_timer
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine import pokeractionlog
+from pokerengine.pokersimulator import PokerTableSimulator
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+TABLES = 4
+BATCHES = (1, 8, 64, 512)
+
+class PokerRecordLog(pokeractionlog.PokerActionLog):
+    """Keeps the records in memory."""
+
+    def __init__(self, path):
+        pokeractionlog.PokerActionLog.__init__(self, path)
+        self.records = []
+
+    def append(self, game_id, kind, value):
+        if kind == pokeractionlog.DECK:
+            #
+            # the cards are dealt from the deck afterwards
+            #
+            (time, deck) = value
+            value = (time, deck[:])
+        self.records.append((game_id, kind, value))
+
+def play_tables(hands, log):
+    tables = []
+    for index in xrange(TABLES):
+        simulator = PokerTableSimulator("holdem", "1-2_20-200_limit", CONF_DIRS, players = 6, seed = index + 1)
+        simulator.game.id = index + 1
+        log.attach(simulator.game)
+        tables.append(simulator)
+    start = default_timer()
+    for hand in xrange(hands):
+        for simulator in tables:
+            simulator.play(1)
+    return default_timer() - start
+
+def run(hands, directory):
+    recorder = PokerRecordLog(path.join(directory, "records.log"))
+    elapsed = play_tables(hands, recorder)
+    records = recorder.records
+    hand = elapsed / (TABLES * hands)
+    print "%d tables of 6 bots: %d records, %.1f records per hand, %.0f us per hand" % (TABLES, len(records), len(records) / float(TABLES * hands), hand * 1e6)
+    for batch in BATCHES:
+        log_path = path.join(directory, "actions.%d.log" % batch)
+        if path.exists(log_path):
+            os.unlink(log_path)
+        log = pokeractionlog.PokerActionLog(log_path, batch = batch)
+        start = default_timer()
+        for record in records:
+            log.append(*record)
+        log.sync()
+        elapsed = default_timer() - start
+        print "batch %4d: %8.0f records/s, %6.1f us per record, %6d fsync, %5.1f%% of the time of a hand" % (
+            batch, len(records) / elapsed, elapsed / len(records) * 1e6, log.syncs,
+            elapsed / (TABLES * hands) / hand * 100
+        )
+        log.close()
+    print "%d bytes per hand" % (path.getsize(log_path) / (TABLES * hands))
+    start = default_timer()
+    games = pokeractionlog.recover(log_path, CONF_DIRS)
+    print "recover %d tables: %.0f us per hand replayed" % (len(games), (default_timer() - start) * 1e6 / (TABLES * hands))
+
+if __name__ == '__main__':
+    hands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    if len(sys.argv) > 2:
+        run(hands, sys.argv[2])
+    else:
+        directory = tempfile.mkdtemp()
+        try:
+            run(hands, directory)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,69 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Time per hand of a table of bots when a slow consumer (a write
+# taking delay seconds, whatever the number of events written) is
+# given the events of the table: called for every event, called for
+# the actions of the players only, or fed by a PokerEventQueue
+# running in its own thread.
+#
+#   python benchmarks/bench_dispatch.py [hands] [delay]
+#
+import sys, time
+from os import path
+from timeit import default_timer
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine.pokerdispatch import PokerEventQueue
+from pokerengine.pokersimulator import PokerTableSimulator, ACTIONS
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+
+def play(hands, register):
+    simulator = PokerTableSimulator("holdem", "1-2_20-200_limit", CONF_DIRS, players = 6, seed = 1)
+    simulator.game.log_debug = False
+    register(simulator.game)
+    start = default_timer()
+    simulator.play(hands)
+    return (default_timer() - start) / hands
+
+def run(hands, delay):
+    counts = {'events': 0}
+    def write(*args):
+        counts['events'] += 1
+        time.sleep(delay)
+    base = play(hands, lambda game: None)
+    print "no consumer: %8.0f us per hand" % (base * 1e6)
+    every = play(hands, lambda game: game.registerCallback(write))
+    print "every event: %8.0f us per hand (%d events per hand)" % (every * 1e6, counts['events'] / hands)
+    counts['events'] = 0
+    actions = play(hands, lambda game: game.registerCallback(write, ACTIONS))
+    print "actions:     %8.0f us per hand (%d events per hand)" % (actions * 1e6, counts['events'] / hands)
+    queue = PokerEventQueue(lambda batch: time.sleep(delay), size = 4096, batch = 64)
+    queue.start()
+    queued = play(hands, lambda game: game.registerCallback(queue, ACTIONS))
+    queue.stop()
+    stats = queue.stats()
+    print "queued:      %8.0f us per hand (%d batches of %.1f events, %d waits)" % (
+        queued * 1e6, stats['batches'], stats['dispatched'] / float(stats['batches'] or 1), stats['waits']
+    )
+
+if __name__ == '__main__':
+    hands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0002
+    run(hands, delay)
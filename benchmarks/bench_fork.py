@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Forks per second of a game in the middle of a hand, compared to a
+# deepcopy of the game, and rollouts per second (fork and play the
+# rest of the hand).
+#
+#   python benchmarks/bench_fork.py [forks]
+#
+import sys, time
+from os import path
+from copy import deepcopy
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from bench_suite import create_table, call_check, play
+
+def game_on_the_flop(players):
+    game = create_table(players = players)
+    game.beginTurn(1)
+    while game.isRunning() and game.state != "flop":
+        call_check(game, game.getSerialInPosition())
+    return game
+
+def measure(function, count):
+    start = time.time()
+    for i in xrange(count):
+        function()
+    return (time.time() - start) / count
+
+def rollout(game):
+    other = game.fork(history = False)
+    play(other, lambda game, serial, action: call_check(game, serial))
+
+def run(count):
+    for players in (2, 6, 10):
+        game = game_on_the_flop(players)
+        try:
+            copy = measure(lambda: deepcopy(game), max(1, count / 20))
+            copy = "deepcopy %8.0f/s" % (1 / copy)
+        except Exception, e:
+            copy = "deepcopy fails (%s)" % e.__class__.__name__
+        fork = measure(lambda: game.fork(), count)
+        fork_without_history = measure(lambda: game.fork(history = False), count)
+        rollouts = measure(lambda: rollout(game), max(1, count / 10))
+        print "%2d players: %s  fork %8.0f/s  fork without history %8.0f/s  rollouts %6.0f/s" % (
+            players, copy, 1 / fork, 1 / fork_without_history, 1 / rollouts
+        )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Size and encoding / decoding time of the turn histories of hands
+# played by bots, with the pokerhistory codec and with cPickle.
+#
+#   python benchmarks/bench_historycodec.py [hands]
+#
+import sys, time, cPickle
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine.pokergame import PokerGameServer
+from pokerengine.pokersimulator import PokerTableSimulator
+from pokerengine import pokerhistory
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+
+def histories(variant, betting_structure, hands):
+    simulator = PokerTableSimulator(variant, betting_structure, CONF_DIRS, players = 6)
+    result = []
+    for i in xrange(hands):
+        simulator.play(1)
+        result.append(simulator.game.turn_history[:])
+    return result
+
+def measure(encode, decode, histories):
+    start = time.time()
+    encoded = [encode(history) for history in histories]
+    encode_time = time.time() - start
+    start = time.time()
+    decoded = [decode(data) for data in encoded]
+    decode_time = time.time() - start
+    if decoded != histories:
+        raise AssertionError("%s does not round trip" % encode.__module__)
+    size = sum(len(data) for data in encoded)
+    count = len(histories)
+    return (size / count, encode_time / count, decode_time / count)
+
+def pickle_dumps(history):
+    return cPickle.dumps(history, cPickle.HIGHEST_PROTOCOL)
+
+def run(hands):
+    PokerGameServer.log_debug = False
+    for (variant, betting_structure) in (("holdem", "1-2_20-200_limit"), ("omaha8", "2-4_40-400_no-limit"), ("7stud", "10-20_100-2000000_ante-limit")):
+        played = histories(variant, betting_structure, hands)
+        print "%s %s, %d hands" % (variant, betting_structure, len(played))
+        for (name, encode, decode) in (
+            ("cPickle", pickle_dumps, cPickle.loads),
+            ("pokerhistory", pokerhistory.dumps, pokerhistory.loads),
+        ):
+            (size, encode_time, decode_time) = measure(encode, decode, played)
+            print "  %-12s %6d bytes/hand  encode %8.1fus  decode %8.1fus" % (name, size, encode_time * 1000000, decode_time * 1000000)
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
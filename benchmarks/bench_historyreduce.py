@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Per call latency of PokerGame._historyReduce on blind/ante rounds
+# where players sit in and out many times, compared to the deepcopy
+# based implementation it replaced. The output of both is checked to
+# be identical.
+#
+#   python benchmarks/bench_historyreduce.py [calls]
+#
+import sys, time, random
+from os import path
+from copy import deepcopy
+from collections import defaultdict
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine.pokergame import PokerGame
+from pokerengine.pokercards import PokerCards
+
+def deepcopy_history_reduce(turn_history, money_map, in_place=False):
+    player_list_index = 7
+    serial2chips_index = 9
+
+    if not in_place: turn_history = deepcopy(turn_history)
+
+    game_event = None
+    player_list_new = None
+    #
+    # parse events
+    remove_indexes = []
+    sitouts_for_player = defaultdict(list)
+    sits_for_player = defaultdict(list)
+    index = 0
+    for index,event in enumerate(turn_history):
+        event_type = event[0]
+        if PokerGame._historyFinalEvent(event):
+            break
+        elif event_type == 'game':
+            game_event = turn_history[index]
+        elif event_type == 'sit':
+            remove_indexes.append(index)
+            sits_for_player[event[1]].append(index)
+        elif event_type in ('blind_request','ante_request'):
+            remove_indexes.append(index)
+        elif event_type in ('sitOut','wait_blind'):
+            remove_indexes.append(index)
+            sitouts_for_player[event[1]].append(index)
+        elif event_type == 'wait_for':
+            remove_indexes.append(index)
+            sitouts_for_player[event[1]].append(index)
+        elif event_type == 'player_list':
+            remove_indexes.append(index)
+            player_list_new = event[1]
+    #
+    # recreate playerlist.
+    # either use the player list, if their is some
+    if player_list_new is not None:
+        for serial in set(game_event[player_list_index]) - set(player_list_new):
+            del game_event[serial2chips_index][serial]
+        for serial in set(player_list_new) - set(game_event[player_list_index]):
+            game_event[serial2chips_index][serial] = money_map[serial]
+        game_event[player_list_index][:] = player_list_new
+        for index,event in enumerate(turn_history):
+            if event[0] == 'rebuy' and event[1] in player_list_new:
+                remove_indexes.append(index)
+    #
+    # recreate and mark positions if needed
+    for p_index in range(0,len(turn_history)):
+        if (
+            not turn_history[p_index][0] == "position" or
+            not turn_history[p_index][1] >= 0
+            or p_index in remove_indexes
+        ):
+            continue
+        event_type, position, serial = turn_history[p_index]
+        position_reduced = game_event[player_list_index].index(serial) \
+            if serial is not None and serial in game_event[player_list_index] \
+            else None
+        if position == position_reduced:
+            pass # no need to replace if it's already equal
+        elif position_reduced is not None and position >= 0:
+            turn_history[p_index] = (event_type, position_reduced, serial)
+        else:
+            remove_indexes.append(p_index)
+    #
+    # delete duplicate positions
+    pos_last = None
+    for p_index in range(0,len(turn_history)):
+        if (
+            not turn_history[p_index][0] == "position" or
+            not turn_history[p_index][1] >= 0
+            or p_index in remove_indexes
+        ):
+            continue
+        pos_current = turn_history[p_index]
+        if pos_current == pos_last:
+            remove_indexes.append(p_index)
+        else:
+            pos_last = pos_current
+    #
+    # delete all obsolete elements
+    for index in sorted(remove_indexes,reverse=True):
+        del turn_history[index]
+
+    if not in_place:
+        return turn_history
+
+
+def sit_in_out_history(players, events, seed = 1):
+    """Return (turn_history, money_map) for a hand where events sit,
+    sit out, player list, rebuy and blind events are recorded during the
+    blind/ante round, before the pre-flop round starts."""
+    rng = random.Random(seed)
+    serials = range(100, 100 + players * 100, 100)
+    player_list = serials[:]
+    money_map = dict((serial, 1600) for serial in serials)
+    history = [('game', 0, 1, 0, 0, 'holdem', 'config', player_list[:], 1, dict(money_map))]
+    for i in xrange(events):
+        serial = rng.choice(serials)
+        kind = rng.randint(0, 7)
+        if kind == 0:
+            history.append(('sit', serial, None))
+        elif kind == 1:
+            history.append(('sitOut', serial))
+            history.append(('wait_for', serial, 'first_round'))
+        elif kind == 2:
+            history.append(('wait_blind', serial))
+        elif kind == 3:
+            if serial in player_list:
+                player_list.remove(serial)
+            else:
+                player_list.append(serial)
+                player_list.sort()
+            history.append(('player_list', player_list[:]))
+        elif kind == 4:
+            history.append(('rebuy', serial, 500))
+        elif kind == 5:
+            history.append(('blind_request', serial, 20, 0, 'big'))
+        else:
+            history.append(('position', serials.index(serial), serial))
+            history.append(('blind', serial, 10, 0))
+    history.append(('position', -1, None))
+    history.append(('round', 'pre-flop', PokerCards([]), dict((serial, PokerCards([1, 2])) for serial in player_list)))
+    for serial in player_list:
+        history.append(('position', player_list.index(serial), serial))
+        history.append(('call', serial, 20))
+    return (history, money_map)
+
+def measure(function, history, money_map, calls):
+    start = time.time()
+    for i in xrange(calls):
+        function(history, money_map)
+    return (time.time() - start) / calls
+
+def run(calls):
+    for (players, events) in ((6, 50), (10, 500), (10, 5000)):
+        (history, money_map) = sit_in_out_history(players, events)
+        expected = deepcopy_history_reduce(history, money_map)
+        reduced = PokerGame._historyReduce(history, money_map)
+        if reduced != expected:
+            raise AssertionError("reduced histories differ for %d players, %d events" % (players, events))
+        in_place = deepcopy(history)
+        PokerGame._historyReduce(in_place, money_map, in_place = True)
+        if in_place != expected:
+            raise AssertionError("in place reduction differs for %d players, %d events" % (players, events))
+        count = max(1, calls * 50 / events)
+        before = measure(deepcopy_history_reduce, history, money_map, count)
+        after = measure(PokerGame._historyReduce, history, money_map, count)
+        print "%2d players %5d events (%5d in history): deepcopy %9.1fus  copy on write %9.1fus  x%.1f" % (
+            players, events, len(history), before * 1000000, after * 1000000, before / after
+        )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
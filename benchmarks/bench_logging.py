@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Hands per second of a table of bots with debug logging on (messages
+# formatted by a handler), with debug messages issued but filtered by
+# the logger level and with PokerGame.log_debug = False.
+#
+#   python benchmarks/bench_logging.py [hands]
+#
+import sys, time, random
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from reflogging import root_logger
+from reflogging.handlers import BaseHandler
+
+from pokerengine.pokergame import PokerGameServer
+from pokerengine.players import BasePokerPlayer
+
+class FormatHandler(BaseHandler):
+
+    def __init__(self):
+        BaseHandler.__init__(self)
+        self.set_level(10)
+
+    def record(self, severity, name, refs, format, *a, **kw):
+        args = tuple(i() if callable(i) else i for i in a)
+        return format % args if args else format
+
+class CallBot(BasePokerPlayer):
+
+    def eval(self, game):
+        return ("call", 0)
+
+def play(hands, players = 6):
+    game = PokerGameServer("poker.%s.xml", [path.join(BENCHMARKS_PATH, '../conf')])
+    game.shuffler = random.Random(1)
+    game.setVariant("holdem")
+    game.setBettingStructure("1-2_20-200_limit")
+    game.setMaxPlayers(players)
+    for serial in xrange(1, players + 1):
+        game.addPlayer(serial, botPlayer = CallBot())
+        game.payBuyIn(serial, game.bestBuyIn())
+        game.sit(serial)
+        game.botPlayer(serial)
+    start = time.time()
+    for hand in xrange(1, hands + 1):
+        for serial in game.serialsAll():
+            if game.getPlayerMoney(serial) < game.bestBuyIn() / 2:
+                game.rebuy(serial, game.bestBuyIn())
+        game.beginTurn(hand)
+    return hands / (time.time() - start)
+
+def run(hands):
+    root_logger.add_handler(FormatHandler())
+
+    root_logger.set_level(10)
+    PokerGameServer.log_debug = True
+    on = play(hands)
+
+    root_logger.set_level(20)
+    filtered = play(hands)
+
+    PokerGameServer.log_debug = False
+    off = play(hands)
+
+    print "debug on:                    %7.1f hands/s" % on
+    print "debug filtered by the level: %7.1f hands/s" % filtered
+    print "log_debug = False:           %7.1f hands/s" % off
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Per player memory footprint of PokerPlayer compared to the same
+# record stored in a per instance dictionary (the layout PokerPlayer
+# used before it had __slots__), and copy() throughput.
+#
+#   python benchmarks/bench_pokerplayer.py [count]
+#
+import sys, time
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine.pokergame import PokerPlayer
+
+class DictPokerPlayer:
+    pass
+
+def slotted_size(player):
+    #
+    # the __dict__ slot is not allocated unless an attribute outside
+    # of __slots__ is set, do not touch it
+    #
+    return sys.getsizeof(player)
+
+def dict_size(player):
+    return sys.getsizeof(player) + sys.getsizeof(player.__dict__)
+
+def as_dict_player(player):
+    other = DictPokerPlayer()
+    for attribute in PokerPlayer.__slots__[:-1]:
+        setattr(other, attribute.lstrip('_'), getattr(player, attribute))
+    return other
+
+def run(count):
+    players = [PokerPlayer(serial, "player%d" % serial, None) for serial in xrange(count)]
+    dict_players = [as_dict_player(player) for player in players]
+
+    after = sum(slotted_size(player) for player in players) / float(count)
+    before = sum(dict_size(player) for player in dict_players) / float(count)
+    print "players: %d" % count
+    print "per player, dict layout:    %6.1f bytes (+ one logger instance each)" % before
+    print "per player, slotted layout: %6.1f bytes (logger created on first use)" % after
+    print "saved: %.1f%%" % (100.0 * (before - after) / before)
+
+    start = time.time()
+    for player in players:
+        player.copy()
+    elapsed = time.time() - start
+    print "copy(): %.0f players/s" % (count / elapsed)
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
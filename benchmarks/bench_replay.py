@@ -0,0 +1,81 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Hands per second rebuilding a client game from the turn histories
+# of a table of bots, with and without the trusted mode of
+# pokerreplay, for each betting structure. The histories are
+# collected first, so that only the replay is measured.
+#
+#   python benchmarks/bench_replay.py [hands]
+#
+import sys
+from os import path
+from timeit import default_timer
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine import pokerreplay
+from pokerengine.pokergame import PokerGameClient
+from pokerengine.pokersimulator import PokerTableSimulator
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+STRUCTURES = (
+    ("holdem", "1-2_20-200_limit"),
+    ("holdem", "1-2_20-200_no-limit"),
+    ("omaha8", "1-2_20-200_limit"),
+)
+
+def generate(variant, betting_structure, hands):
+    simulator = PokerTableSimulator(variant, betting_structure, CONF_DIRS, players = 6, seed = 1)
+    game = simulator.game
+    game.log_debug = False
+    seats = [(player.serial, player.seat, player.money) for player in game.playersAll()]
+    histories = []
+    for hand in xrange(hands):
+        simulator.play(1)
+        histories.append(game.turn_history)
+    return (seats, histories)
+
+def client(variant, betting_structure, seats):
+    game = PokerGameClient("poker.%s.xml", CONF_DIRS)
+    game.setVariant(variant)
+    game.setBettingStructure(betting_structure)
+    game.setMaxPlayers(6)
+    for (serial, seat, money) in seats:
+        game.addPlayer(serial, seat)
+        game.getPlayer(serial).money = money
+        game.getPlayer(serial).buy_in_payed = True
+        game.sit(serial)
+    return game
+
+def run(hands):
+    for (variant, betting_structure) in STRUCTURES:
+        (seats, histories) = generate(variant, betting_structure, hands)
+        rates = []
+        for (trusted, log_debug) in ((False, True), (False, False), (True, True)):
+            game = client(variant, betting_structure, seats)
+            game.log_debug = log_debug
+            start = default_timer()
+            for game in pokerreplay.replay_histories(game, histories, trusted = trusted):
+                pass
+            rates.append(len(histories) / (default_timer() - start))
+        print "%s %s: %8.0f hands/s, %8.0f hands/s without debug, %8.0f hands/s trusted (x%.1f)" % (
+            variant, betting_structure, rates[0], rates[1], rates[2], rates[2] / rates[0]
+        )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,139 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Tables of simulated players run by a PokerTableRunner on one event
+# loop. Each table has a client coroutine that waits for the turn of
+# a player, thinks for think seconds on average (exponentially
+# distributed, less than the timeout) and plays as a RandomBot
+# would. One turn in a thousand is not played, to exercise the
+# timeouts. The action latency is the time between the end of the
+# thinking and the action played, that is how late the loop is. The
+# first 10% of the run are not measured, while the first hands of all
+# the tables are dealt at once.
+#
+#   python benchmarks/bench_runner.py [tables] [seconds] [think]
+#
+import sys, random
+from os import path
+from time import clock
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+import trollius
+from trollius import From
+
+from pokerengine.pokergame import PokerGameServer
+from pokerengine.pokerrunner import PokerTableRunner
+from pokerengine.pokersimulator import RandomBot, latency_add, latency_percentile
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+PLAYERS = 6
+TIMEOUT = 5.0
+MISSED = 0.001
+
+class PokerBenchRunner(PokerTableRunner):
+
+    def deal(self, table):
+        #
+        # the players who are broke or timed out come back
+        #
+        game = table.game
+        if game.isEndOrNull():
+            for serial in game.serialsAll():
+                money = game.getPlayerMoney(serial)
+                if money < game.buyIn():
+                    game.rebuy(serial, game.bestBuyIn() - money)
+                if game.isSitOut(serial):
+                    game.noAutoPlayer(serial)
+                    game.sit(serial)
+        PokerTableRunner.deal(self, table)
+
+def create_game(game_id):
+    game = PokerGameServer("poker.%s.xml", CONF_DIRS)
+    game.id = game_id
+    game.log_debug = False
+    game.shuffler = random.Random(game_id)
+    game.setVariant("holdem")
+    game.setBettingStructure("1-2_20-200_limit")
+    game.setMaxPlayers(PLAYERS)
+    for serial in xrange(1, PLAYERS + 1):
+        game.addPlayer(serial)
+        game.payBuyIn(serial, game.bestBuyIn())
+        game.sit(serial)
+        game.autoBlindAnte(serial)
+    return game
+
+def pause(loop, delay):
+    """trollius.sleep without the task running it."""
+    future = trollius.Future(loop = loop)
+    loop.call_later(delay, lambda: future.done() or future.set_result(None))
+    return future
+
+@trollius.coroutine
+def client(runner, game_id, think, measure, latencies):
+    loop = runner.loop
+    game = runner.tables[game_id].game
+    rng = random.Random(game_id)
+    bot = RandomBot(rng)
+    while True:
+        serial = yield From(runner.waitTurn(game_id))
+        if rng.random() < MISSED:
+            #
+            # let the player time out
+            #
+            yield From(pause(loop, TIMEOUT * 1.5))
+            continue
+        delay = min(rng.expovariate(1.0 / think), TIMEOUT * 0.9)
+        wake = loop.time() + delay
+        yield From(pause(loop, delay))
+        if game.getSerialInPosition() != serial:
+            continue
+        (action, amount) = bot.eval(game)
+        played = yield From(runner.act(game_id, serial, action, amount))
+        if played and loop.time() > measure[0]:
+            latency_add(latencies, loop.time() - wake)
+
+def run(tables, seconds, think):
+    loop = trollius.get_event_loop()
+    runner = PokerBenchRunner(loop = loop, timeout = TIMEOUT, delay = 0.5)
+    latencies = {}
+    for game_id in xrange(1, tables + 1):
+        runner.add(create_game(game_id))
+    start = loop.time()
+    measure = [start + seconds * 0.1]
+    tasks = [trollius.ensure_future(client(runner, game_id, think, measure, latencies), loop = loop) for game_id in xrange(1, tables + 1)]
+    cpu = clock()
+    loop.run_until_complete(trollius.sleep(seconds, loop = loop))
+    cpu = clock() - cpu
+    elapsed = loop.time() - start
+    for task in tasks:
+        task.cancel()
+    runner.close()
+    loop.run_until_complete(trollius.sleep(0, loop = loop))
+    stats = runner.stats()
+    print "%d tables, %.1fs think time: %d hands, %d actions (%.0f actions/s), %d timeouts in %.1fs, loop busy %.0f%%" % (
+        tables, think, stats['hands'], stats['actions'], stats['actions'] / elapsed, stats['timeouts'], elapsed, cpu / elapsed * 100
+    )
+    print "action latency: p50 %.1fms p90 %.1fms p99 %.1fms p99.9 %.1fms max %.1fms" % tuple(
+        [latency_percentile(latencies, percent) * 1000 for percent in (50, 90, 99, 99.9, 100)]
+    )
+
+if __name__ == '__main__':
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    think = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+    run(tables, seconds, think)
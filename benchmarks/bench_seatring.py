@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Per call latency of the seat navigation done on every action
+# (indexInGameAdd / indexNotFoldAdd) with the seat ring, compared to
+# the list building implementation it replaced.
+#
+#   python benchmarks/bench_seatring.py [calls]
+#
+import sys, time
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine.pokergame import PokerGameServer, PokerPlayer
+
+def list_index_add(game, index, increment, predicate):
+    round_trip = range(0, len(game.player_list)) \
+        if increment >= 0 \
+        else range(len(game.player_list), 0, -1)
+    player_list_ordered = [(x + index) % len(game.player_list) for x in round_trip]
+    player_list_filtered = [p for p in player_list_ordered if predicate(game.serial2player[game.player_list[p]])]
+    increment = abs(increment) \
+        if predicate(game.serial2player[game.player_list[index]]) \
+        else abs(increment) - 1
+    return player_list_filtered[increment % len(player_list_filtered)]
+
+def create_game(players):
+    game = PokerGameServer("poker.%s.xml", [path.join(BENCHMARKS_PATH, '../conf')])
+    game.setMaxPlayers(players)
+    for serial in xrange(1, players + 1):
+        game.addPlayer(serial)
+    game.player_list = game.serial2player.keys()
+    game.sortPlayerList()
+    #
+    # one out of three players folded
+    #
+    for serial in game.player_list[::3]:
+        game.serial2player[serial].fold = True
+    return game
+
+def measure(function, game, calls):
+    length = len(game.player_list)
+    start = time.time()
+    for i in xrange(calls):
+        function(game, i % length, 1, PokerPlayer.isInGame)
+        function(game, i % length, -1, PokerPlayer.isNotFold)
+    return (time.time() - start) / (calls * 2)
+
+def run(calls):
+    for players in (2, 6, 10):
+        game = create_game(players)
+        for i in xrange(players):
+            for increment in (-2, -1, 1, 2):
+                assert game.playerListIndexAdd(i, increment, PokerPlayer.isInGame) == list_index_add(game, i, increment, PokerPlayer.isInGame)
+        before = measure(list_index_add, game, calls)
+        after = measure(PokerGameServer.playerListIndexAdd, game, calls)
+        print "%2d players: list %.2f us/call, seat ring %.2f us/call, speedup x%.1f" % ( players, before * 1e6, after * 1e6, before / after )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
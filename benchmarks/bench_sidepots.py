@@ -0,0 +1,75 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Per call latency of the side pots built at the end of a betting
+# round where every player of a ten handed table is all-in for a
+# different amount, with the single sweep implementation, compared
+# to the implementation it replaced (kept in tests/test_sidepots.py
+# to check that both build the same pots).
+#
+#   python benchmarks/bench_sidepots.py [calls]
+#
+import sys, time, copy
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, "../tests"))
+
+from test_sidepots import create_game, reference_make_side_pots
+
+def create_table(players, folded):
+    game = create_game(path.join(BENCHMARKS_PATH, '../conf'), players)
+    game.current_round = 0
+    pot_contributions = {}
+    for player in game.playersAll():
+        pot_contributions[player.serial] = 100 * player.serial
+        if player.serial <= folded:
+            player.fold = True
+        else:
+            player.all_in = True
+    game.side_pots = {
+        'contributions': {'total': dict(pot_contributions), 0: {0: pot_contributions}},
+        'pots': [[0, 0]],
+        'building': sum(pot_contributions.values()),
+        'last_round': 0,
+    }
+    return game
+
+def measure(function, game, calls):
+    side_pots = game.side_pots
+    elapsed = 0
+    for i in xrange(calls):
+        game.side_pots = copy.deepcopy(side_pots)
+        for player in game.playersAll():
+            player.side_pot_index = 0
+        start = time.time()
+        function(game)
+        elapsed += time.time() - start
+    result = game.side_pots
+    game.side_pots = side_pots
+    return (elapsed / calls, result)
+
+def run(calls):
+    for (players, folded) in ((3, 0), (6, 1), (10, 0), (10, 3)):
+        game = create_table(players, folded)
+        (before, expected) = measure(reference_make_side_pots, game, calls)
+        (after, result) = measure(lambda game: game._PokerGame__makeSidePots(), game, calls)
+        assert result == expected
+        print "%2d players, %d folded: %d pots, reference %.2f us/call, single sweep %.2f us/call, speedup x%.1f" % ( players, folded, len(result['pots']), before * 1e6, after * 1e6, before / after )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
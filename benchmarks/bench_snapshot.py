@@ -0,0 +1,61 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Per table latency and size of the snapshot of a game on the flop,
+# restored into a game of the process (failover to a standby table)
+# or into a new game (table migration, which includes the creation
+# of the PokerGameServer).
+#
+#   python benchmarks/bench_snapshot.py [snapshots]
+#
+import sys, time
+from os import path
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine import pokersnapshot
+from pokerengine.pokergame import PokerGameServer
+from bench_suite import create_table, call_check, CONF_DIRS
+
+def game_on_the_flop(players):
+    game = create_table(players = players)
+    game.beginTurn(1)
+    while game.isRunning() and game.state != "flop":
+        call_check(game, game.getSerialInPosition())
+    return game
+
+def measure(function, count):
+    start = time.time()
+    for i in xrange(count):
+        function()
+    return (time.time() - start) / count
+
+def run(count):
+    for players in (2, 6, 10):
+        game = game_on_the_flop(players)
+        data = pokersnapshot.dumps(game)
+        standby = pokersnapshot.loads(data)
+        dumps = measure(lambda: pokersnapshot.dumps(game), count)
+        loads = measure(lambda: pokersnapshot.loads(data, standby), count)
+        loads_new = measure(lambda: pokersnapshot.loads(data), max(1, count / 10))
+        create = measure(lambda: PokerGameServer("poker.%s.xml", CONF_DIRS), max(1, count / 10))
+        print "%2d players: %5d bytes, dumps %6.1f us, loads %6.1f us, loads into a new game %6.1f us (of which PokerGameServer() %6.1f us)" % (
+            players, len(data), dumps * 1e6, loads * 1e6, loads_new * 1e6, create * 1e6
+        )
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Benchmarks of the engine hot paths. The time per operation of each
+# benchmark is compared to a JSON baseline and the exit status is 1 if
+# one of them is slower than the baseline by more than the threshold.
+#
+#   python benchmarks/bench_suite.py --save          # record the baseline
+#   python benchmarks/bench_suite.py                 # compare to the baseline
+#   python benchmarks/bench_suite.py --threshold=0.1 --only=beginTurn,historyReduce
+#
+import sys, getopt, random
+from os import path
+from timeit import default_timer
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+BENCHMARKS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(BENCHMARKS_PATH, ".."))
+
+from pokerengine import pokergame
+from pokerengine.pokergame import PokerGame, PokerGameServer
+from pokerengine import pokertournament
+from pokerengine.pokertournament import PokerTournament
+
+CONF_DIRS = [path.join(BENCHMARKS_PATH, '../conf')]
+DEFAULT_BASELINE = path.join(BENCHMARKS_PATH, 'baseline.json')
+
+class Timer:
+    """Accumulate the time spent in the measured operations."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def time(self, function, *args, **kwargs):
+        start = default_timer()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.total += default_timer() - start
+            self.count += 1
+
+    def instrument(self, game, name):
+        """Measure each call of the method name of game, including the
+        calls made by the engine itself."""
+        method = getattr(game, name)
+        setattr(game, name, lambda *args, **kwargs: self.time(method, *args, **kwargs))
+
+    def perOperation(self):
+        return self.total / self.count if self.count else 0.0
+
+def create_table(variant = "holdem", betting_structure = "1-2_20-200_limit", players = 10, stacks = None, seed = 1):
+    game = PokerGameServer("poker.%s.xml", CONF_DIRS)
+    game.log_debug = False
+    game.shuffler = random.Random(seed)
+    game.setVariant(variant)
+    game.setBettingStructure(betting_structure)
+    game.setMaxPlayers(players)
+    for serial in xrange(1, players + 1):
+        game.addPlayer(serial)
+        game.payBuyIn(serial, stacks[serial - 1] if stacks else game.bestBuyIn())
+        game.sit(serial)
+        game.autoBlindAnte(serial)
+    return game
+
+def call_check(game, serial):
+    if game.canCheck(serial):
+        game.check(serial)
+    else:
+        game.call(serial)
+
+def play(game, strategy = call_check, timer = None):
+    """Play the hand started on game until it ends, each player in
+    position acting according to strategy."""
+    action = 0
+    while game.isRunning() and not game.isBlindAnteRound():
+        serial = game.getSerialInPosition()
+        if timer:
+            timer.time(strategy, game, serial, action)
+        else:
+            strategy(game, serial, action)
+        action += 1
+
+def bench_beginTurn(timer, iterations):
+    for i in xrange(iterations):
+        game = create_table(seed = i)
+        timer.time(game.beginTurn, 1)
+
+def bench_dealCards(timer, iterations):
+    for i in xrange(iterations):
+        game = create_table(seed = i)
+        timer.instrument(game, "dealCards")
+        game.beginTurn(1)
+        play(game, lambda game, serial, action: call_check(game, serial))
+
+def bench_betting(timer, iterations):
+    def sequence(game, serial, action):
+        step = action % 4
+        if step == 0 and game.canRaise(serial):
+            game.callNraise(serial, game.betLimitsForSerial(serial)[0])
+        elif step == 3 and not game.canCheck(serial):
+            game.fold(serial)
+        else:
+            call_check(game, serial)
+    for i in xrange(iterations):
+        game = create_table(seed = i)
+        game.beginTurn(1)
+        play(game, sequence, timer)
+
+def bench_makeSidePots(timer, iterations):
+    def all_in(game, serial, action):
+        if game.canRaise(serial):
+            game.callNraise(serial, game.getPlayerMoney(serial))
+        else:
+            game.call(serial)
+    for i in xrange(iterations):
+        game = create_table(
+            betting_structure = "2-4_40-400_no-limit",
+            stacks = [40 * (index + 1) for index in xrange(10)],
+            seed = i
+        )
+        timer.instrument(game, "_PokerGame__makeSidePots")
+        game.beginTurn(1)
+        play(game, all_in)
+
+def bench_distributeMoneyHiLo(timer, iterations):
+    for i in xrange(iterations):
+        game = create_table(variant = "omaha8", seed = i)
+        timer.instrument(game, "distributeMoney")
+        game.beginTurn(1)
+        play(game, lambda game, serial, action: call_check(game, serial))
+
+def finished_hand(seed = 1):
+    game = create_table(seed = seed)
+    game.beginTurn(1)
+    play(game, lambda game, serial, action: call_check(game, serial))
+    return game
+
+def bench_historyReduce(timer, iterations):
+    game = finished_hand()
+    history = game.turn_history
+    money_map = game.moneyMapWithBets()
+    for i in xrange(iterations):
+        timer.time(PokerGame._historyReduce, history, money_map)
+
+def bench_history2messages(timer, iterations):
+    game = finished_hand()
+    history = game.turn_history
+    for i in xrange(iterations):
+        timer.time(pokergame.history2messages, game, history)
+
+def bench_fork(timer, iterations):
+    game = create_table()
+    game.beginTurn(1)
+    for i in xrange(game.playingCount()):
+        call_check(game, game.getSerialInPosition())
+    for i in xrange(iterations):
+        timer.time(game.fork, False)
+
+def bench_balanceGames(timer, iterations, tables = 1000):
+    for i in xrange(iterations):
+        tourney = PokerTournament(dirs = CONF_DIRS, state = pokertournament.TOURNAMENT_STATE_REGISTERING, seats_per_game = 10)
+        tourney.log_debug = False
+        serial = 1
+        for game_id in xrange(1, tables + 1):
+            game = PokerGameServer("poker.%s.xml", CONF_DIRS)
+            game.log_debug = False
+            game.id = game_id
+            game.setVariant(tourney.variant)
+            game.setBettingStructure(tourney.betting_structure)
+            game.setMaxPlayers(tourney.seats_per_game)
+            #
+            # from 4 to 10 players per table: a few tables are broken,
+            # the others are equalized
+            #
+            for seat in xrange(4 + game_id % 7):
+                game.addPlayer(serial)
+                game.payBuyIn(serial, game.buyIn())
+                game.sit(serial)
+                serial += 1
+            tourney.games.append(game)
+        tourney.id2game = dict((game.id, game) for game in tourney.games)
+        while timer.time(tourney.balanceGames):
+            pass
+
+BENCHMARKS = (
+    ('beginTurn', bench_beginTurn, 200),
+    ('dealCards', bench_dealCards, 100),
+    ('betting', bench_betting, 100),
+    ('makeSidePots', bench_makeSidePots, 100),
+    ('distributeMoneyHiLo', bench_distributeMoneyHiLo, 100),
+    ('historyReduce', bench_historyReduce, 500),
+    ('history2messages', bench_history2messages, 500),
+    ('fork', bench_fork, 2000),
+    ('balanceGames', bench_balanceGames, 1),
+)
+
+def run(names = None, repeat = 3, scale = 1.0):
+    """Return a dictionary mapping the name of each benchmark to the
+    best time per operation, in seconds, over repeat runs."""
+    results = {}
+    for (name, function, iterations) in BENCHMARKS:
+        if names and name not in names:
+            continue
+        best = None
+        for i in xrange(repeat):
+            timer = Timer()
+            function(timer, max(1, int(iterations * scale)))
+            if best is None or timer.perOperation() < best:
+                best = timer.perOperation()
+        results[name] = best
+    return results
+
+def compare(results, baseline, threshold):
+    """Return the list of (name, baseline, result) for the benchmarks
+    more than threshold (0.2 is 20%) slower than the baseline."""
+    regressions = []
+    for (name, seconds) in sorted(results.iteritems()):
+        if name in baseline and seconds > baseline[name] * (1 + threshold):
+            regressions.append((name, baseline[name], seconds))
+    return regressions
+
+def usage():
+    print """
+bench_suite.py [--baseline=<file.json>] [--save] [--threshold=0.2] [--repeat=3]
+               [--scale=1.0] [--only=<name>[,<name>...]] [--help]
+
+  --save        write the results to the baseline instead of comparing
+  --threshold   relative slow down above which a benchmark fails
+  --scale       multiply the number of iterations of each benchmark
+"""
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "h", ["help", "baseline=", "save", "threshold=", "repeat=", "scale=", "only="])
+    except getopt.GetoptError:
+        usage()
+        return 2
+    baseline_file = DEFAULT_BASELINE
+    save = False
+    threshold = 0.2
+    repeat = 3
+    scale = 1.0
+    names = None
+    for (option, value) in opts:
+        if option in ("-h", "--help"):
+            usage()
+            return 0
+        elif option == "--baseline":
+            baseline_file = value
+        elif option == "--save":
+            save = True
+        elif option == "--threshold":
+            threshold = float(value)
+        elif option == "--repeat":
+            repeat = int(value)
+        elif option == "--scale":
+            scale = float(value)
+        elif option == "--only":
+            names = value.split(",")
+
+    results = run(names, repeat, scale)
+
+    if save:
+        baseline = {}
+        if path.exists(baseline_file):
+            baseline = json.load(open(baseline_file))
+        baseline.update(results)
+        output = open(baseline_file, "w")
+        json.dump(baseline, output, indent = 1, sort_keys = True)
+        output.close()
+        for (name, seconds) in sorted(results.iteritems()):
+            print "%-20s %12.1fus" % (name, seconds * 1000000)
+        print "baseline saved to %s" % baseline_file
+        return 0
+
+    baseline = {}
+    if path.exists(baseline_file):
+        baseline = json.load(open(baseline_file))
+    else:
+        print "no baseline in %s, use --save to record one" % baseline_file
+    for (name, seconds) in sorted(results.iteritems()):
+        if name in baseline:
+            print "%-20s %12.1fus  baseline %12.1fus  %+6.1f%%" % ( name, seconds * 1000000, baseline[name] * 1000000, 100.0 * (seconds - baseline[name]) / baseline[name] )
+        else:
+            print "%-20s %12.1fus" % (name, seconds * 1000000)
+    regressions = compare(results, baseline, threshold)
+    for (name, before, after) in regressions:
+        print "REGRESSION %s: %.1fus -> %.1fus (threshold %d%%)" % ( name, before * 1000000, after * 1000000, threshold * 100 )
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
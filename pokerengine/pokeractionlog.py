@@ -0,0 +1,353 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Write-ahead log of the tables of a process, to recover the hands in
+# progress after a crash.
+#
+# A PokerActionLog is appended the events of the games attached to it
+# (from registerCallback: the turn_history and the changes of the
+# players, PLAYER_EVENTS) and the decks they shuffle. The records are
+# written and fsync'ed by groups of batch records and when a hand
+# ends: a crash loses at most the records not synced yet, those of
+# hands in progress and of the changes of the players since the last
+# hand ended. A server that wants them on disk sooner calls sync,
+# from a timer for instance. Attaching a game writes a checkpoint,
+# which is a pokersnapshot of the game. recover() restores the last checkpoint of
+# each table into a new PokerGameServer and replays the events that
+# follow: the decks are dealt again from the log, the actions of the
+# players (bots included) are played again and each event of the
+# replayed game must be the logged one.
+#
+#   log = PokerActionLog("/var/lib/poker/actions.log", batch = 64)
+#   log.attach(game)
+#   ...
+#   log.checkpoint(game)  # between hands, now and then
+#   ...
+#   games = pokeractionlog.recover("/var/lib/poker/actions.log", dirs)
+#
+# A checkpoint bounds the events to replay. What changes a game without
+# an event (setting a player money directly, for instance) is only
+# known from a checkpoint. A table whose events cannot be replayed is
+# recovered in the state that precedes the first of them, the other
+# tables are not affected.
+#
+import os, struct
+from random import Random
+from collections import deque
+from zlib import crc32
+from cStringIO import StringIO
+from cPickle import Pickler, Unpickler, HIGHEST_PROTOCOL
+
+from pokerengine import pokersnapshot
+from pokerengine.pokergame import HISTORY_EVENT_FIELDS, PLAYER_EVENTS
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokeractionlog')
+
+MAGIC = "PKL"
+VERSION = 1
+HEADER = MAGIC + chr(VERSION)
+
+#
+# length and crc32 of the pickled (table id, kind, value) that follows
+#
+RECORD = struct.Struct("<II")
+
+CHECKPOINT = 0
+DECK = 1
+EVENT = 2
+
+#
+# Events of the callbacks that are not in the turn history and only
+# follow from other events: they are not logged
+#
+UNLOGGED_EVENTS = frozenset(("money2bet", "bet2pot", "end_round", "end_round_last", "round_cap_decrease"))
+
+#
+# The events the log registers for
+#
+LOGGED_EVENTS = frozenset(HISTORY_EVENT_FIELDS) | PLAYER_EVENTS | frozenset(("auto_actions",))
+
+#
+# The events that end a hand: the pending records are synced
+#
+SYNC_EVENTS = frozenset(("finish", "canceled"))
+
+PLAYER_ACTIONS = ("fold", "check", "call", "raise")
+
+class PokerLogShuffler(Random):
+    """The shuffler of a game attached to a log: deals as the shuffler
+    it replaces and logs the decks."""
+
+    def __new__(cls, shuffler, record):
+        return Random.__new__(cls, 0)
+
+    def __init__(self, shuffler, record):
+        self.setstate(shuffler.getstate())
+        self.record = record
+
+    def shuffle(self, deck):
+        Random.shuffle(self, deck)
+        self.record(deck)
+
+class PokerActionLog:
+
+    def __init__(self, path, batch = 64):
+        self.path = path
+        self.batch = batch
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(HEADER)
+            self.file.flush()
+        self.pending = []
+        self.games = {}
+        self.syncs = 0
+        self.buffer = StringIO()
+        self.pickler = Pickler(self.buffer, HIGHEST_PROTOCOL)
+        self.pickler.inst_persistent_id = pokersnapshot.plain_string
+
+    def attach(self, game):
+        """Log the events and the decks of game, starting with a checkpoint."""
+        self.games[game.id] = game
+        game.registerCallback(self.event, LOGGED_EVENTS)
+        if isinstance(game.shuffler, Random):
+            game.shuffler = PokerLogShuffler(game.shuffler, lambda deck: self.append(game.id, DECK, (game.time, deck)))
+        else:
+            log.warn("table %d: the decks of a %s shuffler are not logged", game.id, type(game.shuffler).__name__)
+        self.checkpoint(game)
+
+    def detach(self, game):
+        game.unregisterCallback(self.event)
+        if isinstance(game.shuffler, PokerLogShuffler):
+            shuffler = Random.__new__(Random)
+            shuffler.setstate(game.shuffler.getstate())
+            game.shuffler = shuffler
+        del self.games[game.id]
+
+    def checkpoint(self, game):
+        self.append(game.id, CHECKPOINT, pokersnapshot.dumps(game))
+
+    def event(self, game_id, event, *args):
+        if event == "auto_actions":
+            for args in args[0]:
+                self.event(game_id, *args)
+        elif event not in UNLOGGED_EVENTS:
+            self.append(game_id, EVENT, (event,) + args)
+
+    def append(self, game_id, kind, value):
+        buffer = self.buffer
+        buffer.seek(0)
+        buffer.truncate()
+        self.pickler.clear_memo()
+        self.pickler.dump((game_id, kind, value))
+        data = buffer.getvalue()
+        self.pending.append(RECORD.pack(len(data), crc32(data) & 0xffffffff) + data)
+        if len(self.pending) >= self.batch or (kind == EVENT and value[0] in SYNC_EVENTS):
+            self.sync()
+
+    def sync(self):
+        """Write the pending records and wait for them to be on disk."""
+        if self.pending:
+            self.file.write("".join(self.pending))
+            self.pending = []
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.syncs += 1
+
+    def close(self):
+        for game in self.games.values():
+            self.detach(game)
+        self.sync()
+        self.file.close()
+
+def read(path):
+    """Return the (table id, kind, value) records of the log. A record
+    cut or corrupted by a crash ends the log."""
+    data = open(path, "rb").read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("%s is not an action log" % path)
+    if ord(data[len(MAGIC)]) > VERSION:
+        raise ValueError("%s: action log version %d is newer than %d" % (path, ord(data[len(MAGIC)]), VERSION))
+    records = []
+    offset = len(HEADER)
+    while offset + RECORD.size <= len(data):
+        (length, crc) = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        record = data[offset:offset + length]
+        if len(record) < length or crc32(record) & 0xffffffff != crc:
+            log.warn("%s: ignore the records after offset %d", path, offset - RECORD.size)
+            break
+        unpickler = Unpickler(StringIO(record))
+        unpickler.persistent_load = pokersnapshot.persistent_string
+        records.append(unpickler.load())
+        offset += length
+    return records
+
+class PokerReplayShuffler:
+    """Deals the logged decks."""
+
+    def __init__(self, decks):
+        self.decks = deque(decks)
+
+    def shuffle(self, deck):
+        deck[:] = self.decks.popleft()[1]
+
+class PokerReplayBot:
+    """Plays the logged action of a bot (or of a player automatically
+    playing as one). A bot with no action left in the log checks or
+    folds, as a player timing out."""
+
+    def __init__(self, replay, serial):
+        self.replay = replay
+        self.serial = serial
+
+    def eval(self, game):
+        for event in self.replay.events[self.replay.cursor:]:
+            if event[0] in PLAYER_ACTIONS and event[1] == self.serial:
+                return (event[0], event[2] if event[0] == "raise" else 0)
+        return ("check", 0)
+
+class PokerLogReplay:
+    """Replay the events logged after a checkpoint into the game
+    restored from it. The events that the game does not produce by
+    itself are the actions of the players, played with INPUTS."""
+
+    INPUTS = {
+        "game": lambda game, event: game.beginTurn(event[2]),
+        "blind": lambda game, event: game.blind(event[1], event[2], event[3]),
+        "ante": lambda game, event: game.ante(event[1], event[2]),
+        "call": lambda game, event: game.call(event[1]),
+        "check": lambda game, event: game.check(event[1]),
+        #
+        # a player folding with the auto flag was set to play
+        # automatically, which is not an event
+        #
+        "fold": lambda game, event: game.autoPlayer(event[1]) if event[2] else game.fold(event[1]),
+        "raise": lambda game, event: game.callNraise(event[1], event[2]),
+        "sit": lambda game, event: game.sit(event[1]),
+        "sitOut": lambda game, event: game.sitOut(event[1]),
+        "playerSit": lambda game, event: game.sit(event[1]),
+        "playerSitOut": lambda game, event: game.sitOut(event[1]),
+        "wait_blind": lambda game, event: game.waitBigBlind(event[1]),
+        "rebuy": lambda game, event: game.rebuy(event[1], event[2]),
+        "addPlayer": lambda game, event: game.addPlayer(event[1], event[2], event[3]),
+        "removePlayer": lambda game, event: game.removePlayer(event[1]),
+        "payBuyIn": lambda game, event: game.payBuyIn(event[1], event[2]),
+        "sitOutNextTurn": lambda game, event: game.sitOutNextTurn(event[1]),
+        "autoPlayer": lambda game, event: game.autoPlayer(event[1]),
+        "noAutoPlayer": lambda game, event: game.noAutoPlayer(event[1]),
+        "autoBlindAnte": lambda game, event: game.autoBlindAnte(event[1]),
+        "noAutoBlindAnte": lambda game, event: game.noAutoBlindAnte(event[1]),
+        "autoMuck": lambda game, event: game.autoMuck(event[1], event[2]),
+        "botPlayer": lambda game, event: game.botPlayer(event[1]),
+        "interactivePlayer": lambda game, event: game.interactivePlayer(event[1]),
+    }
+
+    def __init__(self, game, events, decks):
+        self.game = game
+        self.events = events
+        self.decks = decks
+        self.cursor = 0
+        #
+        # the first event of the input being replayed
+        #
+        self.start = 0
+
+    def event(self, game_id, event, *args):
+        if event in UNLOGGED_EVENTS:
+            return
+        event = (event,) + args
+        #
+        # after the end of the log, the events that follow from the
+        # last logged one are not checked
+        #
+        if self.cursor < len(self.events) and event != self.events[self.cursor]:
+            raise UserWarning("table %d: replayed %s instead of %s (event %d)" % (game_id, event, self.events[self.cursor], self.cursor))
+        self.cursor += 1
+
+    def run(self):
+        game = self.game
+        shuffler = PokerReplayShuffler(self.decks)
+        saved = (game.shuffler, game.batch_auto_actions, [(player, player.botPlayer) for player in game.playersAll()])
+        game.shuffler = shuffler
+        game.batch_auto_actions = False
+        for player in game.playersAll():
+            player.botPlayer = PokerReplayBot(self, player.serial)
+        game.registerCallback(self.event, LOGGED_EVENTS)
+        try:
+            while self.cursor < len(self.events):
+                event = self.events[self.cursor]
+                if event[0] not in self.INPUTS:
+                    raise UserWarning("table %d: %s was not replayed (event %d)" % (game.id, event, self.cursor))
+                if event[0] == "game":
+                    if not shuffler.decks:
+                        #
+                        # the log ends before the deck of the hand: it
+                        # was not dealt
+                        #
+                        log.inform("table %d: hand %d was not dealt", game.id, event[2])
+                        break
+                    game.time = shuffler.decks[0][0]
+                self.start = self.cursor
+                self.INPUTS[event[0]](game, event)
+                if self.cursor == self.start:
+                    raise UserWarning("table %d: cannot replay %s (event %d)" % (game.id, event, self.start))
+        finally:
+            game.unregisterCallback(self.event)
+            (game.shuffler, game.batch_auto_actions, players) = saved
+            for (player, botPlayer) in players:
+                player.botPlayer = botPlayer
+        return game
+
+def recover_table(checkpoint, events, decks, dirs = None):
+    """Return the game restored from checkpoint, in the state that
+    follows events. If one of them cannot be replayed, the game is in
+    the state that precedes it."""
+    replay = PokerLogReplay(pokersnapshot.loads(checkpoint, dirs = dirs), events, decks)
+    try:
+        game = replay.run()
+    except Exception:
+        log.error("table %d: replay failed at event %d of %d", replay.game.id, replay.start, len(events), exc_info = 1)
+        events = events[:replay.start]
+        game = PokerLogReplay(pokersnapshot.loads(checkpoint, dirs = dirs), events, decks).run()
+    log.inform("table %d: replayed %d events", game.id, len(events))
+    return game
+
+def recover(path, dirs = None):
+    """Return the games of the log, indexed by table id, in the state
+    that follows the last logged event. The bots of the players
+    (botPlayer) are to be set again. A table that cannot be restored
+    from its checkpoint is left out."""
+    checkpoints = {}
+    decks = {}
+    events = {}
+    for (game_id, kind, value) in read(path):
+        if kind == CHECKPOINT:
+            checkpoints[game_id] = value
+            decks[game_id] = []
+            events[game_id] = []
+        elif game_id not in checkpoints:
+            continue
+        elif kind == DECK:
+            decks[game_id].append(value)
+        else:
+            events[game_id].append(value)
+    games = {}
+    for (game_id, checkpoint) in checkpoints.iteritems():
+        try:
+            games[game_id] = recover_table(checkpoint, events[game_id], decks[game_id], dirs)
+        except Exception:
+            log.error("table %d: not recovered", game_id, exc_info = 1)
+    return games
@@ -0,0 +1,193 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Queued dispatch of the events of games to a slow consumer (a
+# database, the network...), so that it does not add its latency to
+# the actions of the players.
+#
+# A PokerEventQueue is registered as the callback of the games: it
+# only queues the events, as (game_id, event_type, *args) tuples. The
+# consumer is given them in batches of at most batch events, in the
+# order they were queued, either by the thread of the queue (start)
+# or by the caller of drain (the loop of a server, for instance).
+#
+#   queue = PokerEventQueue(consumer, size = 4096, batch = 64)
+#   queue.start()
+#   game.registerCallback(queue, ("call", "raise", "check", "fold"))
+#   ...
+#   queue.stop()
+#
+# The queue holds at most size events. When it is full, an event
+# waits until the consumer made room for it (or dispatches the queued
+# events itself when the queue has no thread) if block is True, and
+# is dropped otherwise.
+#
+# The arguments of the events are the objects given to the callbacks,
+# not copies: the consumer must not change them.
+#
+import threading
+from collections import deque
+
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerdispatch')
+
+class PokerEventQueue:
+
+    def __init__(self, consumer, size = 4096, batch = 64, block = True):
+        self.consumer = consumer
+        self.size = size
+        self.batch = batch
+        self.block = block
+        #
+        # The events are appended by the games and taken by the consumer
+        # without a lock (deque.append and popleft are atomic). The
+        # condition is only used when the thread of the queue is idle,
+        # to wake it up, or when the queue is full.
+        #
+        self.events = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.idle = False
+        self.blocked = 0
+        self.dispatched = 0
+        self.batches = 0
+        self.waits = 0
+        self.dropped = 0
+
+    def __call__(self, game_id, *args):
+        if len(self.events) >= self.size and not self.room():
+            return
+        self.events.append((game_id,) + args)
+        if self.idle:
+            self.notify()
+
+    def notify(self):
+        condition = self.condition
+        condition.acquire()
+        try:
+            condition.notify_all()
+        finally:
+            condition.release()
+
+    def room(self):
+        """Wait until the queue is not full, return False if the event
+        is to be dropped instead."""
+        if not self.block:
+            self.dropped += 1
+            return False
+        self.waits += 1
+        if self.thread is None:
+            self.drain()
+            return True
+        condition = self.condition
+        condition.acquire()
+        try:
+            self.blocked += 1
+            while len(self.events) >= self.size and self.running:
+                condition.wait()
+            self.blocked -= 1
+        finally:
+            condition.release()
+        return True
+
+    def take(self):
+        events = self.events
+        batch = []
+        while events and len(batch) < self.batch:
+            batch.append(events.popleft())
+        return batch
+
+    def deliver(self, batch):
+        try:
+            self.consumer(batch)
+        except Exception:
+            log.error("consumer failed on a batch of %d events", len(batch), exc_info = 1)
+        self.dispatched += len(batch)
+        self.batches += 1
+        if self.blocked:
+            self.notify()
+
+    def drain(self):
+        """Give the queued events to the consumer in the calling thread
+        and return how many there were."""
+        count = 0
+        while True:
+            batch = self.take()
+            if not batch:
+                return count
+            self.deliver(batch)
+            count += len(batch)
+
+    def run(self):
+        condition = self.condition
+        while True:
+            self.drain()
+            condition.acquire()
+            try:
+                self.idle = True
+                condition.notify_all()
+                while not self.events and self.running:
+                    condition.wait()
+                self.idle = False
+                if not self.events:
+                    return
+            finally:
+                condition.release()
+
+    def start(self):
+        """Dispatch the events in a thread of the queue."""
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target = self.run, name = "PokerEventQueue")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def flush(self):
+        """Wait until the events queued are given to the consumer."""
+        if self.thread is None:
+            self.drain()
+            return
+        condition = self.condition
+        condition.acquire()
+        try:
+            while (self.events or not self.idle) and self.running:
+                condition.wait()
+        finally:
+            condition.release()
+
+    def stop(self):
+        """Stop the thread of the queue after it dispatched the queued events."""
+        if self.thread is not None:
+            condition = self.condition
+            condition.acquire()
+            try:
+                self.running = False
+                condition.notify_all()
+            finally:
+                condition.release()
+            self.thread.join()
+            self.thread = None
+        self.drain()
+
+    def stats(self):
+        return {
+            'queued': len(self.events),
+            'dispatched': self.dispatched,
+            'batches': self.batches,
+            'waits': self.waits,
+            'dropped': self.dropped,
+        }
@@ -56,12 +56,17 @@ class Config:
         self.free()
         self.doc = etree.XML(open(self.path, 'r').read())
 
-    def load(self, path):
+    def lookup(self, path):
         for prefix in self.dirs:
             tmppath = abspath(expanduser((prefix + "/" + path) if prefix and path[0] != "/" else path ))
             if exists(tmppath):
-                self.path = tmppath
-                break
+                return tmppath
+        return None
+
+    def load(self, path):
+        tmppath = self.lookup(path)
+        if tmppath:
+            self.path = tmppath
         self.free()
         if self.path:
             self.doc = etree.XML(open(self.path, 'r').read())
@@ -0,0 +1,307 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Batch environment to train bots against the engine. Requires NumPy.
+#
+# PokerBatchEnv owns tables of PokerTableSimulator. The controlled
+# seats (all of them unless specified otherwise) are played by the
+# caller, the others by RandomBot. At each step the caller is given,
+# for each table, the observation of the controlled player in
+# position as a row of NumPy arrays, including the mask of the legal
+# actions (from possibleActions), and answers with one action (and
+# raise amount) per table. A finished hand is rewarded with the chips
+# won or lost by each seat and the next hand is dealt at once.
+#
+#   env = PokerBatchEnv(tables = 64)
+#   observations = env.reset()
+#   while training:
+#       actions = policy(observations)  # indexes in ACTIONS, legal if observations["mask"] allows them
+#       (observations, rewards, dones) = env.step(actions, amounts)
+#
+# The observations returned by each step are new arrays: they can be
+# kept along with those of the next steps. PokerParallelBatchEnv has
+# the same interface and spreads the tables over worker processes.
+#
+import multiprocessing
+from os import path
+
+import numpy
+
+from pokerengine.pokersimulator import PokerTableSimulator
+from pokerengine.pokerexport import cards2row, BOARD_WIDTH, POCKET_WIDTH
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerenv')
+
+FOLD = 0
+CHECK = 1
+CALL = 2
+RAISE = 3
+ACTIONS = ("fold", "check", "call", "raise")
+
+#
+# (field, dtype, width): a field with a width holds a fixed size array
+# per table (cards padded with PokerCards.NOCARD, one boolean per
+# action for the mask). The fields of a table without a controlled
+# player in position are 0.
+#
+OBSERVATION_FIELDS = (
+    ("serial", "int32", None),
+    ("position", "int8", None),
+    ("round", "int8", None),
+    ("pocket", "uint8", POCKET_WIDTH),
+    ("board", "uint8", BOARD_WIDTH),
+    ("money", "int64", None),
+    ("bet", "int64", None),
+    ("pot", "int64", None),
+    ("to_call", "int64", None),
+    ("min_raise", "int64", None),
+    ("max_raise", "int64", None),
+    ("players", "int8", None),
+    ("mask", "bool", len(ACTIONS)),
+)
+
+def observations_allocate(tables):
+    return dict((field, numpy.zeros((tables, width) if width else (tables,), dtype = dtype)) for (field, dtype, width) in OBSERVATION_FIELDS)
+
+class PokerEnvTable(PokerTableSimulator):
+
+    def __init__(self, variant, betting_structure, dirs, players = 6, seed = 1, controlled = None):
+        PokerTableSimulator.__init__(self, variant, betting_structure, dirs, players = players, seed = seed)
+        game = self.game
+        game.log_debug = False
+        game.unregisterCallback(self.event)
+        self.players = players
+        self.controlled = set(controlled or xrange(1, players + 1))
+        for serial in self.controlled:
+            game.interactivePlayer(serial)
+            game.autoBlindAnte(serial)
+        self.illegal = 0
+
+    def serialInPosition(self):
+        """Return the controlled player in position, 0 if there is none."""
+        game = self.game
+        serial = game.getSerialInPosition() if game.isRunning() else 0
+        return serial if serial in self.controlled else 0
+
+    def newHand(self):
+        self.refill()
+        if self.game.sitCount() < 2:
+            raise UserWarning("table %d: less than two players can sit" % self.game.id)
+        self.hands += 1
+        self.game.beginTurn(self.hands)
+
+    def reward(self, rewards):
+        if self.game.showdown_stack:
+            for (serial, delta) in self.game.showdown_stack[0]['serial2delta'].iteritems():
+                rewards[serial - 1] += delta
+
+    def advance(self, rewards):
+        """Deal hands until a controlled player is in position. The chips
+        won by each seat in the hands that ended are added to rewards."""
+        while not self.serialInPosition():
+            if self.game.isEndOrNull():
+                if self.hands:
+                    self.reward(rewards)
+                self.newHand()
+            elif not self.game.isRunning() or self.game.isBlindAnteRound():
+                raise UserWarning("table %d: hand %d is stuck in state %s" % (self.game.id, self.hands, self.game.state))
+            else:
+                return
+
+    def act(self, action, amount):
+        """The controlled player in position plays action, replaced by
+        check or fold if it is not legal."""
+        game = self.game
+        serial = game.getSerialInPosition()
+        possible = game.possibleActions(serial)
+        if action < 0 or action >= len(ACTIONS) or ACTIONS[action] not in possible:
+            self.illegal += 1
+            action = CHECK if "check" in possible else FOLD
+        if action == FOLD:
+            game.fold(serial)
+        elif action == CHECK:
+            game.check(serial)
+        elif action == CALL:
+            game.call(serial)
+        else:
+            (min_raise, max_raise, to_call) = game.betLimitsForSerial(serial)
+            game.callNraise(serial, min(max(amount, min_raise), max_raise))
+
+    def observe(self, observations, index):
+        game = self.game
+        serial = self.serialInPosition()
+        for (field, dtype, width) in OBSERVATION_FIELDS:
+            observations[field][index] = 0
+        if not serial:
+            return
+        player = game.getPlayer(serial)
+        (min_raise, max_raise, to_call) = game.betLimitsForSerial(serial)
+        possible = game.possibleActions(serial)
+        observations["serial"][index] = serial
+        observations["position"][index] = game.position
+        observations["round"][index] = game.current_round
+        observations["pocket"][index] = cards2row(player.hand.tolist(True), POCKET_WIDTH)
+        observations["board"][index] = cards2row(game.board.tolist(True), BOARD_WIDTH)
+        observations["money"][index] = player.money
+        observations["bet"][index] = player.bet
+        observations["pot"][index] = game.potAndBetsAmount()
+        observations["to_call"][index] = to_call
+        observations["min_raise"][index] = min_raise
+        observations["max_raise"][index] = max_raise
+        observations["players"][index] = len(game.playersNotFold())
+        observations["mask"][index] = [name in possible for name in ACTIONS]
+
+class PokerBatchEnv:
+
+    def __init__(self, tables, variant = "holdem", betting_structure = "1-2_20-200_limit", dirs = None, players = 6, controlled = None, seed = 1):
+        if dirs is None:
+            dirs = [path.join(path.dirname(path.realpath(__file__)), "../conf"), "/usr/share/poker-engine/conf"]
+        self.players = players
+        self.tables = []
+        for index in xrange(tables):
+            table = PokerEnvTable(variant, betting_structure, dirs, players = players, seed = seed + index, controlled = controlled)
+            table.game.id = index + 1
+            self.tables.append(table)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def observe(self):
+        """Return the observations of the tables, in arrays of their own
+        that the next steps do not change."""
+        observations = observations_allocate(len(self.tables))
+        for (index, table) in enumerate(self.tables):
+            table.observe(observations, index)
+        return observations
+
+    def reset(self):
+        """Deal the first hand of each table and return the observations."""
+        rewards = numpy.zeros((len(self.tables), self.players), dtype = "int64")
+        for (index, table) in enumerate(self.tables):
+            table.advance(rewards[index])
+        return self.observe()
+
+    def step(self, actions, amounts = None):
+        """Play one action per table (ignored for the tables without a
+        controlled player in position) and return (observations,
+        rewards, dones): the chips won by each seat (indexed by serial
+        - 1) and whether hands ended at each table since the last step."""
+        rewards = numpy.zeros((len(self.tables), self.players), dtype = "int64")
+        dones = numpy.zeros(len(self.tables), dtype = "bool")
+        for (index, table) in enumerate(self.tables):
+            hands = table.hands
+            if table.serialInPosition():
+                table.act(int(actions[index]), int(amounts[index]) if amounts is not None else 0)
+            table.advance(rewards[index])
+            dones[index] = table.hands != hands
+        return (self.observe(), rewards, dones)
+
+    def stats(self):
+        return {
+            'hands': sum([table.hands for table in self.tables]),
+            'illegal': sum([table.illegal for table in self.tables]),
+        }
+
+    def close(self):
+        pass
+
+def env_worker(connection, args, kwargs):
+    env = PokerBatchEnv(*args, **kwargs)
+    try:
+        while True:
+            message = connection.recv()
+            command = message[0]
+            if command == "reset":
+                connection.send(env.reset())
+            elif command == "step":
+                connection.send(env.step(*message[1:]))
+            elif command == "stats":
+                connection.send(env.stats())
+            elif command == "close":
+                break
+    finally:
+        connection.close()
+
+class PokerParallelBatchEnv:
+    """PokerBatchEnv with the tables spread over processes (one per core
+    unless specified otherwise). Table i is seeded with seed + i, as it
+    is in PokerBatchEnv."""
+
+    def __init__(self, tables, processes = None, variant = "holdem", betting_structure = "1-2_20-200_limit", dirs = None, players = 6, controlled = None, seed = 1):
+        processes = max(1, min(processes or multiprocessing.cpu_count(), tables))
+        self.players = players
+        self.slices = []
+        self.connections = []
+        self.workers = []
+        start = 0
+        for index in xrange(processes):
+            count = tables / processes + (1 if index < tables % processes else 0)
+            (connection, worker_connection) = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target = env_worker, args = (
+                worker_connection,
+                (count, variant, betting_structure, dirs, players, controlled, seed + start),
+                {}
+            ))
+            worker.daemon = True
+            worker.start()
+            worker_connection.close()
+            self.slices.append(slice(start, start + count))
+            self.connections.append(connection)
+            self.workers.append(worker)
+            start += count
+        self.count = tables
+
+    def __len__(self):
+        return self.count
+
+    def merge(self, observations):
+        return dict((field, numpy.concatenate([observation[field] for observation in observations])) for (field, dtype, width) in OBSERVATION_FIELDS)
+
+    def reset(self):
+        for connection in self.connections:
+            connection.send(("reset",))
+        return self.merge([connection.recv() for connection in self.connections])
+
+    def step(self, actions, amounts = None):
+        for (connection, part) in zip(self.connections, self.slices):
+            connection.send(("step", actions[part], amounts[part] if amounts is not None else None))
+        results = [connection.recv() for connection in self.connections]
+        return (
+            self.merge([result[0] for result in results]),
+            numpy.concatenate([result[1] for result in results]),
+            numpy.concatenate([result[2] for result in results]),
+        )
+
+    def stats(self):
+        for connection in self.connections:
+            connection.send(("stats",))
+        stats = {}
+        for connection in self.connections:
+            for (key, value) in connection.recv().iteritems():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(("close",))
+            except IOError:
+                pass
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
+        self.workers = []
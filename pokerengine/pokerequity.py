@@ -0,0 +1,293 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Preflop equity tables. Before the board is dealt, the equity of a
+# pocket against opponents holding unknown cards only depends on the
+# class of the pocket (the pockets that are the same but for a
+# permutation of the suits: 169 for holdem, 16432 for omaha) and on
+# the number of opponents. The tables are computed once with
+# poker-eval and PokerGame.handEV reads them, memory mapped, instead
+# of running a simulation:
+#
+#   python -m pokerengine.pokerequity --variant=holdem --iterations=200000 --output=conf/equity.holdem.bin
+#
+# The file holds the header, the canonical pocket of each class (one
+# byte per card) and, for each class, the ev (0 to 1000, as returned
+# by poker-eval) against 1 to max opponents as unsigned shorts.
+#
+# The other evaluations of handEV are kept in EQUITY_CACHE, an LRU
+# cache keyed by the cards up to a permutation of the suits, and are
+# enumerated exhaustively (hence exact and deterministic) when there
+# are no more ways to deal the unknown cards than iterations.
+#
+import sys, getopt, mmap, struct
+from collections import OrderedDict
+from itertools import combinations, permutations
+from timeit import default_timer
+
+from pokerengine.pokercards import PokerCards
+from pokerengine.pokerengineconfig import Config
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerequity')
+
+MAGIC = "PKEQ"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxI")
+EV = struct.Struct("<H")
+
+POCKET_SIZES = {
+    "holdem": 2,
+    "omaha": 4,
+    "omaha8": 4,
+}
+BOARD_SIZE = 5
+NOCARD = PokerCards.NOCARD
+MAX_OPPONENTS = 9
+
+SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+
+def canonical(cards):
+    """Return the smallest of the sorted pockets that only differ from
+    cards by a permutation of the suits (a card is rank + 13 * suit)."""
+    if len(cards) == 2:
+        (low, high) = (cards[0] % 13, cards[1] % 13)
+        if low > high:
+            (low, high) = (high, low)
+        if cards[0] / 13 == cards[1] / 13:
+            return (low, high)
+        return (low, 13 + high)
+    best = None
+    for permutation in SUIT_PERMUTATIONS:
+        key = tuple(sorted([permutation[card / 13] * 13 + card % 13 for card in cards]))
+        if best is None or key < best:
+            best = key
+    return best
+
+def pocket_classes(pocket_size):
+    """Return the sorted list of the canonical pockets of pocket_size cards."""
+    return sorted(set(canonical(pocket) for pocket in combinations(xrange(52), pocket_size)))
+
+class PokerEquityTable:
+
+    def __init__(self, path):
+        input = open(path, "rb")
+        try:
+            self.data = mmap.mmap(input.fileno(), 0, access = mmap.ACCESS_READ)
+        finally:
+            input.close()
+        (magic, version, self.pocket_size, self.max_opponents, count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version > VERSION:
+            raise UserWarning("%s is not a version %d equity table" % (path, VERSION))
+        self.path = path
+        offset = HEADER.size
+        self.class2index = {}
+        for index in xrange(count):
+            self.class2index[tuple(ord(card) for card in self.data[offset:offset + self.pocket_size])] = index
+            offset += self.pocket_size
+        self.evs_offset = offset
+
+    def ev(self, cards, opponents):
+        """Return the ev of the pocket cards against opponents holding
+        unknown cards, None if the table does not know."""
+        if len(cards) != self.pocket_size or not 1 <= opponents <= self.max_opponents:
+            return None
+        index = self.class2index.get(canonical(cards))
+        if index is None:
+            return None
+        return EV.unpack_from(self.data, self.evs_offset + (index * self.max_opponents + opponents - 1) * EV.size)[0]
+
+#
+# (dirs, variant) => PokerEquityTable or None if there is none
+#
+EQUITY_TABLES = {}
+
+def get_table(dirs, variant):
+    key = (tuple(dirs), variant)
+    if key not in EQUITY_TABLES:
+        table = None
+        path = Config(dirs).lookup("equity.%s.bin" % variant) if variant in POCKET_SIZES else None
+        if path:
+            try:
+                table = PokerEquityTable(path)
+            except Exception, e:
+                log.warn("ignore equity table %s: %s", path, e)
+        EQUITY_TABLES[key] = table
+    return EQUITY_TABLES[key]
+
+class PokerEquityCache:
+    """Least recently used cache of the evs computed by
+    PokerGame.handEV, shared by all the games of the process. A size
+    of 0 disables it."""
+
+    def __init__(self, size = 10000):
+        self.size = size
+        self.entries = OrderedDict()
+        self.resetStats()
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def resize(self, size):
+        self.size = size
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+
+    def evict(self):
+        while len(self.entries) > self.size:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def get(self, key):
+        value = self.entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries[key] = value
+        return value
+
+    def set(self, key, value):
+        if self.size > 0:
+            self.entries[key] = value
+            self.evict()
+
+EQUITY_CACHE = PokerEquityCache()
+
+def cache_key(variant, pockets, board, iterations):
+    """Return the key of an evaluation: the cards of each pocket and of
+    the board are sorted and the suits renamed so that evaluations
+    that only differ by a permutation of the suits share the key. The
+    order of the pockets is kept since the evs are returned in that
+    order."""
+    best = None
+    for permutation in SUIT_PERMUTATIONS:
+        rename = lambda cards: tuple(sorted([card if card == NOCARD else permutation[card / 13] * 13 + card % 13 for card in cards]))
+        key = (tuple([rename(pocket) for pocket in pockets]), rename(board))
+        if best is None or key < best:
+            best = key
+    return (variant, iterations) + best
+
+def outcomes(pockets, board):
+    """Return the number of ways to deal the unknown cards of the
+    pockets and the board."""
+    cards = list(board)
+    for pocket in pockets:
+        cards.extend(pocket)
+    deck = 52 - len([card for card in cards if card != NOCARD])
+    count = 1
+    for slots in list(pockets) + [board]:
+        missing = list(slots).count(NOCARD)
+        count *= combinations_count(deck, missing)
+        deck -= missing
+    return count
+
+def combinations_count(n, k):
+    if k < 0 or k > n:
+        return 0
+    count = 1
+    for i in xrange(k):
+        count = count * (n - i) / (i + 1)
+    return count
+
+def build(variant, output, iterations = 100000, max_opponents = MAX_OPPONENTS, evaluator = None, progress = None):
+    """Compute the ev of every pocket class against 1 to max_opponents
+    with poker-eval and write the table to output."""
+    if evaluator is None:
+        from pokereval import PokerEval
+        evaluator = PokerEval()
+    pocket_size = POCKET_SIZES[variant]
+    classes = pocket_classes(pocket_size)
+    unknown = [NOCARD] * pocket_size
+    board = [NOCARD] * BOARD_SIZE
+    evs = []
+    for (index, pocket) in enumerate(classes):
+        for opponents in xrange(1, max_opponents + 1):
+            result = evaluator.poker_eval(
+                game = variant,
+                pockets = [list(pocket)] + [unknown] * opponents,
+                board = board,
+                fill_pockets = 1,
+                iterations = iterations
+            )
+            evs.append(EV.pack(result["eval"][0]["ev"]))
+        if progress:
+            progress(index + 1, len(classes))
+    file = open(output, "wb")
+    try:
+        file.write(HEADER.pack(MAGIC, VERSION, pocket_size, max_opponents, len(classes)))
+        file.write("".join(["".join(map(chr, pocket)) for pocket in classes]))
+        file.write("".join(evs))
+    finally:
+        file.close()
+    return len(classes)
+
+def usage():
+    print """
+python -m pokerengine.pokerequity --output=<file> [--variant=holdem] [--iterations=100000]
+                                  [--opponents=9] [--help]
+
+  --variant     holdem, omaha or omaha8
+  --output      the table, to be installed as equity.<variant>.bin in a conf directory
+"""
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "h", ["help", "variant=", "iterations=", "opponents=", "output="])
+    except getopt.GetoptError:
+        usage()
+        return 2
+    variant = "holdem"
+    iterations = 100000
+    max_opponents = MAX_OPPONENTS
+    output = None
+    for (option, value) in opts:
+        if option in ("-h", "--help"):
+            usage()
+            return 0
+        elif option == "--variant":
+            variant = value
+        elif option == "--iterations":
+            iterations = int(value)
+        elif option == "--opponents":
+            max_opponents = int(value)
+        elif option == "--output":
+            output = value
+    if not output or variant not in POCKET_SIZES:
+        usage()
+        return 2
+    start = default_timer()
+    def progress(done, total):
+        sys.stderr.write("\r%d/%d classes, %.0fs" % (done, total, default_timer() - start))
+    count = build(variant, output, iterations, max_opponents, progress = progress)
+    sys.stderr.write("\n")
+    print "%s: %d classes of %s pockets against 1 to %d opponents" % (output, count, variant, max_opponents)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
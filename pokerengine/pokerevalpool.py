@@ -0,0 +1,160 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Process pool running the Monte Carlo simulations of poker-eval. The
+# iterations of an evaluation are split in chunks, each run by a
+# worker after seeding its random generators, and the results are
+# merged into the poker_eval format (the ev being the average of the
+# chunks weighted by their iterations).
+#
+#   game.eval_pool = PokerEvalPool(processes = 4)
+#   ev = game.handEV(serial, 100000)
+#   future = game.handEVAsync(serial, 100000)
+#   ...
+#   if future.ready(): ev = future.get()
+#
+import multiprocessing
+from random import Random
+
+try:
+    import ctypes, ctypes.util
+    LIBC = ctypes.CDLL(ctypes.util.find_library("c"))
+except Exception:
+    LIBC = None
+
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerevalpool')
+
+#
+# the poker-eval instance of a worker process
+#
+EVALUATOR = None
+
+def seed_random(seed):
+    """poker-eval draws its samples with the C library generator, which
+    a forked worker inherits from its parent: reseed it for each chunk
+    so that the chunks are independent."""
+    if LIBC is not None:
+        for name in ("srand", "srandom"):
+            function = getattr(LIBC, name, None)
+            if function is not None:
+                function(seed)
+
+def chunk_eval(seed, kwargs):
+    global EVALUATOR
+    if EVALUATOR is None:
+        from pokereval import PokerEval
+        EVALUATOR = PokerEval()
+    seed_random(seed)
+    return EVALUATOR.poker_eval(**kwargs)
+
+def split_iterations(iterations, chunks):
+    """Return the iterations of each of the chunks, adding up to iterations."""
+    (size, remainder) = divmod(iterations, chunks)
+    return [size + 1 if index < remainder else size for index in xrange(chunks)]
+
+def merge_evals(results, weights):
+    """Merge the poker_eval results of the chunks: the ev is averaged
+    with the weights (the iterations of each chunk), the counts are
+    added."""
+    total = float(sum(weights)) or 1.0
+    merged = {'eval': []}
+    if 'info' in results[0]:
+        info = results[0]['info']
+        merged['info'] = (sum([result['info'][0] for result in results]),) + tuple(info[1:])
+    for evals in zip(*[result['eval'] for result in results]):
+        merged_eval = {}
+        for name in evals[0]:
+            if name == 'ev':
+                merged_eval[name] = int(round(sum([ev[name] * weight for (ev, weight) in zip(evals, weights)]) / total))
+            else:
+                merged_eval[name] = sum([ev[name] for ev in evals])
+        merged['eval'].append(merged_eval)
+    return merged
+
+class PokerEvalFuture:
+    """The result of an evaluation running in the pool: ready() tells
+    if it is available and get() waits for it. The results of the
+    chunks are merged and passed through then, if any."""
+
+    def __init__(self, results = (), merge = None, then = None, value = None):
+        self.results = results
+        self.merge = merge
+        self.then = then
+        self.done = not results
+        self.value = value
+
+    def ready(self):
+        return self.done or all([result.ready() for result in self.results])
+
+    def get(self, timeout = None):
+        if not self.done:
+            value = self.merge([result.get(timeout) for result in self.results])
+            if self.then:
+                value = self.then(value)
+            self.value = value
+            self.done = True
+            self.results = ()
+        return self.value
+
+class PokerEvalPool:
+
+    def __init__(self, processes = None, min_iterations = 20000, min_chunk = 5000, seed = None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.min_iterations = min_iterations
+        self.min_chunk = min_chunk
+        self.random = Random(seed)
+        self.pool = None
+
+    def getPool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.processes)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def isWorthIt(self, iterations):
+        """True if a simulation of iterations is worth sending to the pool
+        rather than running in the calling process."""
+        return iterations >= self.min_iterations
+
+    def poker_eval_async(self, then = None, **kwargs):
+        """Same arguments as PokerEval.poker_eval, return a PokerEvalFuture."""
+        iterations = kwargs.get('iterations', 0)
+        if iterations > 0:
+            chunks = max(1, min(self.processes, iterations / self.min_chunk))
+        else:
+            #
+            # an exhaustive enumeration cannot be split
+            #
+            chunks = 1
+        weights = split_iterations(iterations, chunks) if iterations > 0 else [1]
+        pool = self.getPool()
+        results = []
+        for weight in weights:
+            chunk = dict(kwargs)
+            if iterations > 0:
+                chunk['iterations'] = weight
+            results.append(pool.apply_async(chunk_eval, (self.random.randint(1, 2 ** 31 - 1), chunk)))
+        log.debug("poker_eval of %d iterations in %d chunks", iterations, chunks)
+        return PokerEvalFuture(results, lambda values: merge_evals(values, weights), then)
+
+    def poker_eval(self, **kwargs):
+        return self.poker_eval_async(**kwargs).get()
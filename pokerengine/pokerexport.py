@@ -0,0 +1,323 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Columnar export of turn histories for analytics. Requires NumPy.
+#
+# The histories are turned into four tables: hands, actions,
+# showdowns (the best hands of the showdown stack) and players (the
+# chips, delta, share, rake and money of each player). Each column of
+# each table is written in chunks of at most chunk_size rows, one .npy
+# file per column and chunk, so that the memory used does not depend
+# on the number of histories. The strings (variant, round names ...)
+# are stored as codes in a dictionary saved in meta.json.
+#
+#   exporter = PokerHistoryExporter("/tmp/export")
+#   exporter.export(histories)
+#   exporter.close()
+#   store = PokerHistoryStore("/tmp/export")
+#   for chunk in store.chunks("actions", ["serial", "amount"]):
+#       total += chunk["amount"].sum()
+#
+import os
+from os import path
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import numpy
+
+from pokerengine.pokergame import history2fields, GAME_STATE_BLIND_ANTE
+from pokerengine.pokercards import PokerCards, card_value
+
+VERSION = 1
+
+ACTION_EVENTS = ("blind", "ante", "call", "raise", "check", "fold", "all-in")
+
+BOARD_WIDTH = 5
+POCKET_WIDTH = 7
+BEST_WIDTH = 5
+
+#
+# (column, dtype, width): a column with a width holds a fixed size
+# array per row (cards padded with PokerCards.NOCARD). The string
+# columns are int16 codes.
+#
+TABLES = {
+    "hands": (
+        ("hand_serial", "int64", None),
+        ("level", "int32", None),
+        ("hands_count", "int32", None),
+        ("time", "float64", None),
+        ("variant", "string", None),
+        ("betting_structure", "string", None),
+        ("dealer", "int16", None),
+        ("players", "int16", None),
+        ("pot", "int64", None),
+        ("rake", "int64", None),
+        ("foldwin", "bool", None),
+        ("board", "uint8", BOARD_WIDTH),
+    ),
+    "actions": (
+        ("hand_serial", "int64", None),
+        ("sequence", "int32", None),
+        ("round", "string", None),
+        ("action", "string", None),
+        ("serial", "int64", None),
+        ("amount", "int64", None),
+        ("dead", "int64", None),
+    ),
+    "showdowns": (
+        ("hand_serial", "int64", None),
+        ("serial", "int64", None),
+        ("side", "string", None),
+        ("value", "int64", None),
+        ("hand", "string", None),
+        ("cards", "uint8", BEST_WIDTH),
+    ),
+    "players": (
+        ("hand_serial", "int64", None),
+        ("serial", "int64", None),
+        ("chips", "int64", None),
+        ("delta", "int64", None),
+        ("share", "int64", None),
+        ("rake", "int64", None),
+        ("money", "int64", None),
+        ("pocket", "uint8", POCKET_WIDTH),
+    ),
+}
+
+STRING_DTYPE = "int16"
+
+def cards2row(cards, width):
+    """Return the card values padded to width with PokerCards.NOCARD."""
+    values = [card if card == PokerCards.NOCARD else card_value(card) for card in cards[:width]]
+    return values + [PokerCards.NOCARD] * (width - len(values))
+
+def split_hands(events):
+    """Group a flat stream of events (as read by
+    pokerhistory.HistoryReader for instance) into one history per hand,
+    each starting with its game event."""
+    history = []
+    for event in events:
+        if event[0] == "game" and history:
+            yield history
+            history = []
+        history.append(event)
+    if history:
+        yield history
+
+class PokerHistoryTable:
+    """Rows waiting to be written to the chunks of a table."""
+
+    def __init__(self, directory, name, chunk_size):
+        self.directory = path.join(directory, name)
+        if not path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.name = name
+        self.columns = TABLES[name]
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.chunks = 0
+        self.rows = 0
+        self.strings = dict((column, []) for (column, dtype, width) in self.columns if dtype == "string")
+        self.string2code = dict((column, {}) for column in self.strings)
+
+    def code(self, column, string):
+        codes = self.string2code[column]
+        code = codes.get(string)
+        if code is None:
+            code = codes[string] = len(self.strings[column])
+            self.strings[column].append(string)
+        return code
+
+    def append(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        values = zip(*self.pending)
+        for index in xrange(len(self.columns)):
+            (column, dtype, width) = self.columns[index]
+            array = numpy.array(values[index], dtype = STRING_DTYPE if dtype == "string" else dtype)
+            numpy.save(chunk_path(self.directory, column, self.chunks), array)
+        self.rows += len(self.pending)
+        self.chunks += 1
+        self.pending = []
+
+    def meta(self):
+        return {
+            'columns': [list(column) for column in self.columns],
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'strings': self.strings,
+        }
+
+def chunk_path(directory, column, chunk):
+    return path.join(directory, "%s.%06d.npy" % (column, chunk))
+
+class PokerHistoryExporter:
+
+    def __init__(self, directory, chunk_size = 65536):
+        self.directory = directory
+        self.tables = dict((name, PokerHistoryTable(directory, name, chunk_size)) for name in TABLES)
+        self.hands = 0
+
+    def add(self, history):
+        """Append the rows of one hand history to the tables."""
+        hands = self.tables["hands"]
+        actions = self.tables["actions"]
+        hand_serial = None
+        game = None
+        round_name = GAME_STATE_BLIND_ANTE
+        board = ()
+        pockets = {}
+        rake = 0
+        game_state = None
+        sequence = 0
+        for (event_type, fields) in history2fields(history):
+            if event_type == "game":
+                game = fields
+                hand_serial = game["hand_serial"]
+            elif event_type == "round":
+                (round_name, board, pockets) = (fields["name"], fields["board"], fields["pockets"])
+            elif event_type == "showdown":
+                (board, pockets) = (fields["board"], fields["pockets"])
+            elif event_type in ACTION_EVENTS:
+                actions.append((
+                    hand_serial, sequence,
+                    actions.code("round", round_name), actions.code("action", event_type),
+                    fields["serial"], fields.get("amount", 0), fields.get("dead", 0),
+                ))
+                sequence += 1
+            elif event_type == "rake":
+                rake = fields["amount"]
+            elif event_type == "end":
+                if fields["game_state"]:
+                    game_state = fields["game_state"]
+        if game is None:
+            return
+        hands.append((
+            hand_serial, game["level"], game["hands_count"], game["time"],
+            hands.code("variant", game["variant"]), hands.code("betting_structure", game["betting_structure"]),
+            game["dealer"], len(game["player_list"]),
+            game_state["pot"] if game_state else 0, rake,
+            bool(game_state and game_state["foldwin"]),
+            cards2row(board.cards if board else (), BOARD_WIDTH),
+        ))
+        self.addPlayers(hand_serial, game, game_state, pockets)
+        if game_state:
+            self.addShowdowns(hand_serial, game_state)
+        self.hands += 1
+
+    def addPlayers(self, hand_serial, game, game_state, pockets):
+        players = self.tables["players"]
+        serial2chips = game["serial2chips"]
+        if game_state:
+            serial2delta = game_state["serial2delta"]
+            serial2share = game_state["serial2share"]
+            serial2rake = game_state["serial2rake"]
+            serial2money = game_state["serial2money"]
+        else:
+            serial2delta = serial2share = serial2rake = serial2money = {}
+        for serial in sorted(set(serial2chips) | set(serial2delta)):
+            pocket = pockets.get(serial)
+            players.append((
+                hand_serial, serial,
+                serial2chips.get(serial, 0), serial2delta.get(serial, 0), serial2share.get(serial, 0),
+                serial2rake.get(serial, 0), serial2money.get(serial, 0),
+                cards2row(pocket.cards if pocket else (), POCKET_WIDTH),
+            ))
+
+    def addShowdowns(self, hand_serial, game_state):
+        showdowns = self.tables["showdowns"]
+        for (serial, sides) in sorted(game_state["serial2best"].iteritems()):
+            for (side, (value, best)) in sorted(sides.iteritems()):
+                showdowns.append((
+                    hand_serial, serial, showdowns.code("side", side),
+                    value, showdowns.code("hand", best[0]),
+                    cards2row(best[1:], BEST_WIDTH),
+                ))
+
+    def export(self, histories):
+        """Consume histories, an iterable of hand histories."""
+        for history in histories:
+            self.add(history)
+        return self
+
+    def close(self):
+        """Write the rows left and the meta data, without which the
+        store cannot be read."""
+        for table in self.tables.itervalues():
+            table.flush()
+        meta = {
+            'version': VERSION,
+            'hands': self.hands,
+            'tables': dict((name, table.meta()) for (name, table) in self.tables.iteritems()),
+        }
+        output = open(path.join(self.directory, "meta.json"), "w")
+        json.dump(meta, output, indent = 1, sort_keys = True)
+        output.close()
+
+def export(histories, directory, chunk_size = 65536):
+    """Export histories to directory and return the number of hands."""
+    exporter = PokerHistoryExporter(directory, chunk_size)
+    exporter.export(histories)
+    exporter.close()
+    return exporter.hands
+
+class PokerHistoryStore:
+    """Read the tables written by PokerHistoryExporter, the chunks
+    being memory mapped."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = json.load(open(path.join(directory, "meta.json")))
+        if self.meta['version'] > VERSION:
+            raise UserWarning("%s: export version %d is newer than %d" % (directory, self.meta['version'], VERSION))
+
+    def rowCount(self, table):
+        return self.meta['tables'][table]['rows']
+
+    def columnNames(self, table):
+        return [column[0] for column in self.meta['tables'][table]['columns']]
+
+    def strings(self, table, column):
+        """Return the strings of a string column, indexed by code."""
+        return self.meta['tables'][table]['strings'][column]
+
+    def chunks(self, table, columns = None):
+        """Yield, for each chunk of table, a dictionary of the columns
+        (all of them unless specified otherwise) as read only memory
+        mapped arrays."""
+        columns = columns or self.columnNames(table)
+        directory = path.join(self.directory, table)
+        for chunk in xrange(self.meta['tables'][table]['chunks']):
+            yield dict((column, numpy.load(chunk_path(directory, column, chunk), mmap_mode = 'r')) for column in columns)
+
+    def column(self, table, column):
+        """Return the whole column in memory."""
+        arrays = [chunk[column] for chunk in self.chunks(table, [column])]
+        if arrays:
+            return numpy.concatenate(arrays)
+        for (name, dtype, width) in self.meta['tables'][table]['columns']:
+            if name == column:
+                return numpy.zeros((0, width) if width else (0,), dtype = STRING_DTYPE if dtype == "string" else dtype)
+        raise KeyError(column)
@@ -29,7 +29,6 @@
 #
 
 import sys
-import re
 import platform
 
 import pokereval
@@ -38,18 +37,21 @@ from pokerengine import log as engine_log
 log = engine_log.get_child('pokergame')
 
 from pokerengine.pokercards import *
-from pokerengine.pokerengineconfig import Config
 from pokerengine.pokerchips import PokerChips
 from pokerengine import pokerrake
+from pokerengine import pokerequity
+from pokerengine.pokerevalpool import PokerEvalFuture
+from pokerengine import pokertemplates
+from pokerengine.pokertemplates import copy_round_info
 from random import Random as Shuffler
+from copy import copy as shallow_copy
+from bisect import bisect_right
 
 import locale
 import gettext
 
 from pprint import pformat
 
-from copy import deepcopy
-from collections import defaultdict
 from functools import wraps
 
 def update_player_last_auto_move(fn):
@@ -112,7 +114,7 @@ gettext.bind_textdomain_codeset('poker-engine', 'UTF-8')
 init_i18n(None)
 
 ABSOLUTE_MAX_PLAYERS = 10
-LEVELS_CACHE = {}
+LEVELS_CACHE = pokertemplates.LEVELS_CACHE
 
 def uniq(elements):
     temp = {}
@@ -125,6 +127,22 @@ def find(fn,seq):
     for item in seq:
         if fn(item): return item
 
+def copy_side_pots(side_pots):
+    """Copy the side_pots of a game down to the contributions of each
+    player, which the betting updates in place."""
+    other = side_pots.copy()
+    if 'contributions' in side_pots:
+        contributions = {}
+        for (key, value) in side_pots['contributions'].iteritems():
+            if key == 'total':
+                contributions[key] = value.copy()
+            else:
+                contributions[key] = dict((pot_index, serial2amount.copy()) for (pot_index, serial2amount) in value.iteritems())
+        other['contributions'] = contributions
+    if 'pots' in side_pots:
+        other['pots'] = [pot[:] for pot in side_pots['pots']]
+    return other
+
 # muck constants
 AUTO_MUCK_NEVER = 0x00
 AUTO_MUCK_WIN = 0x01
@@ -137,21 +155,69 @@ AUTO_POLICY_FOLD = 'fold'
 
 AUTO_POLICY_DEFAULT = AUTO_POLICY_FOLD
 
-class PokerPlayer:
+class PokerPlayer(object):
+
+    #
+    # Thousands of players may be seated in a single process: the
+    # attributes are stored in slots instead of a per instance
+    # dictionary. The __dict__ slot is kept for code that attaches
+    # its own attributes to a player, it is only allocated when used.
+    #
+    __slots__ = (
+        '_log',
+        'serial',
+        'name',
+        'game',
+        'botPlayer',
+        '_fold',
+        'remove_next_turn',
+        '_sit_out',
+        'sit_out_next_turn',
+        'sit_requested',
+        'bot',
+        'auto',
+        'auto_blind_ante',
+        'auto_muck',
+        'auto_policy',
+        'auto_refill',
+        'auto_rebuy',
+        'wait_for',
+        'missed_blind',
+        'missed_big_blind_count',
+        'blind',
+        'buy_in_payed',
+        'ante',
+        'side_pot_index',
+        '_all_in',
+        'seat',
+        'hand',
+        'money',
+        'rebuy_given',
+        '_bet',
+        'dead',
+        'talked_once',
+        'user_data',
+        'raise_count',
+        'action_issued',
+        '__dict__',
+    )
 
-    log = log.get_child('PokerPlayer')
+    #
+    # The slots holding the state of the player, copied by copy(). The
+    # logger is bound to the instance and __dict__ is not an attribute.
+    #
+    STATE_SLOTS = tuple(name for name in __slots__ if name not in ('_log', '__dict__'))
 
-    def __init__(self, serial, name, game, botPlayer):
-        self.log = PokerPlayer.log.get_instance(self, refs=[
-            ('Game', game, lambda game: game.id),
-            ('Hand', game, lambda game: game.hand_serial if game.hand_serial > 1 else None),
-            ('Player', self, lambda player: player.serial)
-        ])
+    class_log = log.get_child('PokerPlayer')
+
+    def __init__(self, serial, name, game, botPlayer = None):
+        self._log = None
         self.serial = serial
         self.name = name if name else "noname"
         self.game = game
         self.botPlayer = botPlayer
-        self.fold = False
+        self._fold = False
+        self._bet = 0
         self.remove_next_turn = False
         self.sit_out = True
         self.sit_out_next_turn = False
@@ -175,45 +241,33 @@ class PokerPlayer:
         self.hand = PokerCards()
         self.money = 0
         self.rebuy_given = 0
-        self.bet = 0
         self.dead = 0
         self.talked_once = False
         self.user_data = None
         self.raise_count = 0
         self.action_issued = False
 
+    def __getLog(self):
+        #
+        # The logger instance is only created when the player logs
+        # something
+        #
+        if self._log is None:
+            self._log = PokerPlayer.class_log.get_instance(self, refs=[
+                ('Game', self.game, lambda game: game.id),
+                ('Hand', self.game, lambda game: game.hand_serial if game.hand_serial > 1 else None),
+                ('Player', self, lambda player: player.serial)
+            ])
+        return self._log
+
+    log = property(__getLog)
+
     def copy(self):
-        other = PokerPlayer(self.serial, self.name, self.game)
-        other.fold = self.fold
-        other.remove_next_turn = self.remove_next_turn
-        other.sit_out = self.sit_out
-        other.sit_out_next_turn = self.sit_out_next_turn
-        other.sit_requested = self.sit_requested
-        other.bot = self.bot
-        other.auto = self.auto
-        other.auto_blind_ante = self.auto_blind_ante
-        other.auto_muck = self.auto_muck
-        other.auto_policy = self.auto_policy
-        other.auto_refill = self.auto_refill
-        other.auto_rebuy = self.auto_rebuy
-        other.wait_for = self.wait_for
-        other.missed_blind = self.missed_blind
-        other.missed_big_blind_count = self.missed_big_blind_count
-        other.blind = self.blind
-        other.buy_in_payed = self.buy_in_payed
-        other.ante = self.ante
-        other.side_pot_index = self.side_pot_index
-        other.all_in = self.all_in
-        other.seat = self.seat
+        other = PokerPlayer.__new__(PokerPlayer)
+        for attribute in PokerPlayer.STATE_SLOTS:
+            setattr(other, attribute, getattr(self, attribute))
+        other._log = None
         other.hand = self.hand.copy()
-        other.money = self.money
-        other.rebuy_given = self.rebuy_given
-        other.bet = self.bet
-        other.dead = self.dead
-        other.talked_once = self.talked_once
-        other.user_data = self.user_data
-        other.raise_count = self.raise_count
-        other.action_issued = self.action_issued
         return other
 
     def __str__(self):
@@ -352,6 +406,64 @@ class PokerPlayer:
         self.missed_blind = None
         self.missed_big_blind_count = 0
 
+    #
+    # The fold, all_in and sit_out flags are mirrored in the
+    # player_indexes of the game the player is registered in
+    # (see PokerGame.addPlayer) and the game keeps running totals
+    # of the bets (see PokerGame.betChanged).
+    #
+    def __registered(self):
+        game = self.game
+        return isinstance(game, PokerGame) and game.serial2player.get(self.serial) is self
+
+    def __index(self, name, value):
+        if self.__registered():
+            if value:
+                self.game.player_indexes[name].add(self.serial)
+            else:
+                self.game.player_indexes[name].discard(self.serial)
+
+    def __getFold(self):
+        return self._fold
+
+    def __setFold(self, fold):
+        previous = self._fold
+        self._fold = fold
+        self.__index('fold', fold)
+        if fold != previous and self.__registered():
+            self.game.betChanged(self, self._bet, previous)
+
+    fold = property(__getFold, __setFold)
+
+    def __getBet(self):
+        return self._bet
+
+    def __setBet(self, bet):
+        previous = self._bet
+        self._bet = bet
+        if bet != previous and self.__registered():
+            self.game.betChanged(self, previous, self._fold)
+
+    bet = property(__getBet, __setBet)
+
+    def __getAllIn(self):
+        return self._all_in
+
+    def __setAllIn(self, all_in):
+        self._all_in = all_in
+        self.__index('all_in', all_in)
+
+    all_in = property(__getAllIn, __setAllIn)
+
+    def __getSitOut(self):
+        return self._sit_out
+
+    def __setSitOut(self, sit_out):
+        self._sit_out = sit_out
+        self.__index('sit_out', sit_out)
+
+    sit_out = property(__getSitOut, __setSitOut)
+
 
 def __historyResolve2messages(game, hands, serial2name, serial2displayed, frame):
     messages = []
@@ -425,31 +537,94 @@ def __historyResolve2messages(game, hands, serial2name, serial2displayed, frame)
     return messages
 
 
+#
+# Names of the fields of each turn_history event type, in the order
+# given to historyAdd. The events are decoded with history2fields.
+#
+HISTORY_EVENT_FIELDS = {
+    "game": ("level", "hand_serial", "hands_count", "time", "variant", "betting_structure", "player_list", "dealer", "serial2chips"),
+    "wait_for": ("serial", "reason"),
+    "player_list": ("player_list",),
+    "round": ("name", "board", "pockets"),
+    "showdown": ("board", "pockets"),
+    "rake": ("amount", "serial2rake"),
+    "position": ("position", "serial"),
+    "blind_request": ("serial", "amount", "dead", "state"),
+    "wait_blind": ("serial",),
+    "rebuy": ("serial", "amount"),
+    "blind": ("serial", "amount", "dead"),
+    "ante_request": ("serial", "amount"),
+    "ante": ("serial", "amount"),
+    "all-in": ("serial",),
+    "call": ("serial", "amount"),
+    "check": ("serial",),
+    "fold": ("serial", "auto"),
+    "raise": ("serial", "amount"),
+    "canceled": ("serial", "amount"),
+    "end": ("winners", "showdown_stack"),
+    "sitOut": ("serial",),
+    "leave": ("seats",),
+    "finish": ("hand_serial",),
+    "muck": ("serials",),
+    "sit": ("serial", "wait_for"),
+    "buyOut": ("serial", "money", "bet"),
+}
+
+#
+# The changes of the players that are not in the turn history: a
+# player added, removed or buying in, sitting out next turn, the auto
+# and bot flags and, when not in the history (the player does not play
+# the hand), sitting in (playerSit) and out (playerSitOut). They are
+# given to the callbacks that list them when registering, after the
+# change, with the arguments of the method.
+#
+PLAYER_EVENTS = frozenset((
+    "addPlayer", "removePlayer", "payBuyIn", "sitOutNextTurn", "playerSit", "playerSitOut",
+    "autoPlayer", "noAutoPlayer", "autoBlindAnte", "noAutoBlindAnte", "autoMuck",
+    "botPlayer", "interactivePlayer",
+))
+
+def history2fields(history):
+    """Yield (event_type, fields) for each event of history, fields
+    being a dictionary of the values of the event named after
+    HISTORY_EVENT_FIELDS, or None if the type is unknown. The fields of
+    an end event also have game_state, the first frame of the showdown
+    stack (None if it is empty), and frames, the frames that follow it
+    (left_over, uncalled and resolve)."""
+    for event in history:
+        event_type = event[0]
+        names = HISTORY_EVENT_FIELDS.get(event_type)
+        if names is None:
+            yield (event_type, None)
+            continue
+        fields = dict(zip(names, event[1:]))
+        if event_type == "end":
+            showdown_stack = fields["showdown_stack"]
+            fields["game_state"] = showdown_stack[0] if showdown_stack else None
+            fields["frames"] = showdown_stack[1:]
+        yield (event_type, fields)
+
 def history2messages(game, history, serial2name=str, pocket_messages=False):
     messages = []
     subject = ''
-    for event in history:
-        event_type = event[0]
-        if event_type == "game":
-            level, hand_serial, hands_count, time, variant, betting_structure, player_list, dealer, serial2chips = event[1:]
+    for (event_type, fields) in history2fields(history):
+        if fields is None:
+            engine_log.warn("history2messages: unknown history type %s", event_type)
+
+        elif event_type == "game":
             subject = _("hand #%(hand_serial)d, %(variant)s, %(betting_structure)s") % {
-                'hand_serial': hand_serial,
-                'variant': _(variant),
-                'betting_structure': betting_structure
+                'hand_serial': fields['hand_serial'],
+                'variant': _(fields['variant']),
+                'betting_structure': fields['betting_structure']
             }
 
         elif event_type == "wait_for":
-            serial, reason = event[1:]
             messages.append(
-                _("%(serial)s waiting for ") % {'serial': serial2name(serial)} +
-                ("late blind" if reason == "late" else "big blind")
+                _("%(serial)s waiting for ") % {'serial': serial2name(fields['serial'])} +
+                ("late blind" if fields['reason'] == "late" else "big blind")
             )
-
-        elif event_type == "player_list":
-            pass
-
         elif event_type == "round":
-            name, board, pockets = event[1:]
+            name, board, pockets = fields['name'], fields['board'], fields['pockets']
             if pockets:
                 messages.append(_("%(name)s, %(len_pockets)d players") % {
                     'name': name,
@@ -469,7 +644,7 @@ def history2messages(game, history, serial2name=str, pocket_messages=False):
                             'card': game.cards2string(pocket)
                         })
         elif event_type == "showdown":
-            board, pockets = event[1:]
+            board, pockets = fields['board'], fields['pockets']
             if board and not board.isEmpty():
                 messages.append(_("Board: %(cards)s") % {
                     'cards': game.cards2string(board)
@@ -482,62 +657,44 @@ def history2messages(game, history, serial2name=str, pocket_messages=False):
                             'cards': game.cards2string(pocket)
                         })
         elif event_type == "rake":
-            amount = event[1]
             messages.append(_("Rake %(amount)s") % {
-                'amount': PokerChips.tostring(amount)
+                'amount': PokerChips.tostring(fields['amount'])
             })
-        elif event_type == "position":
-            pass
-        elif event_type == "blind_request":
-            pass
-        elif event_type == "wait_blind":
-            pass
-        elif event_type == "rebuy":
-            pass
         elif event_type == "blind":
-            serial, amount, dead = event[1:]
-            if dead:
+            if fields['dead']:
                 messages.append(_("%(name)s pays %(amount)s blind and %(dead)d dead") % {
-                    'name': serial2name(serial),
-                    'amount': PokerChips.tostring(amount),
-                    'dead': dead,
+                    'name': serial2name(fields['serial']),
+                    'amount': PokerChips.tostring(fields['amount']),
+                    'dead': fields['dead'],
                 })
             else:
                 messages.append(_("%(name)s pays %(amount)s blind") % {
-                    'name': serial2name(serial),
-                    'amount': PokerChips.tostring(amount),
+                    'name': serial2name(fields['serial']),
+                    'amount': PokerChips.tostring(fields['amount']),
                 })
-        elif event_type == "ante_request":
-            pass
         elif event_type == "ante":
-            serial, amount = event[1:]
             messages.append(_("%(name)s pays %(amount)s ante") % {
-                'name': serial2name(serial),
-                'amount': PokerChips.tostring(amount)
+                'name': serial2name(fields['serial']),
+                'amount': PokerChips.tostring(fields['amount'])
             })
         elif event_type == "all-in":
-            serial = event[1]
-            messages.append(_("%(name)s is all in") % {'name': serial2name(serial)})
+            messages.append(_("%(name)s is all in") % {'name': serial2name(fields['serial'])})
         elif event_type == "call":
-            serial, amount = event[1:]
             messages.append(_("%(name)s calls %(amount)s") % {
-                'name': serial2name(serial),
-                'amount': PokerChips.tostring(amount)
+                'name': serial2name(fields['serial']),
+                'amount': PokerChips.tostring(fields['amount'])
             })
         elif event_type == "check":
-            serial = event[1]
-            messages.append(_("%(name)s checks") % {'name': serial2name(serial)})
+            messages.append(_("%(name)s checks") % {'name': serial2name(fields['serial'])})
         elif event_type == "fold":
-            serial = event[1]
-            messages.append(_("%(name)s folds") % {'name': serial2name(serial)})
+            messages.append(_("%(name)s folds") % {'name': serial2name(fields['serial'])})
         elif event_type == "raise":
-            serial, amount = event[1:]
             messages.append(_("%(name)s raises %(amount)s") % {
-                'name': serial2name(serial),
-                'amount': PokerChips.tostring(amount)
+                'name': serial2name(fields['serial']),
+                'amount': PokerChips.tostring(fields['amount'])
             })
         elif event_type == "canceled":
-            serial, amount = event[1:]
+            serial, amount = fields['serial'], fields['amount']
             if serial > 0 and amount > 0:
                 messages.append(_("turn canceled") + _(" (%(amount)s returned to %(name)s)") % {
                     'amount': PokerChips.tostring(amount),
@@ -546,19 +703,18 @@ def history2messages(game, history, serial2name=str, pocket_messages=False):
             else:
                 messages.append(_("turn canceled"))
         elif event_type == "end":
-            winners, showdown_stack = event[1:]
-            if showdown_stack:
-                game_state = showdown_stack[0]
+            game_state = fields['game_state']
+            if game_state:
                 if game_state['foldwin']:
-                    serial = winners[0]
+                    serial = fields['winners'][0]
                     messages.append(_("%(name)s receives %(amount)s (everyone else folded)") % {
                         'name': serial2name(serial),
                         'amount': PokerChips.tostring(game_state['serial2share'][serial])
                     })
                 else:
                     serial2displayed = {}
-                    hands = showdown_stack[0]['serial2best']
-                    for frame in showdown_stack[1:]:
+                    hands = game_state['serial2best']
+                    for frame in fields['frames']:
                         message = None
                         if frame['type'] == 'left_over':
                             message = _("%(name)s receives %(amount)d odd chips") % {
@@ -573,24 +729,13 @@ def history2messages(game, history, serial2name=str, pocket_messages=False):
                         elif frame['type'] == 'resolve':
                             messages.extend(__historyResolve2messages(game, hands, serial2name, serial2displayed, frame))
                         else:
-                            engine_log.warn("history2messages unexpected showdown_stack frame type %s (%s)", frame['type'], str(frame))
+                            engine_log.warn("history2messages unexpected showdown_stack frame type %s (%s)", frame['type'], frame)
                         if message:
                             messages.append(message)
             else:
                 engine_log.warn("ERROR history2messages ignored empty showdown_stack")
         elif event_type == "sitOut":
-            serial = event[1]
-            messages.append(_("%(name)s sits out") % {'name': serial2name(serial)})
-        elif event_type == "leave":
-            pass
-        elif event_type == "finish":
-            pass
-        elif event_type == "muck":
-            pass
-        elif event_type == "sit":
-            pass
-        else:
-            engine_log.warn("history2messages: unknown history type %s", event_type)
+            messages.append(_("%(name)s sits out") % {'name': serial2name(fields['serial'])})
 
     return (subject, messages)
 
@@ -619,6 +764,18 @@ WON_REGULAR = 3  # turn ended normally
 class PokerGame:
 
     log = log.get_child('PokerGame')
+    #
+    # Set to False (on the class or on an instance) in production:
+    # the debug messages are then skipped at the cost of a single
+    # attribute check and their arguments are never computed.
+    #
+    log_debug = True
+    #
+    # Set to True by pokerreplay to rebuild a game from a history known
+    # to be legal: the actions are not checked, the events are neither
+    # given to the callbacks nor added to the turn history.
+    #
+    trusted = False
 
     def __init__(self, url, is_directing, dirs):
         self.log = PokerGame.log.get_instance(self, refs=[
@@ -627,8 +784,8 @@ class PokerGame:
         ])
         self.id = 0
         self.name = "noname"
-        self.__variant = Config(dirs)
-        self.__betting_structure = Config(dirs)
+        self.__variant = None
+        self.__betting_structure = None
         self.dirs = dirs
         self.url = url
 
@@ -643,6 +800,7 @@ class PokerGame:
         self.blind_info = False
         self.ante_info = False
         self.bet_info = False
+        self.bet_limits = False
         self.unit = 1
         self.buy_in = 0
         self.max_buy_in = 100000000
@@ -671,12 +829,21 @@ class PokerGame:
 
         self.prefix = ""
         self.callbacks = []
+        #
+        # The event types each callback registered for, if not all of them
+        #
+        self.callback_events = {}
 
         self.first_turn = True
 
         self.level_skin = ""
 
         self.eval = pokereval.PokerEval()
+        #
+        # optional pokerevalpool.PokerEvalPool running the handEV
+        # simulations of many iterations in other processes
+        #
+        self.eval_pool = None
         if self.is_directing:
             self.shuffler = Shuffler()
         self.reset()
@@ -685,12 +852,22 @@ class PokerGame:
         self.forced_dealer_seat = -1
 
         self.last_auto_action = {}
+        #
+        # When True, the events of the actions played automatically in
+        # a row (bots, auto and sit out players) are sent to the
+        # callbacks at once, as a single ("auto_actions", events) event
+        #
+        self.batch_auto_actions = False
+        self.__auto_playing = False
+        self.__auto_play_pending = False
+        self.__auto_events = None
 
     def reset(self):
         self.state = GAME_STATE_NULL
         self.win_condition = WON_NULL
         self.current_round = -2
         self.serial2player = {}
+        self.resetPlayerIndexes()
         self.player_list = []
         self.resetSeatsLeft()
         self.dealer = -1
@@ -708,6 +885,14 @@ class PokerGame:
         self.muckable_serials = []
         self.side2winners = {}
         self.serial2best = {}
+        self.best_hand_cache = {}
+        self.readable_hand_cache = {}
+        self.eval_cache_stats = {
+            'best': 0,
+            'best_saved': 0,
+            'readable': 0,
+            'readable_saved': 0,
+        }
         self.showdown_stack = []
         self.side_pots = {}
         self.first_betting_pass = True
@@ -715,6 +900,179 @@ class PokerGame:
         self.turn_history_is_reduced = False
         self.level = 0
 
+    def fork(self, history=True):
+        """
+        Return a copy of the game to look ahead, for instance a bot
+        playing the rest of the hand many times before deciding. The
+        templates, the evaluator and the hand evaluation caches are
+        shared, the state of the table and of the hand is copied. The
+        fork has no callbacks and does not log debug messages: playing
+        it does not change or notify anything about the game. When
+        history is False the turn history of the fork starts empty.
+        """
+        other = shallow_copy(self)
+        other.log_debug = False
+        other.callbacks = []
+        other.callback_events = {}
+        other.__auto_playing = False
+        other.__auto_play_pending = False
+        other.__auto_events = None
+        other.__bets_list = None
+        other.serial2player = {}
+        for (serial, player) in self.serial2player.iteritems():
+            player = player.copy()
+            player.game = other
+            other.serial2player[serial] = player
+        other.player_indexes = dict((name, index.copy()) for (name, index) in self.player_indexes.iteritems())
+        other.__player_set_list = None
+        other.__seat_ring_list = None
+        other.player_list = self.player_list[:]
+        other.seats_left = self.seats_left[:]
+        if 'seats_all' in self.__dict__:
+            other.seats_all = self.seats_all[:]
+        other.board = self.board.copy()
+        if self.round_info:
+            other.round_info = [copy_round_info(info) for info in self.round_info]
+        other.blind_info = self.blind_info and self.blind_info.copy()
+        other.ante_info = self.ante_info and self.ante_info.copy()
+        other.side_pots = copy_side_pots(self.side_pots)
+        other.stats = self.stats.copy()
+        other.stats["flops"] = self.stats["flops"][:]
+        other.stats["pots"] = self.stats["pots"][:]
+        other.winners = self.winners[:]
+        other.muckable_serials = self.muckable_serials[:]
+        other.side2winners = self.side2winners.copy()
+        other.serial2best = self.serial2best.copy()
+        other.showdown_stack = self.showdown_stack[:]
+        other.eval_cache_stats = self.eval_cache_stats.copy()
+        other.last_auto_action = self.last_auto_action.copy()
+        other.turn_history = self.turn_history[:] if history else []
+        if 'deck' in self.__dict__:
+            other.deck = self.deck[:]
+        if 'shuffler' in self.__dict__:
+            if isinstance(self.shuffler, Shuffler):
+                #
+                # copy the state without seeding from os.urandom first,
+                # which is what copying a Random does
+                #
+                other.shuffler = Shuffler.__new__(Shuffler)
+                other.shuffler.setstate(self.shuffler.getstate())
+            else:
+                other.shuffler = shallow_copy(self.shuffler)
+        return other
+
+    def resetPlayerIndexes(self):
+        #
+        # Serials of the players in serial2player for which the
+        # corresponding PokerPlayer flag is set. They are updated
+        # by PokerPlayer each time a flag changes.
+        #
+        self.player_indexes = {
+            'fold': set(),
+            'all_in': set(),
+            'sit_out': set(),
+        }
+        self.__player_set = set()
+        self.__player_set_list = None
+        self.__seat_ring = ()
+        self.__seat_ring_list = None
+        self.resetBets()
+
+    #
+    # Running totals of the bets of the players in player_list:
+    # bets_total is their sum, bets_highest the highest bet of the
+    # players who did not fold and bets_highest_count how many of
+    # them bet that much. PokerPlayer reports each change of a bet or
+    # of a fold flag to betChanged. They are computed again when
+    # player_list is replaced or changes length and when the highest
+    # bet is withdrawn (the bets go to the pot or the player folds),
+    # which happens at most a few times per betting round.
+    #
+    def resetBets(self):
+        self.__bets_list = None
+        self.__bets_length = 0
+        self.bets_total = 0
+        self.bets_highest = 0
+        self.bets_highest_count = 0
+
+    def __betsUpdate(self):
+        player_list = self.player_list
+        if self.__bets_list is player_list and self.__bets_length == len(player_list):
+            return
+        total = 0
+        highest = 0
+        count = 0
+        serial2player = self.serial2player
+        for serial in player_list:
+            player = serial2player.get(serial)
+            if player is None:
+                continue
+            bet = player.bet
+            total += bet
+            if player.fold:
+                continue
+            if bet > highest:
+                highest = bet
+                count = 1
+            elif bet == highest:
+                count += 1
+        self.bets_total = total
+        self.bets_highest = highest
+        self.bets_highest_count = count
+        self.__bets_list = player_list
+        self.__bets_length = len(player_list)
+
+    def betChanged(self, player, bet, fold):
+        """
+        Update the running totals after the bet or the fold flag of
+        player changed. bet and fold are the values before the change.
+        """
+        if self.__bets_list is not self.player_list or self.__bets_length != len(self.player_list):
+            return
+        if player.serial not in self.__playerSet():
+            return
+        self.bets_total += player.bet - bet
+        if not fold and bet == self.bets_highest:
+            self.bets_highest_count -= 1
+        if not player.fold:
+            if player.bet > self.bets_highest:
+                self.bets_highest = player.bet
+                self.bets_highest_count = 1
+            elif player.bet == self.bets_highest:
+                self.bets_highest_count += 1
+        if self.bets_highest_count <= 0:
+            self.__bets_list = None
+
+    def __indexPlayer(self, player):
+        serial = player.serial
+        for (name, value) in (('fold', player.fold), ('all_in', player.all_in), ('sit_out', player.sit_out)):
+            if value:
+                self.player_indexes[name].add(serial)
+            else:
+                self.player_indexes[name].discard(serial)
+
+    def reindexPlayers(self):
+        """
+        Rebuild the player indexes after serial2player is replaced.
+        """
+        self.resetPlayerIndexes()
+        for player in self.serial2player.itervalues():
+            self.__indexPlayer(player)
+
+    def __unindexPlayer(self, serial):
+        for index in self.player_indexes.itervalues():
+            index.discard(serial)
+
+    def __playerSet(self):
+        #
+        # Set of the serials in player_list, rebuilt when player_list
+        # is replaced or its length changes
+        #
+        if self.__player_set_list is not self.player_list or len(self.__player_set) != len(self.player_list):
+            self.__player_set = set(self.player_list)
+            self.__player_set_list = self.player_list
+        return self.__player_set
+
     def open(self):
         self.is_open = True
 
@@ -729,6 +1087,7 @@ class PokerGame:
             self.max_players = 0
         self.resetSeatsLeft()
         self.serial2player = {}
+        self.resetPlayerIndexes()
 
     def seatsLeftCount(self):
         return len(self.seats_left)
@@ -781,13 +1140,13 @@ class PokerGame:
         return \
             not self.isEndOrNull() and \
             serial in self.serial2player and \
-            serial in self.player_list
+            serial in self.__playerSet()
 
     def isPlaying(self, serial):
         return \
             self.isRunning() and \
             serial in self.serial2player and \
-            serial in self.player_list
+            serial in self.__playerSet()
 
     def isInGame(self, serial):
         return \
@@ -813,11 +1172,13 @@ class PokerGame:
         if self.isInTurn(serial) and not (self.isBlindAnteRound() and self.getSerialInPosition() == serial):
             player.sit_out_next_turn = True
             player.sit_requested = False
+            self.runPlayerCallbacks("sitOutNextTurn", serial)
             return False
         elif not self.is_directing:
             player.sit_out_next_turn = True
             player.sit_requested = False
             player.wait_for = False
+            self.runPlayerCallbacks("sitOutNextTurn", serial)
             return False
         else:
             return self.sitOut(serial)
@@ -829,13 +1190,16 @@ class PokerGame:
         if self.is_directing and self.isBlindAnteRound() and self.getSerialInPosition() != serial:
             self.log.inform("sitOut for player %d while paying the blinds although not in position", serial)
             return False
-        if self.isPlaying(serial):
+        playing = self.isPlaying(serial)
+        if playing:
             self.historyAdd("sitOut", serial)
         player.sit_out = True
         player.sit_out_next_turn = False
         player.sit_requested = False
         player.wait_for = False
         player.auto_refill = 0
+        if not playing:
+            self.runPlayerCallbacks("playerSitOut", serial)
         if self.is_directing and self.isBlindAnteRound():
             player.blind = False
             self.updateBlinds()
@@ -885,6 +1249,8 @@ class PokerGame:
             self.dealer_seat = player.seat
         if self.isRunning() and self.isBlindAnteRound():
             self.historyAdd("sit", serial, player.wait_for)
+        else:
+            self.runPlayerCallbacks("playerSit", serial, player.wait_for)
         return True
 
     def sitRequested(self, serial):
@@ -945,7 +1311,7 @@ class PokerGame:
         try:
             return self.serial2player[serial]
         except KeyError:
-            self.log.debug("getPlayer(%d) returned None", serial)
+            if self.log_debug: self.log.debug("getPlayer(%d) returned None", serial)
 
     def getPlayerMoney(self, serial):
         player = self.getPlayer(serial)
@@ -997,28 +1363,33 @@ class PokerGame:
         player = PokerPlayer(serial, name, self, botPlayer)
         self.seats_left.remove(seat)
         self.serial2player[serial] = player
+        self.__indexPlayer(player)
         if seat == -1:
             seat = self.getBestSeat()#self.seats_left[0]
         player.seat = seat
-        self.log.debug("player %d gets seat %d", serial, seat)
+        if self.log_debug: self.log.debug("player %d gets seat %d", serial, seat)
+        self.runPlayerCallbacks("addPlayer", serial, seat, name)
         return player
 
     def botPlayer(self, serial):
         self.serial2player[serial].bot = True
+        self.runPlayerCallbacks("botPlayer", serial)
         self.autoBlindAnte(serial)
         self.autoMuck(serial, AUTO_MUCK_ALWAYS)
         self.autoPlayer(serial)
 
     def interactivePlayer(self, serial):
         self.serial2player[serial].bot = False
+        self.runPlayerCallbacks("interactivePlayer", serial)
         self.noAutoBlindAnte(serial)
         self.autoMuck(serial, AUTO_MUCK_ALWAYS)
         self.noAutoPlayer(serial)
 
     def autoPlayer(self, serial):
-        self.log.debug("autoPlayer: player %d", serial)
+        if self.log_debug: self.log.debug("autoPlayer: player %d", serial)
         player = self.getPlayer(serial)
         player.auto = True
+        self.runPlayerCallbacks("autoPlayer", serial)
         if not self.is_directing:
             return
         if self.isBlindAnteRound():
@@ -1033,10 +1404,11 @@ class PokerGame:
             self.__autoPlay()
 
     def noAutoPlayer(self, serial):
-        self.log.debug("noAutoPlayer: player %d", serial)
+        if self.log_debug: self.log.debug("noAutoPlayer: player %d", serial)
         player = self.getPlayer(serial)
         if player:
             player.auto = False
+            self.runPlayerCallbacks("noAutoPlayer", serial)
             return True
         else:
             return False
@@ -1044,6 +1416,7 @@ class PokerGame:
     def removePlayer(self, serial):
         if self.isInTurn(serial):
             self.serial2player[serial].remove_next_turn = True
+            self.runPlayerCallbacks("removePlayer", serial)
             if self.isBlindAnteRound():
                 self.sitOut(serial)
             else:
@@ -1051,6 +1424,7 @@ class PokerGame:
             return False
         else:
             self.__removePlayer(serial)
+            self.runPlayerCallbacks("removePlayer", serial)
             return True
 
     def seats(self):
@@ -1119,6 +1493,8 @@ class PokerGame:
         self.muckable_serials = []
         self.win_condition = WON_NULL
         self.serial2best = {}
+        self.best_hand_cache = {}
+        self.readable_hand_cache = {}
         self.showdown_stack = []
         self.turn_history = []
         self.turn_history_is_reduced = False
@@ -1158,7 +1534,7 @@ class PokerGame:
             self.updateBlinds()
             self.autoPayBlindAnte()
 
-        self.log.debug("initialisation turn %d ... finished", self.hand_serial)
+        if self.log_debug: self.log.debug("initialisation turn %d ... finished", self.hand_serial)
 
     def dealerFromDealerSeat(self):
         self.dealer = -1
@@ -1268,7 +1644,7 @@ class PokerGame:
         # big blind and the dealer pays the small blind.
         #
         if blind_ok_count < 2:
-            self.log.debug("Forbid missed blinds")
+            if self.log_debug: self.log.debug("Forbid missed blinds")
             for player in players:
                 if player and player.isSit():
                     player.resetMissedBlinds()
@@ -1287,7 +1663,7 @@ class PokerGame:
                         player.missed_blind = what
                     if player.missed_blind == "big" and what == "big":
                         player.missed_big_blind_count += 1
-                    self.log.debug("%d big blind count is now %d because of %s", player.serial, player.missed_big_blind_count, what)
+                    if self.log_debug: self.log.debug("%d big blind count is now %d because of %s", player.serial, player.missed_big_blind_count, what)
                 index += 1
             return index
 
@@ -1363,10 +1739,10 @@ class PokerGame:
                     player.blind = False
             index += 1
         showblinds = lambda player: "%02d:%s:%s:%s" % (player.serial, player.blind, player.missed_blind, player.wait_for)
-        self.log.debug("updateBlinds: in game (blind:missed:wait): " + ", ".join(map(showblinds, self.playersInGame())))
+        if self.log_debug: self.log.debug("updateBlinds: in game (blind:missed:wait): %s", lambda: ", ".join(map(showblinds, self.playersInGame())))
         players = self.playersAll()
         players.sort(key=lambda i: i.seat)
-        self.log.debug("updateBlinds: all     (blind:missed:wait): " + ", ".join(map(showblinds, players)))
+        if self.log_debug: self.log.debug("updateBlinds: all     (blind:missed:wait): %s", lambda: ", ".join(map(showblinds, players)))
 
     def handsMap(self):
         pockets = {}
@@ -1584,14 +1960,14 @@ class PokerGame:
 
     def initRound(self):
         info = self.roundInfo()
-        self.log.debug("new round %s", info["name"])
+        if self.log_debug: self.log.debug("new round %s", info["name"])
         if self.isFirstRound():
             if not self.is_directing:
                 self.buildPlayerList(False)
                 self.dealerFromDealerSeat()
             self.acceptPlayersWaitingForFirstRound()
         self.round_cap_left = self.roundCap()
-        self.log.debug("round cap reset to %d", self.round_cap_left)
+        if self.log_debug: self.log.debug("round cap reset to %d", self.round_cap_left)
         self.first_betting_pass = True
         if info["position"] == "under-the-gun":
             #
@@ -1620,7 +1996,7 @@ class PokerGame:
             values = []
             for player in self.playersInGame():
                 values.append(self.eval.evaln(player.hand.getVisible()))
-                self.log.debug("%s : %d", player.hand.getVisible(), values[-1])
+                if self.log_debug: self.log.debug("%s : %d", player.hand.getVisible, values[-1])
             if info["position"] == "low":
                 value = min(values)
             else:
@@ -1670,12 +2046,13 @@ class PokerGame:
         for player in self.playersInGame():
             player.talked_once = False
 
-        self.log.debug("dealer %d, in position %d, last to talk %d", self.dealer, self.position, self.last_to_talk)
+        if self.log_debug: self.log.debug("dealer %d, in position %d, last to talk %d", self.dealer, self.position, self.last_to_talk)
         self.historyAdd("position", self.position, self.player_list[self.position])
         self.__autoPlay()
 
     def sortPlayerList(self):
         self.player_list.sort(key=lambda i: self.serial2player[i].seat)
+        self.__seat_ring_list = None
 
     def playersBeginTurn(self):
         for player in self.playersAll():
@@ -1749,7 +2126,7 @@ class PokerGame:
                     ante_info["value"] = level_info["value"]
                     ante_info["bring-in"] = level_info["bring-in"]
                 else:
-                    self.log.warn("unexpected ante change level %d " % level)
+                    self.log.warn("unexpected ante change level %d ", level)
             else:
                 ante_info = None
                 self.log.warn("unexpected ante change method %s ", info["change"])
@@ -1802,7 +2179,7 @@ class PokerGame:
             return False
 
     def endTurn(self):
-        self.log.debug("---end turn--")
+        if self.log_debug: self.log.debug("---end turn--")
 
         self.hands_count += 1
         self.updateStatsEndTurn()
@@ -1848,7 +2225,7 @@ class PokerGame:
         #
         # Get his seat back
         #
-        self.log.debug("removing player %d from game", serial)
+        if self.log_debug: self.log.debug("removing player %d from game", serial)
         if not self.serial2player[serial].seat in self.seats_left:
             self.seats_left.append(self.serial2player[serial].seat)
             self.seats_left.sort(key=self.seats_all.index)
@@ -1860,6 +2237,7 @@ class PokerGame:
         if serial in self.player_list: self.player_list.remove(serial)
         if serial in self.last_auto_action: del self.last_auto_action[serial]
         del self.serial2player[serial]
+        self.__unindexPlayer(serial)
 
     def isBlindAnteRound(self):
         return self.current_round == -1
@@ -1899,7 +2277,7 @@ class PokerGame:
             self.distributeMoney()
             to_show, muckable_candidates_serials = self.dispatchMuck()
 
-            self.log.debug("muckState: to_show = %s muckable_candidates = %s ", to_show, muckable_candidates_serials)
+            if self.log_debug: self.log.debug("muckState: to_show = %s muckable_candidates = %s ", to_show, muckable_candidates_serials)
 
             muckable_serials = []
             for serial in to_show:
@@ -1917,7 +2295,7 @@ class PokerGame:
             self.setMuckableSerials(muckable_serials)
             self.__talked_muck()
         else:
-            self.log.debug("muckState: not directing...")
+            if self.log_debug: self.log.debug("muckState: not directing...")
 
     def setRakedAmount(self, rake):
         if rake > 0:
@@ -1990,14 +2368,14 @@ class PokerGame:
                         if rake <= 0:
                             break
             else:
-                self.log.debug("distributeRake: have no keys --> no rake. serial2rake = %s", serial2rake)
+                if self.log_debug: self.log.debug("distributeRake: have no keys --> no rake. serial2rake = %s", serial2rake)
         return serial2rake
 
     def setMuckableSerials(self, muckable_serials):
         self.muckable_serials = list(muckable_serials)
         if muckable_serials:
             self.historyAdd("muck", self.muckable_serials[:])
-        self.log.debug("setMuckableSerials: muckable = %s", self.muckable_serials)
+        if self.log_debug: self.log.debug("setMuckableSerials: muckable = %s", self.muckable_serials)
 
     def cancelState(self):
         self.current_round = -2
@@ -2019,6 +2397,9 @@ class PokerGame:
     def betInfo(self):
         return self.bet_info[max(self.current_round,0)]
 
+    def betLimit(self):
+        return self.bet_limits[max(self.current_round,0)]
+
     def getChipUnit(self):
         return self.unit
 
@@ -2125,7 +2506,7 @@ class PokerGame:
 
     @update_player_last_auto_move
     def call(self, serial):
-        if self.isBlindAnteRound() or not self.canAct(serial):
+        if not self.trusted and (self.isBlindAnteRound() or not self.canAct(serial)):
             self.log.inform("player %d cannot call. state = %s", serial, self.state)
             return False
 
@@ -2137,25 +2518,26 @@ class PokerGame:
                     serial, self.last_auto_action.get(serial)
                 )
                 return False
-            self.log.debug("player %d checks" % serial)
+            if self.log_debug: self.log.debug("player %d checks", serial)
             self.historyAdd("check", serial)
             self.__talked(serial)
             return True
-        self.log.debug("player %d calls %d", serial, to_call)
+        if self.log_debug: self.log.debug("player %d calls %d", serial, to_call)
         self.historyAdd("call", serial, to_call)
         self.bet(serial, to_call)
         return True
 
     @update_player_last_auto_move
     def callNraise(self, serial, amount):
-        if self.isBlindAnteRound() or not self.canAct(serial):
+        if self.trusted:
+            pass
+        elif self.isBlindAnteRound() or not self.canAct(serial):
             self.log.inform(
                 "player %d cannot raise. state = %s, last_auto_action = %s",
                 serial, self.state, self.last_auto_action.get(serial)
             )
             return False
-
-        if self.round_cap_left <= 0:
+        elif self.round_cap_left <= 0:
             self.log.inform(
                 "round capped, cannot raise. last_auto_action = %s (ignored)",
                 self.last_auto_action.get(serial)
@@ -2163,12 +2545,12 @@ class PokerGame:
             if self.round_cap_left < 0:
                 self.log.warn("round cap below zero")
             return False
+        else:
+            min_raise, max_raise, _to_call = self.betLimitsForSerial(serial)
+            if amount < min_raise: amount = min_raise
+            elif amount > max_raise: amount = max_raise
 
-        min_raise, max_raise, _to_call = self.betLimitsForSerial(serial)
-        if amount < min_raise: amount = min_raise
-        elif amount > max_raise: amount = max_raise
-
-        self.log.debug("player %d raises %d", serial, amount)
+        if self.log_debug: self.log.debug("player %d raises %d", serial, amount)
         self.historyAdd("raise", serial, amount)
         highest_bet = self.highestBetNotFold()
         self.money2bet(serial, amount)
@@ -2176,13 +2558,13 @@ class PokerGame:
             last_bet = self.highestBetNotFold() - highest_bet
             self.last_bet = max(self.last_bet, last_bet)
             self.round_cap_left -= 1
-            self.log.debug("round cap left %d", self.round_cap_left)
+            if self.log_debug: self.log.debug("round cap left %d", self.round_cap_left)
             self.runCallbacks("round_cap_decrease", self.round_cap_left)
         self.__talked(serial)
         return True
 
     def bet(self, serial, amount):
-        self.log.debug("player %d bets %s", serial, amount)
+        if self.log_debug: self.log.debug("player %d bets %s", serial, amount)
         #
         # Transfert the player money from his stack to the bet stack
         #
@@ -2191,21 +2573,22 @@ class PokerGame:
 
     @update_player_last_auto_move
     def check(self, serial):
-        if self.isBlindAnteRound() or not self.canAct(serial):
+        if self.trusted:
+            pass
+        elif self.isBlindAnteRound() or not self.canAct(serial):
             self.log.inform(
                 "player %d cannot check. state = %s. last_auto_action = %s (ignored)",
                 serial, self.state, self.last_auto_action.get(serial)
             )
             return False
-
-        if not self.canCheck(serial):
+        elif not self.canCheck(serial):
             self.log.inform(
                 "player %d tries to check but should call or raise. last_auto_action = %s (ignored)",
                 serial, self.last_auto_action.get(serial)
             )
             return False
 
-        self.log.debug("player %d checks" % serial)
+        if self.log_debug: self.log.debug("player %d checks", serial)
         self.historyAdd("check", serial)
         #
         # Nothing done: that's what "check" stands for
@@ -2216,7 +2599,7 @@ class PokerGame:
     @update_player_last_auto_move
     def fold(self, serial):
         player = self.serial2player[serial]
-        if self.isBlindAnteRound() or not self.canAct(serial):
+        if not self.trusted and (self.isBlindAnteRound() or not self.canAct(serial)):
             self.log.inform(
                 "player %d cannot fold. state = %s, last_auto_action = %s (ignored)",
                 serial, self.state, self.last_auto_action.get(serial)
@@ -2230,7 +2613,7 @@ class PokerGame:
             )
             return True
 
-        self.log.debug("player %d folds", serial)
+        if self.log_debug: self.log.debug("player %d folds", serial)
         self.historyAdd("fold", serial, player.auto)
         player.fold = True
         #
@@ -2247,7 +2630,7 @@ class PokerGame:
         if not self.isBlindAnteRound():
             self.log.inform("player %d cannot pay blind while in state %s", serial, self.state)
             return False
-        if not self.canAct(serial):
+        if not self.trusted and not self.canAct(serial):
             self.log.inform(
                 "player %d cannot wait for blind. state = %s, serial in position = %d (ignored)",
                 serial, self.state, self.getSerialInPosition()
@@ -2268,7 +2651,7 @@ class PokerGame:
         if not self.isBlindAnteRound():
             self.log.inform("player %d cannot pay blind while in state %s", serial, self.state)
             return False
-        if not self.canAct(serial):
+        if not self.trusted and not self.canAct(serial):
             self.log.inform(
                 "player %d cannot pay blind. state = %s, serial in position = %d (ignored)",
                 serial, self.state, self.getSerialInPosition()
@@ -2294,7 +2677,7 @@ class PokerGame:
                 amount = money
             else:
                 dead = money - amount
-        self.log.debug("player %d pays blind %d/%d", serial, amount, dead)
+        if self.log_debug: self.log.debug("player %d pays blind %d/%d", serial, amount, dead)
         self.historyAdd("blind", serial, amount, dead)
         if dead > 0:
             #
@@ -2321,7 +2704,7 @@ class PokerGame:
         if not self.isBlindAnteRound():
             self.log.inform("player %d cannot pay ante while in state %s", serial, self.state)
             return False
-        if not self.canAct(serial):
+        if not self.trusted and not self.canAct(serial):
             self.log.inform("player %d cannot pay ante. state = %s, serial in position = %d (ignored)",
                 serial, self.state, self.getSerialInPosition()
             )
@@ -2336,7 +2719,7 @@ class PokerGame:
     def payAnte(self, serial, amount):
         player = self.serial2player[serial]
         amount = min(amount, player.money)
-        self.log.debug("player %d pays ante %d", serial, amount)
+        if self.log_debug: self.log.debug("player %d pays ante %d", serial, amount)
         self.historyAdd("ante", serial, amount)
         self.money2bet(serial, amount)
         self.bet2pot(serial)
@@ -2363,13 +2746,13 @@ class PokerGame:
             # All players are all-in except one, distribute all
             # cards and figure out who wins.
             #
-            self.log.debug("less than two players not all-in")
+            if self.log_debug: self.log.debug("less than two players not all-in")
             self.nextRound()
             self.blindAnteMoveToFirstRound()
             self.__makeSidePots()
             self.bet2pot()
 
-            self.log.debug("money not yet distributed, assuming information is missing ...")
+            if self.log_debug: self.log.debug("money not yet distributed, assuming information is missing ...")
         else:
             self.nextRound()
 
@@ -2427,7 +2810,7 @@ class PokerGame:
                 # All players are all-in (except one, maybe), distribute all
                 # cards and figure out who wins.
                 #
-                self.log.debug("less than two players not all-in")
+                if self.log_debug: self.log.debug("less than two players not all-in")
                 self.nextRound()
                 self.blindAnteMoveToFirstRound()
                 self.__makeSidePots()
@@ -2453,7 +2836,7 @@ class PokerGame:
     def __talked(self, serial):
         self.getPlayer(serial).talked_once = True
         if self.__roundFinished(serial):
-            self.log.debug("round finished")
+            if self.log_debug: self.log.debug("round finished")
 
             self.__makeSidePots()
             self.bet2pot()
@@ -2461,7 +2844,7 @@ class PokerGame:
             if self.notFoldCount() < 2:
                 self.position = self.indexNotFoldAdd(self.position, 1)
                 self.historyAdd("position", self.position, self.player_list[self.position])
-                self.log.debug("last player in game %d", self.getSerialInPosition())
+                if self.log_debug: self.log.debug("last player in game %d", self.getSerialInPosition())
                 if self.isFirstRound():
                     self.updateStatsFlop(True)
                 self.muckState(WON_FOLD)
@@ -2471,7 +2854,7 @@ class PokerGame:
                 # All players are all-in except one, distribute all
                 # cards and figure out who wins.
                 #
-                self.log.debug("less than two players not all-in")
+                if self.log_debug: self.log.debug("less than two players not all-in")
                 while not self.isLastRound():
                     self.nextRound()
                     self.dealCards()
@@ -2481,7 +2864,7 @@ class PokerGame:
                 #
                 # All bets equal, go to next round
                 #
-                self.log.debug("next state")
+                if self.log_debug: self.log.debug("next state")
                 if self.isLastRound():
                     self.muckState(WON_REGULAR)
                 else:
@@ -2491,12 +2874,12 @@ class PokerGame:
                         self.initRound()
                     else:
                         self.runCallbacks("end_round")
-                        self.log.debug("round not initialized, waiting for more information ... ")
+                        if self.log_debug: self.log.debug("round not initialized, waiting for more information ... ")
 
         else:
             self.position = self.indexInGameAdd(self.position, 1)
             self.historyAdd("position", self.position, self.player_list[self.position])
-            self.log.debug("new position (%d)" % self.position)
+            if self.log_debug: self.log.debug("new position (%d)", self.position)
             self.__autoPlay()
 
     def __talked_muck(self):
@@ -2522,15 +2905,43 @@ class PokerGame:
         return player.botPlayer.eval(self)
 
     def __autoPlay(self):
+        #
+        # The action played for a player calls __autoPlay again, through
+        # __talked or initRound, when the next player is in position.
+        # Instead of recursing for each action of the round (and of the
+        # following rounds), the nested call only tells the loop below
+        # to play the next action once the previous one returned.
+        #
         if not self.is_directing:
             return
+        if self.__auto_playing:
+            self.__auto_play_pending = True
+            return
+        self.__auto_playing = True
+        if self.batch_auto_actions:
+            self.__auto_events = []
+        try:
+            self.__auto_play_pending = True
+            while self.__auto_play_pending:
+                self.__auto_play_pending = False
+                self.__autoPlayOne()
+        finally:
+            self.__auto_playing = False
+            self.__auto_play_pending = False
+            events = self.__auto_events
+            self.__auto_events = None
+            if events:
+                self.runCallbacks("auto_actions", events)
+
+    def __autoPlayOne(self):
         player = self.getPlayerInPosition()
         serial = player.serial
 
-        self.log.debug("Player(%s) isBot(%s) isSitOut(%s) isAuto(%s) policy(%s)" % (
-            serial, player.isBot(), player.isSitOut(), player.isAuto(),
-            player.auto_policy
-        ))
+        if self.log_debug:
+            self.log.debug("Player(%s) isBot(%s) isSitOut(%s) isAuto(%s) policy(%s)",
+                serial, player.isBot(), player.isSitOut(), player.isAuto(),
+                player.auto_policy
+            )
         raiseAmount = 0
         if player.isBot():
             desired_action, raiseAmount = self.__botEval(serial)
@@ -2548,11 +2959,11 @@ class PokerGame:
         else:
             return
 
-        self.log.debug("__autoPlay desired action %s", desired_action)
+        if self.log_debug: self.log.debug("__autoPlay desired action %s", desired_action)
 
         # try to find the next best action if not found in possible actions
         while desired_action not in actions:
-            self.log.debug("__autoPlay: desired action %s is not in available actions %s", desired_action, actions)
+            if self.log_debug: self.log.debug("__autoPlay: desired action %s is not in available actions %s", desired_action, actions)
             if desired_action == "raise":
                 desired_action = "call"
             elif desired_action == "call":
@@ -2561,19 +2972,19 @@ class PokerGame:
                 desired_action = "fold"
             elif desired_action == "fold":
                 break
-        self.log.debug("__autoPlay: new desired action %s", desired_action)
+        if self.log_debug: self.log.debug("__autoPlay: new desired action %s", desired_action)
 
         if desired_action == "raise":
-            self.log.debug("__autoPlay: callNraise")
+            if self.log_debug: self.log.debug("__autoPlay: callNraise")
             self.callNraise(serial, raiseAmount)
         elif desired_action == "call":
-            self.log.debug("__autoPlay: call")
+            if self.log_debug: self.log.debug("__autoPlay: call")
             self.call(serial)
         elif desired_action == "check":
-            self.log.debug("__autoPlay: check")
+            if self.log_debug: self.log.debug("__autoPlay: check")
             self.check(serial)
         else: # "fold":
-            self.log.debug("__autoPlay: fold")
+            if self.log_debug: self.log.debug("__autoPlay: fold")
             self.fold(serial)
 
         # update last_auto_action with the action taken
@@ -2598,40 +3009,13 @@ class PokerGame:
         return self.variant_name
 
     def setVariant(self, variant):
-        self.__variant.load(self.url % variant)
+        template = pokertemplates.get_variant(self.dirs, self.url % variant, variant, self.__variant)
+        self.__variant = template
         self.variant = variant
-        self.variant_name = self.getParam("/poker/variant/@name")
-        self.round_info = []
-        self.round_info_backup = []
-        self.win_orders = []
-        for win_order in self.getParamList("/poker/variant/wins/winner/@order"):
-            if win_order == "low8":
-                self.win_orders.append("low")
-            elif win_order == "high":
-                self.win_orders.append("hi")
-            else:
-                self.log.inform("unexpected win order: %s for variant %s", win_order, variant)
-        if not self.win_orders:
-            raise UserWarning("failed to read win orders from %s" % self.__variant.path)
-
-        board_size = 0
-        hand_size = 0
-        for name in self.getParamList("/poker/variant/round/@name"):
-            board = self.getParamList("/poker/variant/round[@name='%s']/deal[@card='board']" % (name))
-            board_size += len(board)
-            cards = self.getParamList("/poker/variant/round[@name='%s']/deal[@card='up' or @card='down']/@card" % (name))
-            hand_size += len(cards)
-            position = self.getParam("/poker/variant/round[@name='%s']/position/@type" % (name))
-            info = {
-                "name": name,
-                "position": position,
-                "board": board,
-                "board_size": board_size,
-                "hand_size": hand_size,
-                "cards": cards,
-            }
-            self.round_info.append(info)
-            self.round_info_backup.append(info.copy())
+        self.variant_name = template.name
+        self.win_orders = template.win_orders
+        self.round_info_backup = template.round_info
+        self.round_info = [copy_round_info(info) for info in template.round_info]
         self.rake = pokerrake.get_rake_instance(self)
 
     def resetRoundInfo(self):
@@ -2642,86 +3026,31 @@ class PokerGame:
         read from the betting structure description file.
         """
         for i in xrange(len(self.round_info)):
-            self.round_info[i] = self.round_info_backup[i].copy()
+            self.round_info[i] = copy_round_info(self.round_info_backup[i])
 
     def getBettingStructureName(self):
         return self.betting_structure_name
 
     def setBettingStructure(self, betting_structure):
-        self.__betting_structure.load(self.url % betting_structure)
+        template = pokertemplates.get_betting_structure(self.dirs, self.url % betting_structure, self.variant, self.__betting_structure)
+        self.__betting_structure = template
         self.betting_structure = betting_structure
-        self.betting_structure_name = self.getParam("/bet/description")
-        self.buy_in = int(self.getParam('/bet/@buy-in') or "0")
-        self.max_buy_in = int(self.getParam('/bet/@max-buy-in') or sys.maxint)
-        self.best_buy_in = int(self.getParam('/bet/@best-buy-in') or "0")
-        self.unit = int(self.getParam('/bet/@unit'))
-
-        self.bet_info = self.getParamProperties('/bet/variants[contains(@ids,"' + self.variant + '")]/round')
-        for bet_info in self.bet_info:
-            if 'cap' not in bet_info:
-                bet_info["cap"] = str(sys.maxint)
-            else:
-                cap = int(bet_info["cap"])
-                if cap < 0:
-                    bet_info["cap"] = str(sys.maxint)
-
-        self.blind_info = False
-        blind_info = self.getParamProperties("/bet/blind")
-        if len(blind_info) > 0:
-            blinds = blind_info[0]
-            self.blind_info = {
-                "change": 'change' in blinds and blinds["change"]
-            }
-
-            if self.blind_info["change"] != False:
-                self.blind_info["frequency"] = int(blinds["frequency"])
-                self.blind_info["unit"] = blinds["unit"]
-                if self.blind_info["change"] == "levels":
-                    self.blind_info["levels"] = self.loadTournamentLevels(self.getParam('/bet/blind/@levels'))
-                elif self.blind_info["change"] == "double":
-                    self.blind_info["small"] = int(blinds["small"])
-                    self.blind_info["small_reference"] = self.blind_info["small"]
-                    self.blind_info["big"] = int(blinds["big"])
-                    self.blind_info["big_reference"] = self.blind_info["big"]
-            else:
-                self.blind_info["small"] = int(blinds["small"])
-                self.blind_info["big"] = int(blinds["big"])
-
-        self.ante_info = False
-        ante_info = self.getParamProperties("/bet/ante")
-        if len(ante_info) > 0:
-            antes = ante_info[0]
-            self.ante_info = {
-                "change": 'change' in antes and antes["change"]
-                }
-
-            if self.ante_info["change"]:
-                self.ante_info["frequency"] = int(antes["frequency"])
-                self.ante_info["unit"] = antes["unit"]
-                if self.ante_info["change"] == "levels":
-                    self.ante_info["levels"] = self.loadTournamentLevels(self.getParam('/bet/ante/@levels'))
-                elif self.ante_info["change"] == "double":
-                    self.ante_info["value"] = int(antes["value"])
-                    self.ante_info["value_reference"] = self.ante_info["value"]
-                    self.ante_info["bring-in"] = int(antes["bring-in"])
-                    self.ante_info["bring-in_reference"] = self.ante_info["bring-in"]
-            else:
-                self.ante_info["value"] = int(antes["value"])
-                self.ante_info["bring-in"] = int(antes["bring-in"])
+        self.betting_structure_name = template.name
+        self.buy_in = template.buy_in
+        self.max_buy_in = template.max_buy_in
+        self.best_buy_in = template.best_buy_in
+        self.unit = template.unit
+        self.bet_info = template.bet_info
+        self.bet_limits = template.bet_limits
+        #
+        # blind_info and ante_info are updated when the level changes
+        #
+        self.blind_info = template.blind_info and template.blind_info.copy()
+        self.ante_info = template.ante_info and template.ante_info.copy()
         self.rake = pokerrake.get_rake_instance(self)
 
     def loadTournamentLevels(self, levels_file):
-        if levels_file not in LEVELS_CACHE:
-            config = Config(self.dirs)
-            config.load(levels_file)
-            levels = []
-            nodes = config.doc.xpath('/levels/level')
-            for node in nodes:
-                level = map(lambda (key, value): (key, int(value)), config.headerNodeProperties(node).items())
-                levels.append(dict(level))
-            config.free()
-            LEVELS_CACHE[levels_file] = levels
-        return LEVELS_CACHE[levels_file]
+        return pokertemplates.load_levels(self.dirs, levels_file)
 
     def getBoardLength(self):
         return len(self.board.tolist(True))
@@ -2743,13 +3072,10 @@ class PokerGame:
         return self.cardsDealtThisRoundCount(lambda x: x == "down")
 
     def getMaxHandSize(self):
-        return len(self.getParamList("/poker/variant/hand/position"))
+        return self.__variant.max_hand_size
 
     def getMaxBoardSize(self):
-        if self.getParam("/poker/variant/@type") == "community":
-            return len(self.getParamList("/poker/variant/community/position"))
-        else:
-            return 0
+        return self.__variant.max_board_size
 
     def cardsDealt(self):
         if self.isBlindAnteRound():
@@ -2794,9 +3120,9 @@ class PokerGame:
                 player.hand.add(self.deck.pop(), card == "up")
         if len(info["cards"]):
             for serial in self.serialsNotFold():
-                self.log.debug("player %d cards: %s", serial, self.getHandAsString(serial))
+                if self.log_debug: self.log.debug("player %d cards: %s", serial, self.getHandAsString(serial))
         if len(info["board"]):
-            self.log.debug("board: " + self.getBoardAsString())
+            if self.log_debug: self.log.debug("board: %s", self.getBoardAsString)
 
         # the history event name round is a bit confusing since its main purpose is to send
         # the (board and player) card packets.
@@ -2808,14 +3134,14 @@ class PokerGame:
         # The round finishes when there is only one player not fold ...
         #
         if self.notFoldCount() < 2:
-            self.log.debug("only one player left in the game")
+            if self.log_debug: self.log.debug("only one player left in the game")
             return True
 
         #
         # ... or when all players are all-in.
         #
         if self.inGameCount() < 1:
-            self.log.debug("all players are all-in")
+            if self.log_debug: self.log.debug("all players are all-in")
             return True
 
         if self.first_betting_pass:
@@ -2897,7 +3223,7 @@ class PokerGame:
                     'pot': pot_backup
                 }
             ]
-            self.log.debug("%s", lambda: pformat(self.showdown_stack))
+            if self.log_debug: self.log.debug("%s", lambda: pformat(self.showdown_stack))
             self.pot2money(serial)
             self.setWinners([serial])
             if not self.is_directing:
@@ -2912,7 +3238,7 @@ class PokerGame:
                     if player_serial not in serial2side_pot:
                         serial2side_pot[player_serial] = side_pots['pots'][pot_idx][1]
 
-        self.log.debug("distribute a pot of %d", self.pot)
+        if self.log_debug: self.log.debug("distribute a pot of %d", self.pot)
         #
         # Keep track of the best hands (high and low) for information
         # and for the showdown.
@@ -3018,11 +3344,12 @@ class PokerGame:
             frame['serial2share'] = {}
             frame['serials'] = [player.serial for player in potential_winners]
 
-            self.log.debug(
-                "looking for winners with boards %s\n" + "\n".join("    hand for player %d: %s" for p in potential_winners),
-                lambda: self.getBoardAsString(),
-                *reduce(lambda a, b: a + b, [(p.serial, self.getHandAsString(p.serial)) for p in potential_winners], ())
-            )
+            if self.log_debug:
+                self.log.debug(
+                    "looking for winners with boards %s\n" + "\n".join("    hand for player %d: %s" for p in potential_winners),
+                    lambda: self.getBoardAsString(),
+                    *reduce(lambda a, b: a + b, [(p.serial, self.getHandAsString(p.serial)) for p in potential_winners], ())
+                )
 
             #
             #
@@ -3038,15 +3365,16 @@ class PokerGame:
             # forms to ease computing the results.
             #
             winners = []
-            self.log.debug("winners:")
+            if self.log_debug: self.log.debug("winners:")
             for (side, indices) in poker_eval.iteritems():
                 side_winners = [potential_winners[i] for i in indices]
                 for winner in side_winners:
-                    self.log.debug(" => player %d %s (%s)",
-                        winner.serial,
-                        self.bestCardsAsString(self.serial2best, winner.serial, side),
-                        side
-                    )
+                    if self.log_debug:
+                        self.log.debug(" => player %d %s (%s)",
+                            winner.serial,
+                            self.bestCardsAsString(self.serial2best, winner.serial, side),
+                            side
+                        )
                     serial2share.setdefault(winner.serial, 0)
                     frame['serial2share'][winner.serial] = 0
                 frame[side] = [winner.serial for winner in side_winners]
@@ -3060,7 +3388,7 @@ class PokerGame:
             #
             pot = min([serial2side_pot[player.serial] for player in winners])
             frame['pot'] = pot
-            self.log.debug("  and share a pot of %d", pot)
+            if self.log_debug: self.log.debug("  and share a pot of %d", pot)
             #
             # If there are no winners for the low hand (either because the
             # game is not hi/low or because there is no qualifying low
@@ -3172,7 +3500,7 @@ class PokerGame:
         self.showdown_stack = showdown_stack
         if not self.is_directing:
             self.updateHistoryEnd(self.winners, showdown_stack)
-        self.log.debug("%s", lambda: pformat(self.showdown_stack))
+        if self.log_debug: self.log.debug("%s", lambda: pformat(self.showdown_stack))
 
     def divideChips(self, amount, divider):
         return (amount / divider, amount % divider)
@@ -3253,18 +3581,75 @@ class PokerGame:
     def showdown(self):
         self.historyAdd("showdown", self.board.copy(), self.handsMap())
 
+    def preflopEV(self, serial, self_only=False):
+        #
+        # Answer from the precomputed equity table (see pokerequity) when
+        # nothing but the pocket of the player is known. Return None
+        # when there is no table or when other cards are known.
+        #
+        table = pokerequity.get_table(self.dirs, self.variant)
+        if table is None:
+            return None
+        known = lambda cards: [card for card in cards.tolist(True) if card != PokerCards.NOCARD]
+        serials = self.serialsNotFold()
+        if serial not in serials or known(self.board):
+            return None
+        if not self_only:
+            for other in serials:
+                if other != serial and known(self.getPlayer(other).hand):
+                    return None
+        return table.ev(known(self.getPlayer(serial).hand), len(serials) - 1)
+
     def handEV(self, serial, iterations, self_only=False):
+        (ev, request) = self.handEVRequest(serial, iterations, self_only)
+        if request is None:
+            return ev
+        (key, index, kwargs) = request
+        if self.eval_pool and self.eval_pool.isWorthIt(kwargs['iterations']):
+            poker_eval = self.eval_pool.poker_eval(**kwargs)
+        else:
+            poker_eval = self.eval.poker_eval(**kwargs)
+        return self.handEVStore(key, index, poker_eval)
+
+    def handEVAsync(self, serial, iterations, self_only=False):
+        #
+        # Same as handEV but return a PokerEvalFuture instead of blocking
+        # while the simulation runs in eval_pool
+        #
+        (ev, request) = self.handEVRequest(serial, iterations, self_only)
+        if request is None:
+            return PokerEvalFuture(value=ev)
+        (key, index, kwargs) = request
+        if self.eval_pool is None:
+            return PokerEvalFuture(value=self.handEVStore(key, index, self.eval.poker_eval(**kwargs)))
+        return self.eval_pool.poker_eval_async(then=lambda poker_eval: self.handEVStore(key, index, poker_eval), **kwargs)
+
+    def handEVStore(self, key, index, poker_eval):
+        evs = [result["ev"] for result in poker_eval["eval"]]
+        pokerequity.EQUITY_CACHE.set(key, evs)
+        return evs[index]
+
+    def handEVRequest(self, serial, iterations, self_only):
+        #
+        # Return (ev, None) if the ev is known without evaluation or
+        # (None, (cache key, index of the serial, poker_eval arguments))
+        #
+        ev = self.preflopEV(serial, self_only)
+        if ev is not None:
+            return (ev, None)
+        serials = self.serialsNotFold()
+        if serial not in serials:
+            self.log.warn("handEV: player %d is not holding cards in the hand", serial)
+            return (None, None)
         pocket_size = self.getMaxHandSize()
         pockets = []
-        serials = self.serialsNotFold()
         if self_only:
             #
             # Pretend that the pocket cards of other players are unknown
             #
             pockets = [[PokerCards.NOCARD] * pocket_size] * len(serials)
-            if serial in serials:
-                my_cards = self.getPlayer(serial).hand.tolist(True)
-                pockets[serials.index(serial)] = my_cards
+            my_cards = self.getPlayer(serial).hand.tolist(True)
+            pockets[serials.index(serial)] = my_cards
         else:
             for pocket in [player.hand.tolist(True) for player in self.playersNotFold()]:
                 if len(pocket) < pocket_size:
@@ -3274,21 +3659,40 @@ class PokerGame:
         board_size = self.getMaxBoardSize()
         if len(board) < board_size:
             board.extend([PokerCards.NOCARD] * (board_size - len(board)))
-        poker_eval = self.eval.poker_eval(
-            game=self.variant,
-            pockets=pockets,
-            board=board,
-            fill_pockets=1,
-            iterations=iterations
-        )
-        if serial in serials:
-            player_index = serials.index(serial)
-            return poker_eval["eval"][player_index]["ev"]
-        else:
-            self.log.warn("handEV: player %d is not holding cards in the hand", serial)
-            return None
+        #
+        # enumerate every outcome (iterations = 0) when it costs no more
+        # than the simulation
+        #
+        if pokerequity.outcomes(pockets, board) <= iterations:
+            iterations = 0
+        key = pokerequity.cache_key(self.variant, pockets, board, iterations)
+        index = serials.index(serial)
+        evs = pokerequity.EQUITY_CACHE.get(key)
+        if evs is not None:
+            return (evs[index], None)
+        return (None, (key, index, {
+            'game': self.variant,
+            'pockets': pockets,
+            'board': board,
+            'fill_pockets': 1,
+            'iterations': iterations,
+        }))
 
     def readableHandValueLong(self, side, value, cards):
+        #
+        # the translation function is part of the key because it may be
+        # changed on the fly (see init_i18n)
+        #
+        key = (_, side, value, tuple(cards))
+        readable = self.readable_hand_cache.get(key)
+        if readable is None:
+            readable = self.readable_hand_cache[key] = self.__readableHandValueLong(side, value, cards)
+            self.eval_cache_stats['readable'] += 1
+        else:
+            self.eval_cache_stats['readable_saved'] += 1
+        return readable
+
+    def __readableHandValueLong(self, side, value, cards):
         cards = self.eval.card2string(cards)
         if value == "NoPair":
             if side == "low":
@@ -3410,13 +3814,25 @@ class PokerGame:
         return " ".join(self.eval.card2string(bests[serial][side][1][1:]))
 
     def bestHand(self, side, serial):
+        pocket = self.serial2player[serial].hand.tolist(True)
+        board = self.board.tolist(True)
+        #
+        # bestHands, dispatchMuck, readablePlayerBestHand ... ask for the
+        # same hands during the showdown: poker-eval is called once per
+        # side and hand. The cache is reset by beginTurn.
+        #
+        key = (self.variant, side, tuple(pocket), tuple(board))
+        best = self.best_hand_cache.get(key)
+        if best is not None:
+            self.eval_cache_stats['best_saved'] += 1
+            return best
         if self.variant == "omaha" or self.variant == "omaha8":
-            hand = self.serial2player[serial].hand.tolist(True)
-            board = self.board.tolist(True)
+            best = self.eval.best(side, pocket, board)
         else:
-            hand = self.serial2player[serial].hand.tolist(True) + self.board.tolist(True)
-            board = []
-        return self.eval.best(side, hand, board)
+            best = self.eval.best(side, pocket + board, [])
+        self.best_hand_cache[key] = best
+        self.eval_cache_stats['best'] += 1
+        return best
 
     def bestHandValue(self, side, serial):
         return self.bestHand(side, serial)[0]
@@ -3449,12 +3865,12 @@ class PokerGame:
 
     def betsNull(self):
         if self.isRunning():
-            return sum([player.bet for player in self.playersNotFold()]) == 0
+            return self.highestBetNotFold() == 0
         else:
             return False
 
     def setWinners(self, serials):
-        self.log.debug("player(s) %s win", serials)
+        if self.log_debug: self.log.debug("player(s) %s win", serials)
         self.winners = serials
 
     def bet2pot(self, serial=0, dead_money=False):
@@ -3490,14 +3906,8 @@ class PokerGame:
             player.all_in = True
 
     def __updateUncalled(self):
-        highest_bet = 0
-        highest_bet_players_count = 0
-        for player in self.playersNotFold():
-            if player.bet > highest_bet:
-                highest_bet = player.bet
-                highest_bet_players_count = 1
-            elif player.bet == highest_bet:
-                highest_bet_players_count += 1
+        highest_bet = self.highestBetNotFold()
+        highest_bet_players_count = self.bets_highest_count
 
         if highest_bet_players_count == 0:
             raise UserWarning("there should be at least one player in the game")  # pragma: no cover
@@ -3561,7 +3971,8 @@ class PokerGame:
         self.pot = 0
 
     def highestBetNotFold(self):
-        return max([player.bet for player in self.playersNotFold()])
+        self.__betsUpdate()
+        return self.bets_highest
 
     def highestBetInGame(self):
         return max([player.bet for player in self.playersInGame()])
@@ -3573,17 +3984,14 @@ class PokerGame:
             # than any of the bets of the players still in game, the
             # bets are not equal.
             #
-            if self.highestBetNotFold() > self.highestBetInGame():
-                return False
-            #
             # If one of the players still in game placed a bet that
             # is different from the others, the bets are not equal.
+            # Both mean that one of them did not bet as much as the
+            # highest bet.
             #
-            players = self.playersInGame()
-            bet = players[0].bet
-            for player in players:
-                player_bet = player.bet
-                if bet != player_bet:
+            highest_bet = self.highestBetNotFold()
+            for player in self.playersInGame():
+                if player.bet != highest_bet:
                     return False
         return True
 
@@ -3600,68 +4008,74 @@ class PokerGame:
         if not round_contributions:
             return
 
-        serials_by_contribution = round_contributions[len(pots) - 1].items()[:]
-        serials_by_contribution.sort(key=lambda s: s[1], reverse=True)
-        max_contribution_not_fold = 0
-
-        for serial, contribution in serials_by_contribution:
-            if not self.getPlayer(serial).isFold():
+        pot_contributions = round_contributions[current_pot_index]
+        serial2player = self.serial2player
+        #
+        # The contributions are sorted once, in increasing order, and
+        # the side pots are built in a single sweep of the levels at
+        # which the pot is split.
+        #
+        contributors = sorted(pot_contributions.items(), key=lambda s: s[1])
+        for serial, contribution in reversed(contributors):
+            if not serial2player[serial].fold:
                 max_contribution_not_fold = contribution
                 break
         else:
             # for: ... else
             raise UserWarning("every user is fold")
-
-        def filterPlayers(player):
-            if player.side_pot_index == current_pot_index:
-                if not player.isAllIn():
-                    if max_contribution_not_fold != serials_by_contribution[0][1] and round_contributions[len(pots) - 1].get(player.serial,0) >= max_contribution_not_fold:
-                        return True
-                    return False
-                return True
-            return False
-
-        players = filter(filterPlayers, self.playersAll())
-
-        if not players:
-            return
-        # we need to sort by the pot contribution amount
+        #
+        # The pot is split at the contribution of each player who is
+        # all-in. If a player who folded contributed more than the
+        # players who did not, it is also split at the contribution of
+        # the players who did not fold, so that the money of the
+        # player who folded above them goes to a separate pot.
+        #
         # it is possible that someone folded a blind but the big blind is allready all in
         # because of this, it is possible that the person who is all in didn't contributet the most money
-        # so we need to check also all players.
-        players.sort(key=lambda player: round_contributions[len(pots) - 1].get(player.serial,0))
-        for player in players:
-            pot_contributions = round_contributions[len(pots) - 1]
-            if player.serial not in pot_contributions:
+        #
+        fold_above = max_contribution_not_fold != contributors[-1][1]
+        levels = set()
+        for player in serial2player.itervalues():
+            if player.side_pot_index != current_pot_index or player.serial not in pot_contributions:
                 continue
-            if len(pot_contributions) == 1:
+            contribution = pot_contributions[player.serial]
+            if player.all_in or (fold_above and contribution >= max_contribution_not_fold):
+                levels.add(contribution)
+        if not levels:
+            return
+
+        amounts = [contribution for serial, contribution in contributors]
+        start = 0
+        base = 0
+        for level in sorted(levels):
+            if len(contributors) - start == 1:
                 #
                 # This may happen when a player goes all in and
                 # has more chips than all other players
                 #
                 break
-            new_pot_contributions = {}
             pot = pots[last_pot_index]
-            new_pot = [0, 0]
             new_pot_index = len(pots)
-            contribution = pot_contributions[player.serial]
-            for serial in pot_contributions.keys():
-                other_contribution = pot_contributions[serial]
-                pot_contributions[serial] = min(contribution, other_contribution)
-                remainder = other_contribution - pot_contributions[serial]
-                pot[amount_index] -= remainder
-                pot[total_index] -= remainder
-                other_player = self.getPlayer(serial)
-                if other_contribution > contribution:
-                    new_pot_contributions[serial] = remainder
-                    new_pot[amount_index] += remainder
-                    other_player.side_pot_index = new_pot_index
-                elif (other_contribution == contribution and
-                       not other_player.isAllIn()):
-                    other_player.side_pot_index = new_pot_index
+            new_pot_contributions = {}
+            end = bisect_right(amounts, level, start)
+            for index in xrange(start, end):
+                serial, contribution = contributors[index]
+                if contribution == level and not serial2player[serial].all_in:
+                    serial2player[serial].side_pot_index = new_pot_index
+            remainders = 0
+            for index in xrange(end, len(contributors)):
+                serial, contribution = contributors[index]
+                pot_contributions[serial] = level - base
+                new_pot_contributions[serial] = contribution - level
+                remainders += contribution - level
+                serial2player[serial].side_pot_index = new_pot_index
+            pot[amount_index] -= remainders
+            pot[total_index] -= remainders
             round_contributions[new_pot_index] = new_pot_contributions
-            new_pot[total_index] = new_pot[amount_index] + pot[total_index]
-            pots.append(new_pot)
+            pots.append([remainders, remainders + pot[total_index]])
+            pot_contributions = new_pot_contributions
+            start = end
+            base = level
 
     def getPots(self):
         return self.side_pots
@@ -3671,7 +4085,9 @@ class PokerGame:
 
     def getLatestPotContributions(self):
         contributions = self.side_pots['contributions']
-        last_round = max(filter(lambda x: x != 'total', contributions.keys()))
+        last_round = self.side_pots.get('last_round')
+        if last_round not in contributions:
+            last_round = max(filter(lambda x: x != 'total', contributions.keys()))
         return contributions[last_round]
 
     def indexInGameAdd(self, position, increment):
@@ -3683,6 +4099,19 @@ class PokerGame:
     def indexAdd(self, position, increment):
         return self.playerListIndexAdd(position, increment, lambda x: True)
 
+    #
+    # The players of self.player_list, in the same order. It is
+    # rebuilt when player_list is replaced, sorted or shrinks and
+    # spares a serial2player lookup for each seat visited by
+    # playerListIndexAdd.
+    #
+    def __seatRing(self):
+        player_list = self.player_list
+        if self.__seat_ring_list is not player_list or len(self.__seat_ring) != len(player_list):
+            self.__seat_ring = tuple([self.serial2player[serial] for serial in player_list])
+            self.__seat_ring_list = player_list
+        return self.__seat_ring
+
     #
     # Increment the "index" (relative to self.player_list knowing
     # that self.player_list is not modified during a turn) for a
@@ -3690,24 +4119,32 @@ class PokerGame:
     # is false.
     #
     def playerListIndexAdd(self, index, increment, predicate):
-        round_trip = range(0, len(self.player_list)) \
-            if increment >= 0 \
-            else range(len(self.player_list), 0, -1)
-
-        player_list_ordered = [(x + index) % len(self.player_list) for x in round_trip]
-        player_list_filtered = [p for p in player_list_ordered if predicate(self.serial2player[self.player_list[p]])]
-
-        # If the player itself did not succeed in the predicate test, he is not
-        # in the player_list_filtered --> his index is now occupied by another
-        # player. instead of recalculating, we can simply subtract the (now missing)
-        # position from the increment.
-        # The absolute value is used for the increment, since we reversed the order already
-        # if the value is negative
-        increment = abs(increment) \
-            if predicate(self.serial2player[self.player_list[index]]) \
-            else abs(increment) - 1
-
-        return player_list_filtered[increment % len(player_list_filtered)]
+        ring = self.__seat_ring
+        length = len(ring)
+        if self.__seat_ring_list is not self.player_list or length != len(self.player_list):
+            ring = self.__seatRing()
+            length = len(ring)
+        step = 1 if increment >= 0 else -1
+        #
+        # Walk the ring starting with the player next to "index". If
+        # the player at "index" satisfies the predicate, he is the
+        # last player of the lap.
+        #
+        start = (index + step) % length
+        skip = abs(increment) - 1
+        while True:
+            position = start
+            found = 0
+            for i in xrange(length):
+                if predicate(ring[position]):
+                    if found == skip:
+                        return position
+                    found += 1
+                position = (position + step) % length
+            #
+            # Less matching players than the increment, go around
+            #
+            skip %= found
 
     def getSerialDealer(self):
         return self.player_list[self.dealer]
@@ -3749,13 +4186,15 @@ class PokerGame:
         return [p for p in self.serial2player.itervalues() if p.isConnected()]
 
     def sitOutCount(self):
-        return len(self.serialsSitOut())
+        return len(self.player_indexes['sit_out'])
 
     def serialsSitOut(self):
-        return [s for s, p in self.serial2player.iteritems() if p.isSitOut()]
+        sit_out = self.player_indexes['sit_out']
+        return [s for s in self.serial2player.iterkeys() if s in sit_out]
 
     def playersSitOut(self):
-        return [p for p in self.serial2player.itervalues() if p.isSitOut()]
+        sit_out = self.player_indexes['sit_out']
+        return [p for s, p in self.serial2player.iteritems() if s in sit_out]
 
     def brokeCount(self):
         return len(self.serialsBroke())
@@ -3767,13 +4206,15 @@ class PokerGame:
         return [p for s, p in self.serial2player.iteritems() if self.isBroke(s)]
 
     def sitCount(self):
-        return len(self.serialsSit())
+        return len(self.serial2player) - len(self.player_indexes['sit_out'])
 
     def serialsSit(self):
-        return [s for s, p in self.serial2player.iteritems() if p.isSit()]
+        sit_out = self.player_indexes['sit_out']
+        return [s for s in self.serial2player.iterkeys() if s not in sit_out]
 
     def playersSit(self):
-        return [p for p in self.serial2player.itervalues() if p.isSit()]
+        sit_out = self.player_indexes['sit_out']
+        return [p for s, p in self.serial2player.iteritems() if s not in sit_out]
 
     def notPlayingCount(self):
         if not self.isRunning():
@@ -3783,12 +4224,14 @@ class PokerGame:
     def serialsNotPlaying(self):
         if not self.isRunning():
             return self.serial2player.keys()
-        return [s for s in self.serial2player.iterkeys() if s not in self.player_list]
+        player_set = self.__playerSet()
+        return [s for s in self.serial2player.iterkeys() if s not in player_set]
 
     def playersNotPlaying(self):
         if not self.isRunning():
             return self.serial2player.values()
-        return [p for s, p in self.serial2player.iteritems() if s not in self.player_list]
+        player_set = self.__playerSet()
+        return [p for s, p in self.serial2player.iteritems() if s not in player_set]
 
     def playingCount(self):
         if not self.isRunning():
@@ -3798,12 +4241,14 @@ class PokerGame:
     def serialsPlaying(self):
         if not self.isRunning():
             return []
-        return [s for s in self.serial2player.iterkeys() if s in self.player_list]
+        player_set = self.__playerSet()
+        return [s for s in self.serial2player.iterkeys() if s in player_set]
 
     def playersPlaying(self):
         if not self.isRunning():
             return []
-        return [p for s, p in self.serial2player.iteritems() if s in self.player_list]
+        player_set = self.__playerSet()
+        return [p for s, p in self.serial2player.iteritems() if s in player_set]
 
     def allCount(self):
         return len(self.serial2player)
@@ -3848,20 +4293,26 @@ class PokerGame:
     def playersAll(self):
         return self.serial2player.values()
 
+    def __serialsInGameSet(self):
+        return self.__playerSet().difference(self.player_indexes['fold'], self.player_indexes['all_in'])
+
     def inGameCount(self):
-        return len(self.serialsInGame())
+        return len(self.__serialsInGameSet())
 
     def serialsInGame(self):
-        return [s for s, p in self.serial2player.iteritems() if s in self.player_list and p.isInGame()]
+        in_game = self.__serialsInGameSet()
+        return [s for s in self.serial2player.iterkeys() if s in in_game]
 
     def playersInGame(self):
-        return [p for s, p in self.serial2player.iteritems() if s in self.player_list and p.isInGame()]
+        in_game = self.__serialsInGameSet()
+        return [p for s, p in self.serial2player.iteritems() if s in in_game]
 
     def allInCount(self):
-        return len(self.serialsAllIn())
+        return len(self.player_indexes['all_in'].intersection(self.__playerSet()))
 
     def serialsAllIn(self):
-        return filter(lambda x: self.serial2player[x].isAllIn(), self.player_list)
+        all_in = self.player_indexes['all_in']
+        return [serial for serial in self.player_list if serial in all_in]
 
     def playersAllIn(self):
         return [self.serial2player[serial] for serial in self.serialsAllIn()]
@@ -3869,16 +4320,18 @@ class PokerGame:
     def serialsNotFoldShowdownSorted(self):
         next_to_dealer = self.indexAdd(self.dealer, 1)
         player_list = self.player_list[next_to_dealer:] + self.player_list[:next_to_dealer]
-        return filter(lambda x: not self.serial2player[x].isFold(), player_list)
+        fold = self.player_indexes['fold']
+        return [serial for serial in player_list if serial not in fold]
 
     def playersNotFoldShowdownSorted(self):
         return [self.serial2player[serial] for serial in self.serialsNotFoldShowdownSorted()]
 
     def notFoldCount(self):
-        return len(self.serialsNotFold())
+        return len(self.player_list) - len(self.player_indexes['fold'].intersection(self.__playerSet()))
 
     def serialsNotFold(self):
-        return [serial for serial in self.player_list if not self.serial2player[serial].isFold()]
+        fold = self.player_indexes['fold']
+        return [serial for serial in self.player_list if serial not in fold]
 
     def playersNotFold(self):
         return [self.serial2player[serial] for serial in self.serialsNotFold()]
@@ -3905,7 +4358,7 @@ class PokerGame:
     #
     def roundCap(self):
         if self.isRunning():
-            return int(self.betInfo()["cap"])
+            return self.betLimit().cap
         return 0
 
     def betLimits(self):
@@ -3913,34 +4366,18 @@ class PokerGame:
         # Figure out the theorical max/min bet, regarless of the
         # player[serial] bet/money status
         #
-        info = self.betInfo()
-
-        if 'fixed' in info:
-            fixed = int(info["fixed"])
-            min_bet, max_bet = fixed, fixed
-        elif 'pow_level' in info:
-            fixed = int(info["pow_level"]) * pow(2, self.getLevel() - 1)
-            min_bet, max_bet = fixed, fixed
+        limit = self.betLimit()
+        if limit.min_rule == pokertemplates.BET_LIMIT_VALUE:
+            min_bet = limit.min_bet
+        elif limit.min_rule == pokertemplates.BET_LIMIT_BIG:
+            min_bet = self.bigBlind()
+        elif limit.min_rule == pokertemplates.BET_LIMIT_POW_LEVEL:
+            min_bet = limit.minBetOfLevel(self.getLevel())
         else:
-            if 'min' in info:
-                if info["min"] == "big":
-                    min_bet = self.bigBlind()
-                else:
-                    min_bet = int(info["min"])
-            elif 'min_pow_level' in info:
-                min_bet = int(info["min_pow_level"]) * pow(2, self.getLevel() - 1)
-            else:
-                min_bet = 0
-
-            if 'max' in info:
-                if re.match("[0-9]+$", info["max"]):
-                    max_bet = int(info["max"])
-                elif info["max"] == "pot":
-                    max_bet = "pot"
-            else:
-                max_bet = "money"
-
-        return (min_bet, max_bet)
+            raise UserWarning("betLimits: %s" % limit.error)
+        if limit.max_bet is None:
+            return (min_bet, min_bet)
+        return (min_bet, limit.max_bet)
 
     def betLimitsForSerial(self, serial):
         if not self.isRunning():
@@ -3969,21 +4406,24 @@ class PokerGame:
         return (min_raise, max_raise, to_call)
 
     def potAndBetsAmount(self):
-        pot = self.pot
-        for player in self.playersPlaying():
-            pot += player.bet
-        return pot
+        if not self.isRunning():
+            return self.pot
+        self.__betsUpdate()
+        return self.pot + self.bets_total
 
     def autoBlindAnte(self, serial):
         self.getPlayer(serial).auto_blind_ante = True
+        self.runPlayerCallbacks("autoBlindAnte", serial)
         if self.isBlindAnteRound() and self.getSerialInPosition() == serial:
             self.autoPayBlindAnte()
 
     def noAutoBlindAnte(self, serial):
         self.getPlayer(serial).auto_blind_ante = False
+        self.runPlayerCallbacks("noAutoBlindAnte", serial)
 
     def autoMuck(self, serial, auto_muck):
         self.getPlayer(serial).auto_muck = auto_muck
+        self.runPlayerCallbacks("autoMuck", serial, auto_muck)
 
     def payBuyIn(self, serial, amount):
         if not self.isTournament() and amount > self.maxBuyIn():
@@ -3991,6 +4431,7 @@ class PokerGame:
             return False
         player = self.getPlayer(serial)
         player.money = amount
+        self.runPlayerCallbacks("payBuyIn", serial, amount)
         if self.isTournament() or player.money >= self.buyIn():
             player.buy_in_payed = True
             return True
@@ -4047,21 +4488,21 @@ class PokerGame:
 
     def getParamList(self, name):
         if name[:4] == "/bet":
-            return self.__betting_structure.headerGetList(name)
+            return self.__betting_structure.config.headerGetList(name)
         else:
-            return self.__variant.headerGetList(name)
+            return self.__variant.config.headerGetList(name)
 
     def getParam(self, name):
         if name[:4] == "/bet":
-            return self.__betting_structure.headerGet(name)
+            return self.__betting_structure.config.headerGet(name)
         else:
-            return self.__variant.headerGet(name)
+            return self.__variant.config.headerGet(name)
 
     def getParamProperties(self, name):
         if name[:4] == "/bet":
-            return self.__betting_structure.headerGetProperties(name)
+            return self.__betting_structure.config.headerGetProperties(name)
         else:
-            return self.__variant.headerGetProperties(name)
+            return self.__variant.config.headerGetProperties(name)
 
     def full(self):
         return self.allCount() == self.max_players
@@ -4070,7 +4511,7 @@ class PokerGame:
         return self.allCount() == 0
 
     def changeState(self, state):
-        self.log.debug("changing state %s => %s", self.state, state)
+        if self.log_debug: self.log.debug("changing state %s => %s", self.state, state)
         self.state = state
 
     def isRunning(self):
@@ -4082,28 +4523,72 @@ class PokerGame:
     def isEndOrNull(self):
         return self.state == GAME_STATE_NULL or self.state == GAME_STATE_END
 
-    def registerCallback(self, callback):
+    def registerCallback(self, callback, events=None):
+        """
+        callback(game_id, event_type, *args) is called for the events
+        of the game, or only for those of the types listed in events.
+        A callback that did not list "auto_actions" is called for each
+        event of a batch of automatic actions that is of a type listed.
+        The changes of the players that are not in the turn history
+        (PLAYER_EVENTS) are only given to the callbacks that list them.
+        """
         if not callback in self.callbacks:
             self.callbacks.append(callback)
+        if events is None:
+            self.callback_events.pop(callback, None)
+        else:
+            self.callback_events[callback] = frozenset(events)
 
     def unregisterCallback(self, callback):
         self.callbacks.remove(callback)
+        self.callback_events.pop(callback, None)
 
     def runCallbacks(self, *args):
+        if self.trusted:
+            return
+        if self.__auto_events is not None:
+            self.__auto_events.append(args)
+            return
+        if not self.callback_events:
+            for callback in self.callbacks:
+                callback(self.id, *args)
+            return
+        event_type = args[0]
+        for callback in self.callbacks:
+            events = self.callback_events.get(callback)
+            if events is None or event_type in events:
+                callback(self.id, *args)
+            elif event_type == "auto_actions":
+                for auto_args in args[1]:
+                    if auto_args[0] in events:
+                        callback(self.id, *auto_args)
+
+    def runPlayerCallbacks(self, *args):
+        """Give a change of the players (PLAYER_EVENTS) to the callbacks
+        that registered for it, when it is done. It is not batched with
+        the automatic actions."""
+        if self.trusted or not self.callback_events:
+            return
+        event_type = args[0]
         for callback in self.callbacks:
-            callback(self.id, *args)
+            events = self.callback_events.get(callback)
+            if events is not None and event_type in events:
+                callback(self.id, *args)
 
     def historyAddNoDuplicate(self, *args):
         if len(self.turn_history) < 1 or self.turn_history[-1] != args:
             self.historyAdd(*args)
         else:
-            self.log.debug("ignore duplicate history event %s", args)
+            if self.log_debug: self.log.debug("ignore duplicate history event %s", args)
 
     def historyAdd(self, *args):
+        if self.trusted:
+            return
         self.runCallbacks(*args)
         self.turn_history.append(args)
-        self.log.debug("Pot=%f", self.pot)
-        self.log.debug("Side Pot=%s", str(self.side_pots))
+        if self.log_debug:
+            self.log.debug("Pot=%f", self.pot)
+            self.log.debug("Side Pot=%s", self.side_pots)
 
     def updateHistoryEnd(self, winners, showdown_stack):
         for index in range(-1, -len(self.turn_history), -1):
@@ -4128,94 +4613,95 @@ class PokerGame:
     def _historyFinalEvent(event):
         return event[0] in ("showdown","muck") or (event[0]=="round" and event[1] != GAME_STATE_BLIND_ANTE)
 
+    _history_reduce_removed_types = frozenset((
+        'sit', 'blind_request', 'ante_request',
+        'sitOut', 'wait_blind', 'wait_for', 'player_list',
+    ))
+
     @staticmethod
     def _historyReduce(turn_history, money_map, in_place=False):
         player_list_index = 7
         serial2chips_index = 9
-
-        if not in_place: turn_history = deepcopy(turn_history)
-
-        game_event = None
-        player_list_new = None
         #
-        # parse events
-        remove_indexes = []
-        sitouts_for_player = defaultdict(list)
-        sits_for_player = defaultdict(list)
-        index = 0
+        # locate the game event, the last player list and the end of the
+        # blind/ante round: only the events before it are reduced
+        game_index = None
+        player_list_new = None
+        final_index = len(turn_history)
         for index,event in enumerate(turn_history):
             event_type = event[0]
             if PokerGame._historyFinalEvent(event):
+                final_index = index
                 break
             elif event_type == 'game':
-                game_event = turn_history[index]
-            elif event_type == 'sit':
-                remove_indexes.append(index)
-                sits_for_player[event[1]].append(index)
-            elif event_type in ('blind_request','ante_request'):
-                remove_indexes.append(index)
-            elif event_type in ('sitOut','wait_blind'):
-                remove_indexes.append(index)
-                sitouts_for_player[event[1]].append(index)
-            elif event_type == 'wait_for':
-                remove_indexes.append(index)
-                sitouts_for_player[event[1]].append(index)
+                game_index = index
             elif event_type == 'player_list':
-                remove_indexes.append(index)
                 player_list_new = event[1]
+
+        game_event = turn_history[game_index] if game_index is not None else None
         #
         # recreate playerlist.
-        # either use the player list, if their is some
+        # either use the player list, if their is some. The game event is
+        # the only one modified: unless in_place, it is rebuilt with its own
+        # player list and chips and the other events are shared.
         if player_list_new is not None:
-            for serial in set(game_event[player_list_index]) - set(player_list_new):
-                del game_event[serial2chips_index][serial]
-            for serial in set(player_list_new) - set(game_event[player_list_index]):
-                game_event[serial2chips_index][serial] = money_map[serial]
-            game_event[player_list_index][:] = player_list_new
-            for index,event in enumerate(turn_history):
-                if event[0] == 'rebuy' and event[1] in player_list_new:
-                    remove_indexes.append(index)
-        #
-        # recreate and mark positions if needed
-        for p_index in range(0,len(turn_history)):
-            if (
-                not turn_history[p_index][0] == "position" or
-                not turn_history[p_index][1] >= 0
-                or p_index in remove_indexes
-            ):
-                continue
-            event_type, position, serial = turn_history[p_index]
-            position_reduced = game_event[player_list_index].index(serial) \
-                if serial is not None and serial in game_event[player_list_index] \
-                else None
-            if position == position_reduced:
-                pass # no need to replace if it's already equal
-            elif position_reduced is not None and position >= 0:
-                turn_history[p_index] = (event_type, position_reduced, serial)
+            player_list = game_event[player_list_index]
+            serial2chips = game_event[serial2chips_index]
+            if not in_place:
+                serial2chips = serial2chips.copy()
+            for serial in set(player_list) - set(player_list_new):
+                del serial2chips[serial]
+            for serial in set(player_list_new) - set(player_list):
+                serial2chips[serial] = money_map[serial]
+            if in_place:
+                player_list[:] = player_list_new
             else:
-                remove_indexes.append(p_index)
+                game_event = list(game_event)
+                game_event[player_list_index] = list(player_list_new)
+                game_event[serial2chips_index] = serial2chips
+                game_event = tuple(game_event)
+            rebuy_serials = set(player_list_new)
+        else:
+            rebuy_serials = ()
         #
-        # delete duplicate positions
+        # position of each serial in the reduced player list
+        if game_event is not None:
+            seats = {}
+            for position,serial in enumerate(game_event[player_list_index]):
+                seats.setdefault(serial, position)
+        else:
+            seats = None
+        #
+        # copy the events that are kept, with the positions recreated
+        # and without duplicates
+        removed_types = PokerGame._history_reduce_removed_types
+        reduced = []
         pos_last = None
-        for p_index in range(0,len(turn_history)):
-            if (
-                not turn_history[p_index][0] == "position" or
-                not turn_history[p_index][1] >= 0
-                or p_index in remove_indexes
-            ):
+        for index,event in enumerate(turn_history):
+            event_type = event[0]
+            if index < final_index and event_type in removed_types:
                 continue
-            pos_current = turn_history[p_index]
-            if pos_current == pos_last:
-                remove_indexes.append(p_index)
-            else:
-                pos_last = pos_current
-        #
-        # delete all obsolete elements
-        for index in sorted(remove_indexes,reverse=True):
-            del turn_history[index]
+            elif index == game_index:
+                event = game_event
+            elif event_type == 'rebuy':
+                if event[1] in rebuy_serials:
+                    continue
+            elif event_type == 'position' and event[1] >= 0:
+                event_type, position, serial = event
+                position_reduced = seats.get(serial) if serial is not None else None
+                if position_reduced is None:
+                    continue
+                elif position != position_reduced:
+                    event = (event_type, position_reduced, serial)
+                if event == pos_last:
+                    continue
+                pos_last = event
+            reduced.append(event)
 
-        if not in_place:
-            return turn_history
+        if in_place:
+            turn_history[:] = reduced
+        else:
+            return reduced
 
 
 class PokerGameServer(PokerGame):
@@ -0,0 +1,509 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Compact binary encoding of the turn_history events, for archiving
+# and IPC.
+#
+# A stream starts with the HEADER (magic and version) followed by one
+# record per event: the length of the record as a varint, the code of
+# the event and its fields. Each event type has a fixed list of field
+# types: serials and amounts are varints, cards are one byte each and
+# the most common strings are interned.
+# An event that does not match the fields of its type (or an unknown
+# event) is recorded with code 0 and generic values (None, booleans,
+# numbers, strings, lists, tuples, dicts and PokerCards) so that it
+# survives the round trip. A value of another type raises ValueError:
+# nothing is pickled, decoding a stream never runs code from it.
+#
+#   data = pokerhistory.dumps(game.turn_history)
+#   assert pokerhistory.loads(data) == game.turn_history
+#
+import struct
+
+from pokerengine.pokercards import PokerCards
+
+MAGIC = "PKH"
+VERSION = 1
+HEADER = MAGIC + chr(VERSION)
+
+#
+# field types
+#
+INT = 0               # signed integer
+SERIAL = 1            # positive integer
+OPTIONAL_SERIAL = 2   # positive integer or None
+STRING = 3
+CARDS = 4             # PokerCards
+SERIALS = 5           # list of serials
+HANDS = 6             # serial => PokerCards
+MONEY = 7             # serial => signed integer
+VALUE = 8             # any value, see write_value
+
+#
+# The code of an event is its index in this list plus one. Events are
+# only ever appended to the list so that the streams written with a
+# previous version can still be decoded.
+#
+EVENTS = (
+    ("game", (INT, INT, INT, VALUE, STRING, STRING, SERIALS, INT, MONEY)),
+    ("position", (INT, OPTIONAL_SERIAL)),
+    ("blind_request", (SERIAL, INT, INT, STRING)),
+    ("ante_request", (SERIAL, INT)),
+    ("blind", (SERIAL, INT, INT)),
+    ("ante", (SERIAL, INT)),
+    ("wait_for", (SERIAL, VALUE)),
+    ("wait_blind", (SERIAL,)),
+    ("player_list", (SERIALS,)),
+    ("sit", (SERIAL, VALUE)),
+    ("sitOut", (SERIAL,)),
+    ("round", (STRING, CARDS, HANDS)),
+    ("call", (SERIAL, INT)),
+    ("check", (SERIAL,)),
+    ("raise", (SERIAL, INT)),
+    ("fold", (SERIAL, VALUE)),
+    ("all-in", (SERIAL,)),
+    ("showdown", (CARDS, HANDS)),
+    ("muck", (SERIALS,)),
+    ("rake", (INT, MONEY)),
+    ("end", (SERIALS, VALUE)),
+    ("leave", (VALUE,)),
+    ("finish", (INT,)),
+    ("canceled", (SERIAL, INT)),
+    ("rebuy", (SERIAL, INT)),
+    ("buyOut", (SERIAL, INT, INT)),
+)
+
+EVENT2CODE = dict((name, code + 1) for (code, (name, fields)) in enumerate(EVENTS))
+
+#
+# Strings recorded as their index in this list: the game states, the
+# blind states, the keys of the showdown stack frames and the names of
+# the hands. Changing the list requires a new VERSION.
+#
+STRINGS = (
+    "blindAnte", "pre-flop", "flop", "third", "turn", "fourth", "river", "fifth", "muck", "end",
+    "big", "small", "late", "big_and_dead", "first_round",
+    "type", "game_state", "resolve", "left_over", "uncalled",
+    "serial2best", "player_list", "side_pots", "pot", "foldwin", "serial2share",
+    "serial2delta", "serial2rake", "serial2money", "serials", "chips_left", "serial",
+    "contributions", "total", "pots", "building", "last_round",
+    "hi", "low",
+    "Nothing", "NoPair", "OnePair", "TwoPair", "Trips", "Straight", "Flush", "FlHouse", "Quads", "StFlush",
+)
+
+STRING2INDEX = dict((string, index) for (index, string) in enumerate(STRINGS))
+
+_BYTES = tuple(chr(i) for i in xrange(256))
+_INTEGERS = (int, long)
+_DOUBLE = struct.Struct("<d")
+
+class _Mismatch(Exception):
+    """The value does not match the field type."""
+
+#
+# varints
+#
+def write_uint(out, value):
+    if value < 0x80:
+        out.append(_BYTES[value])
+        return
+    while value >= 0x80:
+        out.append(_BYTES[(value & 0x7f) | 0x80])
+        value >>= 7
+    out.append(_BYTES[value])
+
+def read_uint(data, offset):
+    byte = ord(data[offset])
+    offset += 1
+    if byte < 0x80:
+        return (byte, offset)
+    value = byte & 0x7f
+    shift = 7
+    while True:
+        byte = ord(data[offset])
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return (value, offset)
+        shift += 7
+
+def write_int(out, value):
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    if value < 0x80:
+        out.append(_BYTES[value])
+    else:
+        write_uint(out, value)
+
+def read_int(data, offset):
+    value = ord(data[offset])
+    if value < 0x80:
+        offset += 1
+    else:
+        (value, offset) = read_uint(data, offset)
+    return (-((value + 1) >> 1) if value & 1 else value >> 1, offset)
+
+def write_string(out, value):
+    write_uint(out, len(value))
+    out.append(value)
+
+def read_string(data, offset):
+    (length, offset) = read_uint(data, offset)
+    end = offset + length
+    return (data[offset:end], end)
+
+def write_text(out, value):
+    """Write an interned string as its odd index, other strings as
+    their even length followed by the bytes."""
+    index = STRING2INDEX.get(value)
+    if index is not None:
+        write_uint(out, (index << 1) | 1)
+    else:
+        write_uint(out, len(value) << 1)
+        out.append(value)
+
+def read_text(data, offset):
+    (value, offset) = read_uint(data, offset)
+    if value & 1:
+        return (STRINGS[value >> 1], offset)
+    end = offset + (value >> 1)
+    return (data[offset:end], end)
+
+def write_cards(out, cards):
+    write_string(out, "".join([_BYTES[card] for card in cards.cards]))
+
+def read_cards(data, offset):
+    (raw, offset) = read_string(data, offset)
+    cards = PokerCards()
+    cards.cards = map(ord, raw)
+    return (cards, offset)
+
+#
+# generic values
+#
+def write_value(out, value):
+    kind = value.__class__
+    if value is None:
+        out.append("N")
+    elif value is False:
+        out.append("F")
+    elif value is True:
+        out.append("T")
+    elif kind in _INTEGERS:
+        out.append("i")
+        write_int(out, value)
+    elif isinstance(value, str):
+        out.append("s")
+        write_text(out, value)
+    elif kind is list or kind is tuple:
+        out.append("l" if kind is list else "t")
+        write_uint(out, len(value))
+        for item in value:
+            write_value(out, item)
+    elif kind is dict:
+        out.append("d")
+        write_uint(out, len(value))
+        for (key, item) in value.iteritems():
+            write_value(out, key)
+            write_value(out, item)
+    elif kind is PokerCards and _cards_fit_bytes(value):
+        out.append("c")
+        write_cards(out, value)
+    elif kind is PokerCards:
+        out.append("C")
+        write_uint(out, len(value.cards))
+        for card in value.cards:
+            write_int(out, card)
+    elif kind is float:
+        out.append("f")
+        out.append(_DOUBLE.pack(value))
+    elif kind is unicode:
+        out.append("u")
+        write_string(out, value.encode("utf-8"))
+    else:
+        raise ValueError("cannot encode %s value %r" % (kind.__name__, value))
+
+def read_value(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag == "N":
+        return (None, offset)
+    elif tag == "F":
+        return (False, offset)
+    elif tag == "T":
+        return (True, offset)
+    elif tag == "i":
+        return read_int(data, offset)
+    elif tag == "s":
+        return read_text(data, offset)
+    elif tag == "l" or tag == "t":
+        (length, offset) = read_uint(data, offset)
+        items = []
+        for i in xrange(length):
+            (item, offset) = read_value(data, offset)
+            items.append(item)
+        return (items if tag == "l" else tuple(items), offset)
+    elif tag == "d":
+        (length, offset) = read_uint(data, offset)
+        value = {}
+        for i in xrange(length):
+            (key, offset) = read_value(data, offset)
+            (value[key], offset) = read_value(data, offset)
+        return (value, offset)
+    elif tag == "c":
+        return read_cards(data, offset)
+    elif tag == "C":
+        (length, offset) = read_uint(data, offset)
+        cards = PokerCards()
+        for i in xrange(length):
+            (card, offset) = read_int(data, offset)
+            cards.cards.append(card)
+        return (cards, offset)
+    elif tag == "f":
+        return (_DOUBLE.unpack_from(data, offset)[0], offset + _DOUBLE.size)
+    elif tag == "u":
+        (raw, offset) = read_string(data, offset)
+        return (raw.decode("utf-8"), offset)
+    else:
+        raise ValueError("unknown value tag %r at offset %d" % (tag, offset - 1))
+
+def _cards_fit_bytes(cards):
+    for card in cards.cards:
+        if card.__class__ not in _INTEGERS or not 0 <= card <= 255:
+            return False
+    return True
+
+#
+# typed fields
+#
+def _is_serial(value):
+    return value.__class__ in _INTEGERS and value >= 0
+
+def _write_int_field(out, value):
+    if value.__class__ not in _INTEGERS: raise _Mismatch()
+    write_int(out, value)
+
+def _write_serial_field(out, value):
+    if not _is_serial(value): raise _Mismatch()
+    write_uint(out, value)
+
+def _write_optional_serial_field(out, value):
+    if value is None:
+        out.append(_BYTES[0])
+    elif _is_serial(value):
+        write_uint(out, value + 1)
+    else:
+        raise _Mismatch()
+
+def _write_string_field(out, value):
+    if not isinstance(value, str): raise _Mismatch()
+    write_text(out, value)
+
+def _write_cards_field(out, value):
+    if value.__class__ is not PokerCards or not _cards_fit_bytes(value): raise _Mismatch()
+    write_cards(out, value)
+
+def _write_serials_field(out, value):
+    if value.__class__ is not list: raise _Mismatch()
+    write_uint(out, len(value))
+    for serial in value:
+        if not _is_serial(serial): raise _Mismatch()
+        write_uint(out, serial)
+
+def _write_map_field(write_item):
+    def write(out, value):
+        if value.__class__ is not dict: raise _Mismatch()
+        write_uint(out, len(value))
+        for (serial, item) in value.iteritems():
+            if not _is_serial(serial): raise _Mismatch()
+            write_uint(out, serial)
+            write_item(out, item)
+    return write
+
+def _read_optional_serial_field(data, offset):
+    (value, offset) = read_uint(data, offset)
+    return (value - 1 if value else None, offset)
+
+def _read_serials_field(data, offset):
+    (length, offset) = read_uint(data, offset)
+    serials = []
+    for i in xrange(length):
+        (serial, offset) = read_uint(data, offset)
+        serials.append(serial)
+    return (serials, offset)
+
+def _read_map_field(read_item):
+    def read(data, offset):
+        (length, offset) = read_uint(data, offset)
+        value = {}
+        for i in xrange(length):
+            (serial, offset) = read_uint(data, offset)
+            (value[serial], offset) = read_item(data, offset)
+        return (value, offset)
+    return read
+
+#
+# the functions writing and reading each field type, in the order of
+# the field types
+#
+FIELD_WRITERS = (
+    _write_int_field, _write_serial_field, _write_optional_serial_field,
+    _write_string_field, _write_cards_field, _write_serials_field,
+    _write_map_field(_write_cards_field), _write_map_field(_write_int_field),
+    write_value,
+)
+
+FIELD_READERS = (
+    read_int, read_uint, _read_optional_serial_field,
+    read_text, read_cards, _read_serials_field,
+    _read_map_field(read_cards), _read_map_field(read_int),
+    read_value,
+)
+
+_EVENT_WRITERS = [None] + [tuple(FIELD_WRITERS[field] for field in fields) for (name, fields) in EVENTS]
+_EVENT_READERS = [None] + [(name, tuple(FIELD_READERS[field] for field in fields)) for (name, fields) in EVENTS]
+
+#
+# events
+#
+def encode_event(event):
+    """Return the binary form of the event tuple, without the record
+    length."""
+    code = EVENT2CODE.get(event[0])
+    if code is not None:
+        writers = _EVENT_WRITERS[code]
+        if len(event) == len(writers) + 1:
+            out = [_BYTES[code]]
+            try:
+                index = 1
+                for write in writers:
+                    write(out, event[index])
+                    index += 1
+                return "".join(out)
+            except _Mismatch:
+                pass
+    out = [_BYTES[0]]
+    write_value(out, tuple(event))
+    return "".join(out)
+
+def decode_event(data, offset = 0, end = None):
+    """Return the event tuple encoded by encode_event at offset in data."""
+    code = ord(data[offset])
+    offset += 1
+    if code == 0:
+        (event, offset) = read_value(data, offset)
+    elif code <= len(EVENTS):
+        (name, readers) = _EVENT_READERS[code]
+        event = [name]
+        for read in readers:
+            (value, offset) = read(data, offset)
+            event.append(value)
+        event = tuple(event)
+    else:
+        raise ValueError("unknown event code %d" % code)
+    if end is not None and offset != end:
+        raise ValueError("event %s ends at offset %d instead of %d" % (event[0], offset, end))
+    return event
+
+def encode_record(event):
+    payload = encode_event(event)
+    length = len(payload)
+    if length < 0x80:
+        return _BYTES[length] + payload
+    out = []
+    write_uint(out, length)
+    out.append(payload)
+    return "".join(out)
+
+def check_header(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a turn history stream")
+    version = ord(data[len(MAGIC)])
+    if version > VERSION:
+        raise ValueError("turn history stream version %d is newer than %d" % (version, VERSION))
+
+def dumps(history):
+    """Return the turn history as a stream, header included."""
+    return HEADER + "".join([encode_record(event) for event in history])
+
+def loads(data):
+    """Return the list of events of a complete stream."""
+    reader = HistoryReader()
+    events = reader.feed(data)
+    if not reader.isComplete():
+        raise ValueError("truncated turn history stream")
+    return events
+
+class HistoryWriter:
+    """Append the events to a file like object, one record at a time."""
+
+    def __init__(self, output):
+        self.output = output
+        output.write(HEADER)
+
+    def write(self, event):
+        self.output.write(encode_record(event))
+
+    def writeHistory(self, history):
+        self.output.write("".join([encode_record(event) for event in history]))
+
+class HistoryReader:
+    """Decode a stream fed in chunks of any size, or read from a file
+    like object by iterating over the reader."""
+
+    def __init__(self, input = None, chunk_size = 65536):
+        self.input = input
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.header = False
+
+    def isComplete(self):
+        return self.header and self.buffer == ""
+
+    def feed(self, data):
+        """Return the list of the events completed by data."""
+        buffer = self.buffer + data if self.buffer else data
+        offset = 0
+        if not self.header:
+            if len(buffer) < len(HEADER):
+                self.buffer = buffer
+                return []
+            check_header(buffer)
+            self.header = True
+            offset = len(HEADER)
+        events = []
+        size = len(buffer)
+        while offset < size:
+            try:
+                (length, start) = read_uint(buffer, offset)
+            except IndexError:
+                break
+            end = start + length
+            if end > size:
+                break
+            events.append(decode_event(buffer, start, end))
+            offset = end
+        self.buffer = buffer[offset:]
+        return events
+
+    def __iter__(self):
+        while True:
+            data = self.input.read(self.chunk_size)
+            if not data:
+                break
+            for event in self.feed(data):
+                yield event
+        if not self.isComplete():
+            raise ValueError("truncated turn history stream")
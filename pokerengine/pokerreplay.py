@@ -0,0 +1,252 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Rebuild a PokerGameClient from the turn histories of the hands, as
+# a client following a table does from the server packets.
+#
+# The game is given the players of the table (addPlayer, money, sit)
+# and each history is applied in turn: the game then is in the state
+# of the server game at the end of the hand and its turn_history is
+# the replayed history.
+#
+#   game = PokerGameClient("poker.%s.xml", dirs)
+#   ...
+#   for game in pokerreplay.replay_histories(game, histories, trusted = True):
+#       audit(game)
+#
+# A trusted replay is for histories known to be legal (produced by a
+# server game): the actions are not checked (PokerGame.trusted), the
+# callbacks are not run, the debug messages are not logged and the
+# hands are not evaluated, the outcome of the showdown is the one
+# recorded in the "end" event. It ends in the same state as a replay
+# that is not trusted.
+#
+from pokerengine.pokergame import uniq, GAME_STATE_MUCK, WON_ALLIN_BLIND
+
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerreplay')
+
+class PokerHistoryReplay:
+
+    #
+    # The method applying each event of a history to the game. The
+    # events that follow from others, or that the client ignores, are
+    # not applied.
+    #
+    HANDLERS = {
+        "game": "beginTurn",
+        "position": "position",
+        "blind_request": "blindRequest",
+        "blind": "blind",
+        "ante": "ante",
+        "wait_blind": "waitBlind",
+        "wait_for": "waitFor",
+        "player_list": "playerList",
+        "call": "call",
+        "check": "check",
+        "fold": "fold",
+        "raise": "callNraise",
+        "round": "round",
+        "muck": "muck",
+        "showdown": "showdown",
+        "end": "end",
+        "sit": "sit",
+        "sitOut": "sitOut",
+        "rebuy": "rebuy",
+        "buyOut": "buyOut",
+        "canceled": "canceled",
+        "ante_request": None,
+        "all-in": None,
+        "rake": None,
+        "finish": None,
+    }
+
+    def __init__(self, game, trusted = False):
+        self.game = game
+        self.trusted = trusted
+        self.history = None
+        self.ended = False
+
+    def replay(self, history):
+        """Apply the events of history (the turn_history of a hand) to the game."""
+        game = self.game
+        if self.trusted:
+            saved = (game.trusted, game.log_debug)
+            game.trusted = True
+            game.log_debug = False
+        self.history = history
+        self.ended = False
+        try:
+            for event in history:
+                if self.ended:
+                    #
+                    # the events that follow the end of the hand are
+                    # produced by endTurn
+                    #
+                    self.ended = event[0] != "finish"
+                    continue
+                if event[0] not in self.HANDLERS:
+                    raise UserWarning("table %d: cannot replay %s" % (game.id, event))
+                handler = self.HANDLERS[event[0]]
+                if handler:
+                    getattr(self, handler)(event)
+        finally:
+            if self.trusted:
+                (game.trusted, game.log_debug) = saved
+            self.history = None
+        game.turn_history = list(history)
+        return game
+
+    def beginTurn(self, event):
+        game = self.game
+        (level, hand_serial, hands_count, time, variant, betting_structure, player_list, dealer_seat, serial2chips) = event[1:]
+        for serial in player_list:
+            if game.isSitOut(serial):
+                game.sit(serial)
+        for (serial, chips) in serial2chips.iteritems():
+            game.serial2player[serial].money = chips
+        game.setDealer(dealer_seat)
+        game.beginTurn(hand_serial)
+        if game.player_list != player_list:
+            raise UserWarning("table %d: hand %d is dealt to %s instead of %s" % (game.id, hand_serial, game.player_list, player_list))
+
+    def position(self, event):
+        if self.game.isRunning():
+            self.game.setPosition(event[1])
+
+    def blindRequest(self, event):
+        self.game.setPlayerBlind(event[1], event[4])
+
+    def blind(self, event):
+        self.game.blind(event[1], event[2], event[3])
+
+    def ante(self, event):
+        self.game.ante(event[1], event[2])
+
+    def waitBlind(self, event):
+        self.game.waitBigBlind(event[1])
+
+    def waitFor(self, event):
+        self.game.serial2player[event[1]].wait_for = event[2]
+
+    def playerList(self, event):
+        self.game.player_list = list(event[1])
+        self.game.sortPlayerList()
+
+    def call(self, event):
+        self.game.call(event[1])
+
+    def check(self, event):
+        self.game.check(event[1])
+
+    def fold(self, event):
+        self.game.fold(event[1])
+
+    def callNraise(self, event):
+        self.game.callNraise(event[1], event[2])
+
+    def sit(self, event):
+        self.game.sit(event[1])
+
+    def sitOut(self, event):
+        self.game.sitOut(event[1])
+
+    def rebuy(self, event):
+        self.game.rebuy(event[1], event[2])
+
+    def buyOut(self, event):
+        self.game.serial2player[event[1]].money = 0
+
+    def canceled(self, event):
+        self.game.canceled(event[1], event[2])
+
+    def cards(self, board, hands):
+        game = self.game
+        game.board = board.copy()
+        for (serial, hand) in hands.iteritems():
+            game.serial2player[serial].hand = hand.copy()
+
+    def round(self, event):
+        game = self.game
+        (state, board, hands) = event[1:]
+        if game.isBlindAnteRound():
+            game.blindAnteRoundEnd()
+        while game.state != state and game.state != GAME_STATE_MUCK and game.isRunning():
+            game.nextRound()
+        self.cards(board, hands)
+        if game.state == state and game.position == -1 and not (game.inGameCount() < 2 and game.betsEqual()):
+            game.initRound()
+
+    def muck(self, event):
+        self.game.setMuckableSerials(event[1])
+
+    def showdown(self, event):
+        game = self.game
+        self.cards(event[1], event[2])
+        if game.state != GAME_STATE_MUCK:
+            while not game.isLastRound():
+                game.nextRound()
+            game.muckState(WON_ALLIN_BLIND)
+        end = self.trusted and self.find("end")
+        if end:
+            self.distributeMoney(end[1], end[2])
+        else:
+            game.distributeMoney()
+
+    def end(self, event):
+        self.game.endState()
+        self.ended = True
+
+    def find(self, name):
+        for event in reversed(self.history):
+            if event[0] == name:
+                return event
+        return None
+
+    def distributeMoney(self, winners, showdown_stack):
+        """The state PokerGame.distributeMoney leaves, from the outcome
+        recorded by the server game."""
+        game = self.game
+        game_state = showdown_stack[0]
+        side2winners = {'hi': [], 'low': []}
+        for frame in showdown_stack:
+            if frame['type'] == 'resolve':
+                for side in side2winners.keys():
+                    if frame.get(side):
+                        side2winners[side] += frame[side]
+        for side in side2winners.keys():
+            side2winners[side] = uniq(side2winners[side])
+        rake = self.find("rake")
+        if rake:
+            game.setRakedAmount(rake[1])
+        for (serial, money) in game_state['serial2money'].iteritems():
+            game.serial2player[serial].money = money
+        game.pot = 0
+        game.serial2best = game_state['serial2best']
+        game.side2winners = side2winners
+        game.showdown_stack = showdown_stack
+        game.setWinners(winners)
+
+def replay(game, history, trusted = False):
+    """Apply history (the turn_history of a hand) to game and return it."""
+    return PokerHistoryReplay(game, trusted).replay(history)
+
+def replay_histories(game, histories, trusted = False):
+    """Apply each of histories to game in turn, yielding the game at the
+    end of each hand."""
+    replay = PokerHistoryReplay(game, trusted)
+    for history in histories:
+        yield replay.replay(history)
@@ -0,0 +1,241 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Run the PokerGameServer tables of a process on one asyncio event
+# loop. Requires trollius (asyncio for Python 2).
+#
+# A PokerTableRunner owns the games added to it. It deals the next
+# hand of a game delay seconds after the previous one ended (with
+# call_later, the loop is never blocked waiting for it), as long as
+# two players can sit. The actions of the players are awaited as
+# coroutines are:
+#
+#   runner = PokerTableRunner(timeout = 30, delay = 2)
+#   runner.add(game)
+#   ...
+#   serial = yield From(runner.waitTurn(game.id))
+#   played = yield From(runner.act(game.id, serial, "raise", 100))
+#
+# A player in position who does not act within timeout seconds is
+# played automatically (autoPlayer) and sits out at the end of the
+# hand (sitOutNextTurn). A player who comes back calls sit, which
+# also stops playing automatically.
+#
+# The bots of a game (botPlayer) play as soon as they are in position,
+# while the action that put them in position is played: only the
+# other players are waited for.
+#
+# The serial of a hand is greater than those of the hands the runner
+# dealt and of the hands the game played before it was added. The
+# runners of a process that must not deal the same serials share a
+# hand_serials function, which returns the serial of the next hand of
+# a game.
+#
+import trollius
+
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokerrunner')
+
+class PokerRunnerTable:
+
+    def __init__(self, game):
+        self.game = game
+        #
+        # the player in position, 0 if none is expected to act
+        #
+        self.serial = 0
+        self.since = 0
+        self.timer = None
+        self.next_hand = None
+        #
+        # futures of waitTurn, by serial (None for any player)
+        #
+        self.waiters = {}
+
+class PokerTableRunner:
+
+    #
+    # The action methods of PokerGame, called with the serial of the
+    # player (and the amount of a raise). blind and ante return None
+    # when the player paid.
+    #
+    ACTIONS = {
+        "fold": lambda game, serial, amount: game.fold(serial),
+        "check": lambda game, serial, amount: game.check(serial),
+        "call": lambda game, serial, amount: game.call(serial),
+        "raise": lambda game, serial, amount: game.callNraise(serial, amount),
+        "blind": lambda game, serial, amount: game.blind(serial),
+        "ante": lambda game, serial, amount: game.ante(serial),
+        "wait_blind": lambda game, serial, amount: game.waitBigBlind(serial),
+    }
+
+    def __init__(self, loop = None, timeout = 30.0, delay = 0.0, hand_serials = None):
+        self.loop = loop or trollius.get_event_loop()
+        self.timeout = timeout
+        self.delay = delay
+        self.hand_serials = hand_serials or self.nextHandSerial
+        self.tables = {}
+        self.hand_serial = 0
+        self.hands = 0
+        self.actions = 0
+        self.timeouts = 0
+
+    def add(self, game):
+        """Run game, dealing its first hand if two players can sit."""
+        if game.id in self.tables:
+            raise UserWarning("table %d is already run" % game.id)
+        table = PokerRunnerTable(game)
+        self.tables[game.id] = table
+        self.schedule(table)
+        return table
+
+    def remove(self, game_id):
+        """Stop running the game: the hand in progress, if any, is left
+        as it is."""
+        table = self.tables.pop(game_id)
+        self.cancel(table)
+        for future in table.waiters.values():
+            future.cancel()
+        table.waiters = {}
+        return table.game
+
+    def close(self):
+        for game_id in self.tables.keys():
+            self.remove(game_id)
+
+    def cancel(self, table):
+        if table.timer is not None:
+            table.timer.cancel()
+            table.timer = None
+        if table.next_hand is not None:
+            table.next_hand.cancel()
+            table.next_hand = None
+        table.serial = 0
+
+    def schedule(self, table):
+        """Wait for the player in position, if any, or schedule the next
+        hand. Called each time the game may have changed."""
+        game = table.game
+        if game.isEndOrNull():
+            if table.timer is not None:
+                table.timer.cancel()
+                table.timer = None
+            table.serial = 0
+            if table.next_hand is None and game.sitCount() >= 2:
+                table.next_hand = self.loop.call_later(self.delay, self.deal, table)
+            return
+        serial = game.getSerialInPosition() if game.isRunning() else 0
+        if table.timer is not None:
+            table.timer.cancel()
+            table.timer = None
+        table.serial = serial
+        if not serial:
+            return
+        table.since = self.loop.time()
+        table.timer = self.loop.call_later(self.timeout, self.expire, table, serial)
+        for key in (serial, None):
+            future = table.waiters.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(serial)
+
+    def deal(self, table):
+        table.next_hand = None
+        game = table.game
+        if not game.isEndOrNull() or game.sitCount() < 2:
+            return
+        self.hands += 1
+        game.beginTurn(self.hand_serials(game))
+        self.schedule(table)
+
+    def nextHandSerial(self, game):
+        self.hand_serial = max(self.hand_serial, game.hand_serial) + 1
+        return self.hand_serial
+
+    def expire(self, table, serial):
+        table.timer = None
+        game = table.game
+        if table.serial != serial or game.getSerialInPosition() != serial:
+            return
+        log.inform("table %d: player %d timed out", game.id, serial)
+        self.timeouts += 1
+        game.sitOutNextTurn(serial)
+        if game.isRunning() and game.getSerialInPosition() == serial:
+            game.autoPlayer(serial)
+        self.schedule(table)
+
+    def waitTurn(self, game_id, serial = None):
+        """Return a future of the serial of the next player to act
+        (serial only when given), done at once if that player is in
+        position."""
+        table = self.tables[game_id]
+        if table.serial and (serial is None or table.serial == serial):
+            return self.done(table.serial)
+        future = table.waiters.get(serial)
+        if future is None or future.done():
+            future = trollius.Future(loop = self.loop)
+            table.waiters[serial] = future
+        return future
+
+    def done(self, value):
+        future = trollius.Future(loop = self.loop)
+        future.set_result(value)
+        return future
+
+    #
+    # The requests of the players are played at once: they return a
+    # future that is already done rather than a coroutine, which would
+    # be run by a task of its own.
+    #
+    def act(self, game_id, serial, action, amount = 0):
+        """Play action (see ACTIONS) for player serial, if in position.
+        Return a future of whether it was played."""
+        table = self.tables[game_id]
+        game = table.game
+        if serial != table.serial or action not in self.ACTIONS:
+            log.inform("table %d: player %d cannot %s", game_id, serial, action)
+            return self.done(False)
+        if self.ACTIONS[action](game, serial, amount) is False:
+            return self.done(False)
+        self.actions += 1
+        self.schedule(table)
+        return self.done(True)
+
+    def sit(self, game_id, serial):
+        """Sit player serial, who stops playing automatically. Return a
+        future of whether the player sits."""
+        table = self.tables[game_id]
+        game = table.game
+        game.noAutoPlayer(serial)
+        sat = game.sit(serial)
+        self.schedule(table)
+        return self.done(sat)
+
+    def sitOut(self, game_id, serial):
+        """Sit player serial out, at the end of the hand if playing.
+        Return a future of whether the player will sit out."""
+        table = self.tables[game_id]
+        game = table.game
+        game.sitOutNextTurn(serial)
+        self.schedule(table)
+        return self.done(game.isSitOut(serial) or game.getPlayer(serial).sit_out_next_turn)
+
+    def stats(self):
+        return {
+            'tables': len(self.tables),
+            'hands': self.hands,
+            'actions': self.actions,
+            'timeouts': self.timeouts,
+        }
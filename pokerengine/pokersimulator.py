@@ -0,0 +1,316 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Headless table simulator: PokerGameServer tables seated with bots
+# play hands back to back, without network, and report hands/s,
+# actions/s and the per action latency percentiles. The tables can be
+# spread over a pool of processes.
+#
+#   python -m pokerengine.pokersimulator --help
+#
+import sys, getopt, random
+from glob import glob
+from os import path
+from timeit import default_timer
+
+from lxml import etree
+
+from pokerengine.pokergame import PokerGameServer
+from pokerengine.players import BasePokerPlayer
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokersimulator')
+
+ACTIONS = ("blind", "ante", "call", "raise", "check", "fold")
+
+class RandomBot(BasePokerPlayer):
+    """Check when possible, otherwise call or fold at random. Raise
+    a random amount within the limits from time to time."""
+
+    def __init__(self, rng, raise_frequency = 0.2, call_frequency = 0.7):
+        BasePokerPlayer.__init__(self)
+        self.rng = rng
+        self.raise_frequency = raise_frequency
+        self.call_frequency = call_frequency
+
+    def eval(self, game):
+        serial = game.getSerialInPosition()
+        actions = game.possibleActions(serial)
+        if "raise" in actions and self.rng.random() < self.raise_frequency:
+            (min_bet, max_bet, to_call) = game.betLimitsForSerial(serial)
+            return ("raise", self.rng.randint(min_bet, max(min_bet, max_bet)))
+        if "check" in actions:
+            return ("check", 0)
+        if "call" in actions and self.rng.random() < self.call_frequency:
+            return ("call", 0)
+        return ("fold", 0)
+
+#
+# Latencies are accumulated in a histogram with a one microsecond
+# resolution so that the results of several tables or processes can be
+# merged before computing the percentiles.
+#
+def latency_add(histogram, seconds):
+    key = int(seconds * 1000000)
+    histogram[key] = histogram.get(key, 0) + 1
+
+def latency_merge(histogram, other):
+    for (key, count) in other.iteritems():
+        histogram[key] = histogram.get(key, 0) + count
+    return histogram
+
+def latency_percentile(histogram, percent):
+    """Return the latency, in seconds, below which lie percent % of the
+    actions."""
+    total = sum(histogram.itervalues())
+    if total == 0:
+        return 0.0
+    threshold = total * percent / 100.0
+    seen = 0
+    for key in sorted(histogram):
+        seen += histogram[key]
+        if seen >= threshold:
+            return key / 1000000.0
+    return max(histogram) / 1000000.0
+
+class PokerTableSimulator:
+
+    log = log.get_child('PokerTableSimulator')
+
+    def __init__(self, variant, betting_structure, dirs, players = 6, seed = 1, url = "poker.%s.xml"):
+        self.log = PokerTableSimulator.log.get_instance(self, refs=[
+            ('Game', self, lambda simulator: simulator.game.id),
+        ])
+        self.rng = random.Random(seed)
+        game = PokerGameServer(url, dirs)
+        game.shuffler = random.Random(seed)
+        game.setVariant(variant)
+        game.setBettingStructure(betting_structure)
+        game.setMaxPlayers(players)
+        for serial in xrange(1, players + 1):
+            game.addPlayer(serial, botPlayer = RandomBot(self.rng))
+            game.payBuyIn(serial, game.bestBuyIn() or game.buyIn())
+            game.sit(serial)
+            game.botPlayer(serial)
+        game.registerCallback(self.event, ACTIONS)
+        self.game = game
+        self.hands = 0
+        self.actions = 0
+        self.latencies = {}
+        self.last_action = None
+
+    def event(self, game_id, event_type, *args):
+        if event_type in ACTIONS:
+            now = default_timer()
+            latency_add(self.latencies, now - self.last_action)
+            self.last_action = now
+            self.actions += 1
+
+    def refill(self):
+        game = self.game
+        for serial in game.serialsAll():
+            money = game.getPlayerMoney(serial)
+            if money < game.buyIn() or money <= 0:
+                game.rebuy(serial, max(game.bestBuyIn(), game.buyIn()) - money)
+            if game.isSitOut(serial):
+                game.sit(serial)
+
+    def play(self, hands):
+        game = self.game
+        for i in xrange(hands):
+            self.refill()
+            if game.sitCount() < 2:
+                self.log.warn("less than two players can sit, stop after %d hands", self.hands)
+                break
+            self.hands += 1
+            self.last_action = default_timer()
+            game.beginTurn(self.hands)
+            if not game.isEndOrNull():
+                self.log.warn("hand %d did not complete (state %s)", self.hands, game.state)
+                break
+        return self
+
+    def results(self):
+        return {
+            'hands': self.hands,
+            'actions': self.actions,
+            'latencies': self.latencies,
+            'eval_cache_stats': self.game.eval_cache_stats.copy(),
+        }
+
+def eval_cache_stats_merge(stats, other):
+    for (key, count) in other.iteritems():
+        stats[key] = stats.get(key, 0) + count
+    return stats
+
+def simulate(variant, betting_structure, dirs, tables = 1, hands = 100, players = 6, seed = 1):
+    """Play hands on each of tables tables, one after the other, and
+    return the merged results."""
+    results = {
+        'hands': 0,
+        'actions': 0,
+        'latencies': {},
+        'eval_cache_stats': {},
+    }
+    start = default_timer()
+    for table in xrange(tables):
+        simulator = PokerTableSimulator(variant, betting_structure, dirs, players = players, seed = seed + table)
+        table_results = simulator.play(hands).results()
+        results['hands'] += table_results['hands']
+        results['actions'] += table_results['actions']
+        latency_merge(results['latencies'], table_results['latencies'])
+        eval_cache_stats_merge(results['eval_cache_stats'], table_results['eval_cache_stats'])
+    results['elapsed'] = default_timer() - start
+    return results
+
+def __simulate(args):
+    return simulate(*args)
+
+def simulate_parallel(variant, betting_structure, dirs, tables = 1, hands = 100, players = 6, seed = 1, processes = None):
+    """Spread the tables over a pool of processes (one per core unless
+    specified otherwise) and return the merged results. The elapsed
+    time is the wall clock time of the whole run."""
+    import multiprocessing
+    processes = processes or multiprocessing.cpu_count()
+    processes = max(1, min(processes, tables))
+    chunks = [tables / processes + (1 if i < tables % processes else 0) for i in xrange(processes)]
+    jobs = []
+    first_seed = seed
+    for count in chunks:
+        jobs.append((variant, betting_structure, dirs, count, hands, players, first_seed))
+        first_seed += count
+    start = default_timer()
+    pool = multiprocessing.Pool(processes)
+    try:
+        outcomes = pool.map(__simulate, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    results = {
+        'hands': sum(outcome['hands'] for outcome in outcomes),
+        'actions': sum(outcome['actions'] for outcome in outcomes),
+        'latencies': reduce(latency_merge, [outcome['latencies'] for outcome in outcomes], {}),
+        'eval_cache_stats': reduce(eval_cache_stats_merge, [outcome['eval_cache_stats'] for outcome in outcomes], {}),
+    }
+    results['elapsed'] = default_timer() - start
+    return results
+
+def configurations(dirs, url = "poker.%s.xml"):
+    """Return the sorted list of the (variant, betting_structure) pairs
+    that can be played with the files found in dirs."""
+    variants = {}
+    betting_structures = {}
+    prefix, suffix = url.split("%s")
+    for directory in dirs:
+        for filename in glob(path.join(path.expanduser(directory), prefix + "*" + suffix)):
+            name = path.basename(filename)[len(prefix):-len(suffix)]
+            try:
+                root = etree.parse(filename).getroot()
+            except etree.XMLSyntaxError:
+                continue
+            if root.tag == "poker":
+                variants.setdefault(name, root.xpath("string(/poker/variant/@id)"))
+            elif root.tag == "bet":
+                betting_structures.setdefault(name, " ".join(root.xpath("/bet/variants/@ids")).split())
+    result = []
+    for (variant, variant_id) in variants.iteritems():
+        for (betting_structure, ids) in betting_structures.iteritems():
+            if variant_id in ids:
+                result.append((variant, betting_structure))
+    result.sort()
+    return result
+
+def report(results):
+    elapsed = results['elapsed'] or 1e-9
+    latencies = results['latencies']
+    lines = [
+        "hands: %d in %.2fs, %.1f hands/s" % (results['hands'], results['elapsed'], results['hands'] / elapsed),
+        "actions: %d, %.1f actions/s" % (results['actions'], results['actions'] / elapsed),
+        "action latency: p50 %.1fus p90 %.1fus p99 %.1fus p99.9 %.1fus max %.1fus" % tuple(
+            [latency_percentile(latencies, percent) * 1000000 for percent in (50, 90, 99, 99.9, 100)]
+        ),
+    ]
+    stats = results.get('eval_cache_stats')
+    if stats:
+        lines.append("best hand evaluations: %d, saved by the cache: %d; readable hands: %d, saved: %d" % (
+            stats.get('best', 0), stats.get('best_saved', 0), stats.get('readable', 0), stats.get('readable_saved', 0)
+        ))
+    return "\n".join(lines)
+
+def usage():
+    print """
+python -m pokerengine.pokersimulator [--variant=holdem] [--betting-structure=1-2_20-200_limit]
+                                     [--tables=1] [--hands=100] [--players=6] [--seed=1]
+                                     [--processes=<count>] [--conf=<directory>] [--list] [--help]
+
+  --processes   spread the tables over <count> processes (0 for one per core)
+  --list        print the variant and betting structure pairs found in the conf directories
+"""
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "h", ["help", "list", "variant=", "betting-structure=", "tables=", "hands=", "players=", "seed=", "processes=", "conf="])
+    except getopt.GetoptError:
+        usage()
+        return 2
+    variant = "holdem"
+    betting_structure = "1-2_20-200_limit"
+    tables = 1
+    hands = 100
+    players = 6
+    seed = 1
+    processes = None
+    dirs = []
+    list_only = False
+    for (option, value) in opts:
+        if option in ("-h", "--help"):
+            usage()
+            return 0
+        elif option == "--list":
+            list_only = True
+        elif option == "--variant":
+            variant = value
+        elif option == "--betting-structure":
+            betting_structure = value
+        elif option == "--tables":
+            tables = int(value)
+        elif option == "--hands":
+            hands = int(value)
+        elif option == "--players":
+            players = int(value)
+        elif option == "--seed":
+            seed = int(value)
+        elif option == "--processes":
+            processes = int(value)
+        elif option == "--conf":
+            dirs.append(value)
+    if not dirs:
+        dirs = [path.join(path.dirname(path.realpath(__file__)), "../conf"), "/usr/share/poker-engine/conf"]
+
+    if list_only:
+        for configuration in configurations(dirs):
+            print "%s %s" % configuration
+        return 0
+
+    PokerGameServer.log_debug = False
+    if processes is None:
+        results = simulate(variant, betting_structure, dirs, tables, hands, players, seed)
+    else:
+        results = simulate_parallel(variant, betting_structure, dirs, tables, hands, players, seed, processes)
+    print report(results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,180 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# Snapshot of the dynamic state of a PokerGame, to move a live table
+# to another process or to recover it after a crash.
+#
+# A PokerGame does not pickle: it holds its loggers, the compiled
+# templates, the poker-eval handle and the callbacks. The snapshot
+# only holds the state of the table and of the hand (players, pots,
+# side_pots, deck, round, position, stats, turn history...) and the
+# names of the variant and of the betting structure, pickled after
+# the header. Restoring it into a new or an
+# existing game binds the shared templates with setVariant and
+# setBettingStructure and keeps the evaluator, the callbacks and the
+# shuffler of that game.
+#
+#   data = pokersnapshot.dumps(game)
+#   ...
+#   game = pokersnapshot.loads(data)
+#   game.registerCallback(...)
+#
+# The bot of a player (PokerPlayer.botPlayer) is not in the snapshot:
+# the player keeps the bot it has in the game the snapshot is
+# restored into, if any.
+#
+from random import Random
+from operator import attrgetter
+from itertools import repeat
+from cStringIO import StringIO
+from cPickle import Pickler, Unpickler, HIGHEST_PROTOCOL
+
+from pokerengine.pokercards import PokerCards
+from pokerengine.pokergame import PokerPlayer, PokerGameServer, PokerGameClient
+
+MAGIC = "PKS"
+VERSION = 1
+HEADER = MAGIC + chr(VERSION)
+
+#
+# The PokerGame attributes saved as they are. Changing the list
+# requires a new VERSION.
+#
+GAME_ATTRIBUTES = (
+    "id", "name", "max_players", "is_open", "prefix", "level_skin",
+    "hand_serial", "time", "time_of_first_hand", "hands_count", "stats", "first_turn",
+    "unit", "buy_in", "max_buy_in", "best_buy_in", "blind_info", "ante_info", "level",
+    "state", "win_condition", "current_round", "player_list", "seats_left",
+    "dealer", "dealer_seat", "forced_dealer_seat", "position", "last_to_talk",
+    "pot", "raked_amount", "round_cap_left", "last_bet", "uncalled", "uncalled_serial",
+    "winners", "muckable_serials", "side2winners", "serial2best", "showdown_stack",
+    "side_pots", "first_betting_pass", "turn_history_is_reduced",
+    "last_auto_action", "batch_auto_actions", "eval_cache_stats",
+)
+get_game_attributes = attrgetter(*GAME_ATTRIBUTES)
+
+#
+# Attributes that a game may not have yet, saved as None
+#
+OPTIONAL_ATTRIBUTES = ("seats_all", "deck")
+
+#
+# The PokerPlayer slots saved as they are, the hand is saved as the
+# list of its cards. Changing the list requires a new VERSION.
+#
+PLAYER_ATTRIBUTES = tuple(name for name in PokerPlayer.STATE_SLOTS if name not in ("game", "botPlayer", "hand"))
+get_player_attributes = attrgetter(*PLAYER_ATTRIBUTES)
+
+def plain_string(value):
+    """The strings read from the XML files (round names, positions...)
+    are str subclasses holding a reference to their document: they are
+    pickled as persistent ids, which are plain str, instead of pickling
+    the document with them."""
+    if isinstance(value, str):
+        return str(value)
+    return None
+
+def persistent_string(value):
+    return value
+
+def dumps(game, shuffler = False):
+    """Return the snapshot of game, header included. The state of the
+    shuffler is saved when shuffler is True (a game restored without
+    it deals the next hands from its own shuffler)."""
+    state = (
+        game.is_directing,
+        game.url,
+        game.dirs,
+        game.variant,
+        game.betting_structure,
+        get_game_attributes(game),
+        tuple([game.__dict__.get(name) for name in OPTIONAL_ATTRIBUTES]),
+        #
+        # the round_info only differs from the template when a game
+        # altered it (see PokerGame.dealCards)
+        #
+        game.round_info if game.round_info and game.round_info != game.round_info_backup else None,
+        game.board.cards,
+        [(get_player_attributes(player), player.hand.cards) for player in game.serial2player.itervalues()],
+        game.turn_history,
+        game.shuffler.getstate() if shuffler and isinstance(getattr(game, 'shuffler', None), Random) else None,
+    )
+    output = StringIO()
+    output.write(HEADER)
+    pickler = Pickler(output, HIGHEST_PROTOCOL)
+    pickler.inst_persistent_id = plain_string
+    pickler.dump(state)
+    return output.getvalue()
+
+def check_header(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a game snapshot")
+    version = ord(data[len(MAGIC)])
+    if version > VERSION:
+        raise ValueError("game snapshot version %d is newer than %d" % (version, VERSION))
+
+def loads(data, game = None, dirs = None):
+    """Restore the snapshot into game and return it. When game is None,
+    a PokerGameServer (or a PokerGameClient if the game of the snapshot
+    was not directing) is created with the url of the snapshot and dirs
+    (the directories of the snapshot if None)."""
+    check_header(data)
+    input = StringIO(data)
+    input.seek(len(HEADER))
+    unpickler = Unpickler(input)
+    unpickler.persistent_load = persistent_string
+    (is_directing, url, snapshot_dirs, variant, betting_structure, values, optional_values, round_info, board, players, turn_history, shuffler) = unpickler.load()
+    if game is None:
+        factory = PokerGameServer if is_directing else PokerGameClient
+        game = factory(url, dirs or snapshot_dirs)
+    if variant and game.variant != variant:
+        game.setVariant(variant)
+    if betting_structure and game.betting_structure != betting_structure:
+        game.setBettingStructure(betting_structure)
+
+    game.__dict__.update(zip(GAME_ATTRIBUTES, values))
+    for (name, value) in zip(OPTIONAL_ATTRIBUTES, optional_values):
+        if value is None:
+            game.__dict__.pop(name, None)
+        else:
+            game.__dict__[name] = value
+    if round_info is not None:
+        game.round_info = round_info
+    elif game.round_info:
+        game.resetRoundInfo()
+    game.board = PokerCards()
+    game.board.cards = board
+    game.best_hand_cache = {}
+    game.readable_hand_cache = {}
+
+    previous = game.serial2player
+    serial2player = {}
+    for (player_values, hand) in players:
+        player = PokerPlayer.__new__(PokerPlayer)
+        map(setattr, repeat(player, len(PLAYER_ATTRIBUTES)), PLAYER_ATTRIBUTES, player_values)
+        player._log = None
+        player.game = game
+        player.botPlayer = previous[player.serial].botPlayer if player.serial in previous else None
+        player.hand = PokerCards()
+        player.hand.cards = hand
+        serial2player[player.serial] = player
+    game.serial2player = serial2player
+    game.reindexPlayers()
+
+    game.turn_history = turn_history
+    if shuffler is not None and isinstance(getattr(game, 'shuffler', None), Random):
+        game.shuffler.setstate(shuffler)
+    return game
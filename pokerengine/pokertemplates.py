@@ -0,0 +1,281 @@
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import sys
+
+from pokerengine.pokerengineconfig import Config
+from pokerengine import log as engine_log
+log = engine_log.get_child('pokertemplates')
+
+#
+# Process wide registries of the compiled variant and betting structure
+# descriptions. Each file is parsed once and the result is shared by all
+# the games that use it. An entry is keyed on the resolved path of the
+# file, which is looked up in the directories once (PATHS_CACHE): a game
+# using a file already compiled does not access the disk. The files are
+# read again after a call to reload.
+#
+VARIANTS_CACHE = {}
+BETTING_STRUCTURES_CACHE = {}
+LEVELS_CACHE = {}
+PATHS_CACHE = {}
+
+def reload():
+    """Forget the compiled files: the games read them again the next
+    time they set their variant or betting structure."""
+    for cache in (VARIANTS_CACHE, BETTING_STRUCTURES_CACHE, LEVELS_CACHE, PATHS_CACHE):
+        cache.clear()
+
+def copy_round_info(info):
+    """Return a copy of a round description that can be altered by a game
+    (see PokerGame.dealCards) without modifying the shared template."""
+    info = info.copy()
+    info["board"] = info["board"][:]
+    info["cards"] = info["cards"][:]
+    return info
+
+def load_levels(dirs, levels_file):
+    if levels_file not in LEVELS_CACHE:
+        config = Config(dirs)
+        config.load(levels_file)
+        levels = []
+        nodes = config.doc.xpath('/levels/level')
+        for node in nodes:
+            level = map(lambda (key, value): (key, int(value)), config.headerNodeProperties(node).items())
+            levels.append(dict(level))
+        config.free()
+        LEVELS_CACHE[levels_file] = levels
+    return LEVELS_CACHE[levels_file]
+
+class PokerVariant:
+    """Compiled content of a poker.<variant>.xml file.
+
+    Instances are shared between games and must not be modified.
+    """
+
+    def __init__(self, config, variant):
+        self.config = config
+        self.path = config.path
+        self.name = config.headerGet("/poker/variant/@name")
+
+        self.win_orders = []
+        for win_order in config.headerGetList("/poker/variant/wins/winner/@order"):
+            if win_order == "low8":
+                self.win_orders.append("low")
+            elif win_order == "high":
+                self.win_orders.append("hi")
+            else:
+                log.inform("unexpected win order: %s for variant %s", win_order, variant)
+        if not self.win_orders:
+            raise UserWarning("failed to read win orders from %s" % config.path)
+
+        self.round_info = []
+        board_size = 0
+        hand_size = 0
+        for name in config.headerGetList("/poker/variant/round/@name"):
+            board = config.headerGetList("/poker/variant/round[@name='%s']/deal[@card='board']" % (name))
+            board_size += len(board)
+            cards = config.headerGetList("/poker/variant/round[@name='%s']/deal[@card='up' or @card='down']/@card" % (name))
+            hand_size += len(cards)
+            position = config.headerGet("/poker/variant/round[@name='%s']/position/@type" % (name))
+            self.round_info.append({
+                "name": name,
+                "position": position,
+                "board": board,
+                "board_size": board_size,
+                "hand_size": hand_size,
+                "cards": cards,
+            })
+
+        self.max_hand_size = len(config.headerGetList("/poker/variant/hand/position"))
+        if config.headerGet("/poker/variant/@type") == "community":
+            self.max_board_size = len(config.headerGetList("/poker/variant/community/position"))
+        else:
+            self.max_board_size = 0
+
+BET_LIMIT_VALUE = "value"
+BET_LIMIT_BIG = "big"
+BET_LIMIT_POW_LEVEL = "pow_level"
+
+class PokerBetLimit(object):
+    """Compiled limits of a betting round, from the attributes of its
+    <round> element: the minimum bet is a value, the big blind or a
+    value doubled at each level. The maximum bet is the minimum bet
+    (fixed and pow_level rounds, max_bet is None), a value, "pot" or
+    "money". The cap is an int, sys.maxint when there is none or it is
+    negative.
+
+    A round that cannot be compiled (the templates of
+    pokertournament have placeholders instead of values) has no
+    min_rule and error tells why: it is only an error if a game asks
+    for its limits.
+
+    Instances are shared between games: the minimum bet of each level
+    is computed once and kept in level2min_bet.
+    """
+
+    __slots__ = ('min_rule', 'min_bet', 'max_bet', 'cap', 'level2min_bet', 'error')
+
+    def __init__(self, info):
+        self.cap = sys.maxint
+        self.level2min_bet = {}
+        self.min_rule = None
+        self.min_bet = 0
+        self.max_bet = None
+        self.error = None
+        try:
+            self.compile(info)
+        except ValueError, e:
+            self.min_rule = None
+            self.error = "round %s: %s" % (info.get("name"), e)
+
+    def compile(self, info):
+        if 'cap' in info:
+            cap = int(info["cap"])
+            if cap >= 0:
+                self.cap = cap
+        if 'fixed' in info:
+            self.min_bet = int(info["fixed"])
+            self.min_rule = BET_LIMIT_VALUE
+        elif 'pow_level' in info:
+            self.min_bet = int(info["pow_level"])
+            self.min_rule = BET_LIMIT_POW_LEVEL
+        else:
+            if 'min' in info and info["min"] == "big":
+                min_rule = BET_LIMIT_BIG
+            elif 'min' in info:
+                self.min_bet = int(info["min"])
+                min_rule = BET_LIMIT_VALUE
+            elif 'min_pow_level' in info:
+                self.min_bet = int(info["min_pow_level"])
+                min_rule = BET_LIMIT_POW_LEVEL
+            else:
+                min_rule = BET_LIMIT_VALUE
+            if 'max' not in info:
+                self.max_bet = "money"
+            elif info["max"] == "pot":
+                self.max_bet = "pot"
+            elif info["max"].isdigit():
+                self.max_bet = int(info["max"])
+            else:
+                raise ValueError("unexpected max %s" % info["max"])
+            self.min_rule = min_rule
+
+    def minBetOfLevel(self, level):
+        min_bet = self.level2min_bet.get(level)
+        if min_bet is None:
+            min_bet = self.level2min_bet[level] = self.min_bet * pow(2, level - 1)
+        return min_bet
+
+class PokerBettingStructure:
+    """Compiled content of a poker.<betting_structure>.xml file for a
+    given variant.
+
+    Instances are shared between games and must not be modified. The
+    blind_info and ante_info dictionaries are altered when the level
+    changes and each game must work on a copy of them.
+    """
+
+    def __init__(self, config, variant, dirs):
+        self.config = config
+        self.path = config.path
+        self.name = config.headerGet("/bet/description")
+        self.buy_in = int(config.headerGet('/bet/@buy-in') or "0")
+        self.max_buy_in = int(config.headerGet('/bet/@max-buy-in') or sys.maxint)
+        self.best_buy_in = int(config.headerGet('/bet/@best-buy-in') or "0")
+        self.unit = int(config.headerGet('/bet/@unit'))
+
+        self.bet_info = [dict(properties) for properties in config.headerGetProperties('/bet/variants[contains(@ids,"' + variant + '")]/round')]
+        self.bet_limits = [PokerBetLimit(bet_info) for bet_info in self.bet_info]
+        for (bet_info, limit) in zip(self.bet_info, self.bet_limits):
+            if limit.error is None:
+                bet_info["cap"] = str(limit.cap)
+
+        self.blind_info = False
+        blind_info = config.headerGetProperties("/bet/blind")
+        if len(blind_info) > 0:
+            blinds = blind_info[0]
+            self.blind_info = {
+                "change": 'change' in blinds and blinds["change"]
+            }
+
+            if self.blind_info["change"] != False:
+                self.blind_info["frequency"] = int(blinds["frequency"])
+                self.blind_info["unit"] = blinds["unit"]
+                if self.blind_info["change"] == "levels":
+                    self.blind_info["levels"] = load_levels(dirs, config.headerGet('/bet/blind/@levels'))
+                elif self.blind_info["change"] == "double":
+                    self.blind_info["small"] = int(blinds["small"])
+                    self.blind_info["small_reference"] = self.blind_info["small"]
+                    self.blind_info["big"] = int(blinds["big"])
+                    self.blind_info["big_reference"] = self.blind_info["big"]
+            else:
+                self.blind_info["small"] = int(blinds["small"])
+                self.blind_info["big"] = int(blinds["big"])
+
+        self.ante_info = False
+        ante_info = config.headerGetProperties("/bet/ante")
+        if len(ante_info) > 0:
+            antes = ante_info[0]
+            self.ante_info = {
+                "change": 'change' in antes and antes["change"]
+                }
+
+            if self.ante_info["change"]:
+                self.ante_info["frequency"] = int(antes["frequency"])
+                self.ante_info["unit"] = antes["unit"]
+                if self.ante_info["change"] == "levels":
+                    self.ante_info["levels"] = load_levels(dirs, config.headerGet('/bet/ante/@levels'))
+                elif self.ante_info["change"] == "double":
+                    self.ante_info["value"] = int(antes["value"])
+                    self.ante_info["value_reference"] = self.ante_info["value"]
+                    self.ante_info["bring-in"] = int(antes["bring-in"])
+                    self.ante_info["bring-in_reference"] = self.ante_info["bring-in"]
+            else:
+                self.ante_info["value"] = int(antes["value"])
+                self.ante_info["bring-in"] = int(antes["bring-in"])
+
+def _get(cache, dirs, path, previous, key, factory):
+    paths_key = (path, tuple(dirs))
+    found = PATHS_CACHE.get(paths_key)
+    if found is None:
+        config = Config(dirs)
+        found = config.lookup(path)
+        if found:
+            PATHS_CACHE[paths_key] = found
+        elif previous:
+            #
+            # Like Config.load, fall back to the previously loaded file
+            # when path cannot be found
+            #
+            found = previous.path
+        else:
+            raise Exception("load: unable to find '%s' in directories %s" % (path, config.dirs))
+    cache_key = (found,) + key
+    template = cache.get(cache_key)
+    if template is None:
+        config = Config(dirs)
+        config.load(found)
+        template = cache[cache_key] = factory(config)
+        log.debug("compiled %s", found)
+    return template
+
+def get_variant(dirs, path, variant, previous = None):
+    return _get(VARIANTS_CACHE, dirs, path, previous, (),
+        lambda config: PokerVariant(config, variant))
+
+def get_betting_structure(dirs, path, variant, previous = None):
+    return _get(BETTING_STRUCTURES_CACHE, dirs, path, previous, (variant, tuple(dirs)),
+        lambda config: PokerBettingStructure(config, variant, dirs))
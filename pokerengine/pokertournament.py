@@ -235,6 +235,10 @@ class PokerTournamentStats:
 class PokerTournament:
 
     log = log.get_child('PokerTournament')
+    #
+    # See PokerGame.log_debug
+    #
+    log_debug = True
 
     def __init__(self, *args, **kwargs):
         self.log = PokerTournament.log.get_instance(self, refs=[
@@ -385,7 +389,7 @@ class PokerTournament:
             return True
         else:
             explain = "start(%s), delay(%s) == remaining(%s)" %(self.start_time, self.rebuy_delay, time_remaining)
-            self.log.warn("rebuy during tourney %s not allowed: player %s [%s]" % (self.serial, serial, explain),
+            self.log.warn("rebuy during tourney %s not allowed: player %s [%s]", self.serial, serial, explain,
                 refs=[('User', serial, int)])
             return False
 
@@ -519,7 +523,7 @@ class PokerTournament:
         else:
             self.log.inform("changeState: cannot change from state %s to state %s", self.state, state)
             return
-        self.log.debug("state change %s => %s", self.state, state)
+        if self.log_debug: self.log.debug("state change %s => %s", self.state, state)
         old_state = self.state
         self.state = state
         self.callback_new_state(self, old_state, self.state)
@@ -615,7 +619,7 @@ class PokerTournament:
             game.setVariant(self.variant)
             game.setBettingStructure(self.betting_structure)
             game.setMaxPlayers(self.seats_per_game)
-            game.registerCallback(self.gameAction)
+            game.registerCallback(self.gameAction, ("call", "raise", "check", "fold"))
             if game.id == 0: game.id = game_id
 
             buy_in = game.buyIn()
@@ -733,7 +737,7 @@ class PokerTournament:
             elif not game.rebuy(serial, game.buyIn()):
                 # This should never happen! We need to give the user the money back
                 # and the winner of the tourney would get too much chips
-                self.log.error("rebuy denied for user %s" % serial, refs=[('User', serial, int), ('Game', game_id, int)])
+                self.log.error("rebuy denied for user %s", serial, refs=[('User', serial, int), ('Game', game_id, int)])
                 error = TOURNAMENT_REBUY_ERROR_OTHER
 
             else:
@@ -753,7 +757,7 @@ class PokerTournament:
         new_loosers = [s for s in loosers if s not in self._winners_dict_tmp]
 
         if new_loosers:
-            self.log.debug('removeBrokePlayers: serials: %s. game_id: %d. now: %s', new_loosers, game_id, now)
+            if self.log_debug: self.log.debug('removeBrokePlayers: serials: %s. game_id: %d. now: %s', new_loosers, game_id, now)
 
         randlist = range(len(new_loosers))
         shuffler.shuffle(randlist)
@@ -789,7 +793,7 @@ class PokerTournament:
             inactive_players.pop()
 
         if inactive_players:
-            self.log.debug('removeInactivePlayers: serials: %s. game_id: %d.', inactive_players, game_id)
+            if self.log_debug: self.log.debug('removeInactivePlayers: serials: %s. game_id: %d.', inactive_players, game_id)
             self.callback_log_remove_inactive(self, inactive_players)
 
         for serial in inactive_players:
@@ -826,7 +830,7 @@ class PokerTournament:
             player = remainingPlayers[0]
             self.callback_remove_player(self, game.id, player.serial, now=True)
             player.money = 0
-            self.log.debug("winners %s", self.winners)
+            if self.log_debug: self.log.debug("winners %s", self.winners)
             self.callback_destroy_game(self, game)
             self.games = []
             self.id2game = {}
@@ -845,12 +849,12 @@ class PokerTournament:
     def balanceGames(self):
         self.need_balance = False
         if len(self.games) < 2: return
-        self.log.debug("balanceGames")
+        if self.log_debug: self.log.debug("balanceGames")
         to_break = breakGames(self.games, self.log)
         games_broken = {}
         for (from_id, to_id, serials) in to_break:
             for serial in serials:
-                self.log.debug("balanceGames: player %d moved from %d to %d", serial, from_id, to_id)
+                if self.log_debug: self.log.debug("balanceGames: player %d moved from %d to %d", serial, from_id, to_id)
                 if self.state == TOURNAMENT_STATE_REGISTERING:
                     self.movePlayer(from_id, to_id, serial)
                 else:
@@ -868,7 +872,7 @@ class PokerTournament:
 
         to_equalize = equalizeGames(self.games, self.log)
         for (from_id, to_id, serial) in to_equalize:
-            self.log.debug("balanceGames: player %d moved from %d to %d", serial, from_id, to_id)
+            if self.log_debug: self.log.debug("balanceGames: player %d moved from %d to %d", serial, from_id, to_id)
             if self.state == TOURNAMENT_STATE_REGISTERING:
                 self.movePlayer(from_id, to_id, serial)
             else:
@@ -877,7 +881,7 @@ class PokerTournament:
         want_players, provide_players = equalizeCandidates(self.games)
         self.need_balance = bool(want_players and not provide_players)
         if self.need_balance:
-            self.log.debug("balanceGames: postponed game equalization")
+            if self.log_debug: self.log.debug("balanceGames: postponed game equalization")
 
         return len(to_equalize) > 0
 
@@ -9,14 +9,27 @@ import test_gamehistory
 import test_history
 import test_i18n
 import test_muck
+import test_pokeractionlog
 import test_pokercards
 import test_pokerchips
+import test_pokerdispatch
 import test_pokerengineconfig
+import test_pokerenv
+import test_pokerequity
+import test_pokerevalpool
+import test_pokerexport
+import test_pokerhistory
 import test_pokerplayer
 import test_pokerprizes
 import test_pokerrake
+import test_pokerreplay
+import test_pokerrunner
+import test_pokersimulator
+import test_pokersnapshot
+import test_pokertemplates
 import test_pokertournament
 import test_positions
+import test_sidepots
 import test_sit
 import test_tournament
 import test_upgrades
@@ -35,6 +35,8 @@ import string
 import tempfile
 import math
 import unittest
+import traceback
+from copy import deepcopy
 from lxml import etree
 
 from os import path
@@ -47,6 +49,8 @@ from collections import namedtuple
 
 from pokerengine import pokercards
 from pokerengine import pokergame
+from pokerengine import pokertemplates
+from pokerengine.pokersimulator import PokerTableSimulator
 
 from tests.testmessages import search_output, clear_all_messages, get_messages
 try:
@@ -1309,6 +1313,58 @@ class PokerGameTestCase(unittest.TestCase):
         self.failUnlessEqual(self.game.serialsNotFold(), [2])
         self.failUnlessEqual(self.game.playersNotFold(), [player2])
 
+    # ---------------------------------------------------------
+    def testPlayerIndexes(self):
+        """Test Poker Game: player indexes follow the player flags"""
+
+        self.game.setMaxPlayers(3)
+
+        # Create players
+        player1 = self.AddPlayerAndSit(1, 2)
+        player2 = self.AddPlayerAndSit(2, 7)
+        player3 = self.AddPlayerAndSit(3, 5)
+        self.failUnlessEqual(self.game.player_indexes['sit_out'], set())
+
+        self.game.sitOut(3)
+        self.failUnlessEqual(self.game.sitOutCount(), 1)
+        self.failUnlessEqual(self.game.sitCount(), 2)
+        self.failUnlessEqual(self.game.serialsSitOut(), [3])
+
+        # The indexes forget about a removed player
+        self.failUnless(self.game.removePlayer(3))
+        self.failUnlessEqual(self.game.player_indexes['sit_out'], set())
+
+        self.game.beginTurn(1)
+        self.failUnlessEqual(self.game.inGameCount(), 2)
+
+        player1.fold = True
+        self.failUnlessEqual(self.game.player_indexes['fold'], set([1]))
+        self.failUnlessEqual(self.game.inGameCount(), 1)
+        self.failUnlessEqual(self.game.serialsInGame(), [2])
+
+        player2.all_in = True
+        self.failUnlessEqual(self.game.player_indexes['all_in'], set([2]))
+        self.failUnlessEqual(self.game.inGameCount(), 0)
+        self.failUnlessEqual(self.game.allInCount(), 1)
+        self.failUnlessEqual(self.game.serialsAllIn(), [2])
+
+    # ---------------------------------------------------------
+    def testLogDebug(self):
+        """Test Poker Game: debug messages are skipped when log_debug is False"""
+
+        player1 = self.AddPlayerAndSit(1, 2)
+        player2 = self.AddPlayerAndSit(2, 7)
+
+        log_history.reset()
+        self.game.beginTurn(1)
+        self.failUnless(log_history.search("Side Pot="))
+
+        self.game.log_debug = False
+        log_history.reset()
+        self.game.beginTurn(2)
+        self.failIf(log_history.search("Side Pot="))
+        self.failIf(log_history.search("initialisation turn"))
+
     # ---------------------------------------------------------
     def testPot2Money(self):
         """Test Poker Game: Pot to money"""
@@ -2093,6 +2149,38 @@ class PokerGameTestCase(unittest.TestCase):
         # Player 2 hand
         self.failUnlessEqual(self.game.readablePlayerBestHands(2), 'High card Jack: Jh, Td, 9d, 6s, 5c')
 
+    # ---------------------------------------------------------
+    def testBestHandCache(self):
+        """Test Poker Game: Best hands are evaluated once per side and hand"""
+
+        player1 = self.AddPlayerAndSit(1, 2)
+        player2 = self.AddPlayerAndSit(2, 7)
+        player1.hand = pokercards.PokerCards(['Ad', 'As'])
+        player2.hand = pokercards.PokerCards(['Jh', '5c'])
+        self.game.board = pokercards.PokerCards(['9d', '6s', 'Td', '4d', '4h'])
+        self.game.variant = 'holdem'
+
+        calls = []
+        best = self.game.eval.best
+        self.game.eval.best = lambda *args: calls.append(args) or best(*args)
+
+        results = self.game.bestHands([1, 2])
+        self.assertEquals(len(calls), 2)
+        self.assertEquals(self.game.bestHandValue('hi', 1), results[1]['hi'][0])
+        self.assertEquals(self.game.bestHandCards('hi', 2), results[2]['hi'][1])
+        readable = self.game.readablePlayerBestHands(1)
+        self.assertEquals(self.game.readablePlayerBestHands(1), readable)
+        self.assertEquals(len(calls), 2)
+        self.assertEquals(self.game.eval_cache_stats['best'], 2)
+        self.assertEquals(self.game.eval_cache_stats['best_saved'], 4)
+        self.assertEquals(self.game.eval_cache_stats['readable'], 1)
+        self.assertEquals(self.game.eval_cache_stats['readable_saved'], 1)
+
+        # other cards are evaluated
+        self.game.board = pokercards.PokerCards(['9d', '6s', 'Td', '4d', 'Ah'])
+        self.game.bestHands([1])
+        self.assertEquals(len(calls), 3)
+
     # ---------------------------------------------------------
     def testReadableHandValue(self):
         """Test Poker Game: Readable hand value"""
@@ -5974,6 +6062,24 @@ class PokerGameTestCase(unittest.TestCase):
         turn_history = [("end", [], []),]
         pokergame.history2messages(None, turn_history)
 
+    def testHistory2Fields(self):
+        game_state = {'type': 'game_state', 'foldwin': True}
+        frame = {'type': 'uncalled', 'serial': 1, 'uncalled': 10}
+        turn_history = [
+            ("blind", 1, 5, 0),
+            ("end", [1], [game_state, frame]),
+            ("end", [], []),
+            ("unknown", 1),
+        ]
+        events = list(pokergame.history2fields(turn_history))
+        self.assertEqual(events[0], ("blind", {'serial': 1, 'amount': 5, 'dead': 0}))
+        (event_type, fields) = events[1]
+        self.assertEqual((fields['winners'], fields['frames']), ([1], [frame]))
+        self.failUnless(fields['game_state'] is game_state)
+        (event_type, fields) = events[2]
+        self.assertEqual((fields['game_state'], fields['frames']), (None, []))
+        self.assertEqual(events[3], ("unknown", None))
+
     def testPlayerListIndexAdd(self):
         game = self.game
         players = [
@@ -6020,6 +6126,12 @@ class PokerGameTestCase(unittest.TestCase):
         self.assertEqual(4,game.playerListIndexAdd(3, 4+2*players_truey_count, pred))
         self.assertEqual(0,game.playerListIndexAdd(3, 4-2*players_truey_count, pred))
 
+        # the seat ring follows a new player list
+        game.player_list = [p[0] for p in players if p[0] != 101]
+        self.assertEqual(3,game.playerListIndexAdd(0, 1, pred))
+        game.player_list.remove(104)
+        self.assertEqual(0,game.playerListIndexAdd(0, 1, pred))
+
     def testHistoryReduceAutoPlaySitInAndOut(self):
         histories = []
         self.game.variant = 'holdem'
@@ -6135,6 +6247,211 @@ class PokerGameTestCase(unittest.TestCase):
         game.blind(10)
         game.historyReduce()
 
+    def testHistoryReduceCopyOnWrite(self):
+        history = [
+            ('game', 0, 1, 0, 0, 'holdem', 'config', [100, 200, 300], 1, {100: 1600, 200: 1600, 300: 1600}),
+            ('position', 1, 200), ('blind', 200, 500, 0),
+            ('sitOut', 300), ('wait_for', 300, 'first_round'),
+            ('player_list', [100, 200, 400]), ('sit', 400, None), ('rebuy', 400, 100),
+            ('position', 2, 400), ('blind', 400, 1000, 0),
+            ('position', 2, 400),
+            ('position', -1, None),
+            ('round', 'pre-flop', pokercards.PokerCards([]), {}),
+            ('position', 0, 100), ('rebuy', 300, 100)
+        ]
+        original = deepcopy(history)
+        reduced = pokergame.PokerGame._historyReduce(history, {400: 1500})
+        self.assertEquals([
+            ('game', 0, 1, 0, 0, 'holdem', 'config', [100, 200, 400], 1, {100: 1600, 200: 1600, 400: 1500}),
+            ('position', 1, 200), ('blind', 200, 500, 0),
+            ('position', 2, 400), ('blind', 400, 1000, 0),
+            ('position', -1, None),
+            ('round', 'pre-flop', pokercards.PokerCards([]), {}),
+            ('position', 0, 100), ('rebuy', 300, 100)
+        ], reduced)
+        #
+        # the history given is left untouched, the unmodified events are shared
+        self.assertEquals(original, history)
+        self.failUnless(reduced[0] is not history[0])
+        self.failUnless(reduced[1] is history[1])
+        #
+        # in place, the history is modified and gives the same result
+        pokergame.PokerGame._historyReduce(history, {400: 1500}, in_place = True)
+        self.assertEquals(reduced, history)
+
+    def testFork(self):
+        """Test Poker Game: fork a game in the middle of a hand"""
+        game = self.game
+        game.setMaxPlayers(3)
+        for serial in (1, 2, 3):
+            self.AddPlayerAndSit(serial)
+            game.autoBlindAnte(serial)
+        events = []
+        game.registerCallback(lambda game_id, *args: events.append(args))
+        game.beginTurn(1)
+        game.call(game.getSerialInPosition())
+
+        def snapshot():
+            return (
+                game.state, game.pot, game.getSerialInPosition(), game.moneyMap(),
+                [(player.serial, player.bet, player.fold, player.hand.tolist(True)) for player in game.playersAll()],
+                deepcopy(game.side_pots), game.board.tolist(True), game.turn_history[:],
+                deepcopy(game.player_indexes), game.deck[:]
+            )
+        before = snapshot()
+        count = len(events)
+
+        fork = game.fork()
+        self.assertEquals(fork.turn_history, game.turn_history)
+        self.failIf(fork.getPlayer(1) is game.getPlayer(1))
+        self.failUnless(fork.getPlayer(1).game is fork)
+        fork.fold(fork.getSerialInPosition())
+        while fork.isRunning():
+            serial = fork.getSerialInPosition()
+            if fork.canCheck(serial):
+                fork.check(serial)
+            else:
+                fork.call(serial)
+        self.failUnless(fork.isEndOrNull())
+        #
+        # the game is left untouched and its callbacks were not called
+        #
+        self.assertEquals(before, snapshot())
+        self.assertEquals(count, len(events))
+        self.assertEquals(game.fork(history = False).turn_history, [])
+        #
+        # the game goes on
+        #
+        game.call(game.getSerialInPosition())
+        self.failUnless(len(events) > count)
+        self.failUnless(game.isRunning())
+
+    def testAutoPlayLoop(self):
+        """Test Poker Game: bots play in a loop instead of recursing"""
+        def simulator():
+            return PokerTableSimulator("holdem", "1-2_20-200_limit", [path.join(TESTS_PATH, "../conf")], players = 10, seed = 3)
+        depths = []
+        events = []
+        def event(game_id, *args):
+            events.append(args)
+            if args[0] == "position":
+                depths.append(len(traceback.extract_stack()))
+        recursive = simulator()
+        recursive.game.registerCallback(event)
+        recursive.play(5)
+        self.failUnless(len(depths) > 100)
+        self.failUnless(max(depths) - min(depths) < 20)
+        #
+        # the same events are sent at once in batch mode
+        #
+        batches = []
+        batched = simulator()
+        batched.game.batch_auto_actions = True
+        batched.game.registerCallback(lambda game_id, *args: batches.append(args))
+        batched.play(5)
+        self.assertEquals(recursive.game.turn_history, batched.game.turn_history)
+        self.failUnless("auto_actions" in [batch[0] for batch in batches])
+        flattened = []
+        for batch in batches:
+            if batch[0] == "auto_actions":
+                flattened.extend(batch[1])
+            else:
+                flattened.append(batch)
+        self.assertEquals(events, flattened)
+
+    def testCallbackEvents(self):
+        """Test Poker Game: callbacks registered for some event types"""
+        simulator = PokerTableSimulator("holdem", "1-2_20-200_limit", [path.join(TESTS_PATH, "../conf")], players = 6, seed = 5)
+        game = simulator.game
+        all_events = []
+        actions = []
+        game.registerCallback(lambda game_id, *args: all_events.append(args))
+        callback = lambda game_id, *args: actions.append(args)
+        game.registerCallback(callback, ("call", "check"))
+        simulator.play(3)
+        self.failUnless(actions)
+        self.assertEquals(actions, [args for args in all_events if args[0] in ("call", "check")])
+        #
+        # registering again changes the event types
+        #
+        callbacks = len(game.callbacks)
+        game.registerCallback(callback, ("fold",))
+        self.assertEquals(len(game.callbacks), callbacks)
+        del actions[:]
+        simulator.play(1)
+        self.failUnless(actions)
+        self.assertEquals(set([args[0] for args in actions]), set(["fold"]))
+        game.unregisterCallback(callback)
+        self.failIf(callback in game.callback_events)
+        #
+        # the events of a batch of automatic actions are given one by
+        # one, unless the callback registered for "auto_actions"
+        #
+        game.batch_auto_actions = True
+        batches = []
+        del actions[:]
+        game.registerCallback(lambda game_id, *args: actions.append(args), ("raise",))
+        game.registerCallback(lambda game_id, *args: batches.append(args), ("auto_actions",))
+        simulator.play(2)
+        self.failUnless(actions)
+        self.failUnless(batches)
+        self.assertEquals(actions, [args for batch in batches for args in batch[1] if args[0] == "raise"])
+
+    def testCallbackPlayerEvents(self):
+        """Test Poker Game: the changes of the players are only given to the callbacks listing them, once done"""
+        game = self.game
+        all_events = []
+        changes = []
+        game.registerCallback(lambda game_id, *args: all_events.append(args))
+        def change(game_id, *args):
+            if args[0] == "payBuyIn":
+                self.assertEquals(game.getPlayerMoney(args[1]), args[2])
+            changes.append(args)
+        game.registerCallback(change, pokergame.PLAYER_EVENTS)
+        self.failUnless(game.addPlayer(1, 2))
+        self.failIf(game.payBuyIn(1, game.maxBuyIn() + 1))
+        self.failUnless(game.payBuyIn(1, game.bestBuyIn()))
+        self.failUnless(game.sit(1))
+        game.autoBlindAnte(1)
+        self.failUnless(game.sitOut(1))
+        self.failUnless(game.removePlayer(1))
+        self.assertEquals(changes, [
+            ("addPlayer", 1, 2, None),
+            ("payBuyIn", 1, game.bestBuyIn()),
+            ("playerSit", 1, False),
+            ("autoBlindAnte", 1),
+            ("playerSitOut", 1),
+            ("removePlayer", 1),
+        ])
+        self.assertEquals(all_events, [])
+
+    def testBetsTotals(self):
+        """Test Poker Game: the running totals of the bets match the bets of the players"""
+        checked = []
+        simulator = PokerTableSimulator("holdem", "1-2_20-200_pot-limit", [path.join(TESTS_PATH, "../conf")], players = 6, seed = 7)
+        game = simulator.game
+        def check(game_id, *args):
+            if not game.isRunning() or not game.player_list:
+                return
+            players = game.playersPlaying()
+            not_fold = [player.bet for player in game.playersNotFold()]
+            self.assertEquals(game.potAndBetsAmount(), game.pot + sum([player.bet for player in players]))
+            self.assertEquals(game.highestBetNotFold(), max(not_fold))
+            self.assertEquals(game.bets_highest_count, not_fold.count(max(not_fold)))
+            checked.append(args[0])
+        game.registerCallback(check)
+        simulator.play(20)
+        self.failUnless(len(checked) > 500)
+        #
+        # a bet set from outside the game is accounted for
+        #
+        player = game.playersNotFold()[0]
+        player.bet += 1000
+        self.assertEquals(game.highestBetNotFold(), player.bet)
+        self.assertEquals(game.bets_highest_count, 1)
+        player.fold = True
+        self.assertEquals(game.highestBetNotFold(), max([other.bet for other in game.playersNotFold()]))
+
     def testBlindAndAnteTogetherAllIn(self):
         game = self.game
         game.variant = 'holdem'
@@ -6391,6 +6708,7 @@ class PokerGameTestCase(unittest.TestCase):
         xmlFile = open(xml_file, 'w')
         xmlFile.write(etree.tostring(doc, pretty_print=True))
         xmlFile.close()
+        pokertemplates.reload()
         return True
 
     # ---------------------------------------------------------
@@ -6399,6 +6717,7 @@ class PokerGameTestCase(unittest.TestCase):
             return False
 
         shutil.copyfile(src_path,dst_path)
+        pokertemplates.reload()
         if path.isfile(dst_path):
             return True
 
@@ -6408,6 +6727,7 @@ class PokerGameTestCase(unittest.TestCase):
     def DeleteFile(self, file_path):
         if path.isfile(file_path):
             os.unlink(file_path)
+            pokertemplates.reload()
 
     # ---------------------------------------------------------
     def GetPlayer(self, serial):
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys, shutil, tempfile
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokeractionlog
+from pokerengine.pokergame import PokerGameServer
+from pokerengine.pokersimulator import PokerTableSimulator
+
+class PokerActionLogTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = path.join(self.directory, "actions.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def createGame(self, id, players = 4):
+        game = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        game.id = id
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_no-limit")
+        game.shuffler.seed(id)
+        for serial in xrange(1, players + 1):
+            self.failUnless(game.addPlayer(serial, serial * 2 - 1))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+        #
+        # the first player pays the blinds himself
+        #
+        for serial in xrange(2, players + 1):
+            game.autoBlindAnte(serial)
+        return game
+
+    def play(self, game, count):
+        """Play count actions with a deterministic policy, dealing a new
+        hand when the current one ends."""
+        for k in xrange(count):
+            if game.isEndOrNull():
+                game.beginTurn(game.hand_serial + 1)
+                continue
+            serial = game.getSerialInPosition()
+            if game.isBlindAnteRound():
+                game.blind(serial)
+                continue
+            (min_raise, max_raise, to_call) = game.betLimitsForSerial(serial)
+            if k % 3 == 0 and not to_call and "raise" in game.possibleActions(serial):
+                game.callNraise(serial, min_raise)
+            elif k % 7 == 0 and to_call:
+                game.fold(serial)
+            elif to_call:
+                game.call(serial)
+            else:
+                game.check(serial)
+
+    def assertSameGame(self, a, b):
+        for name in ("state", "position", "pot", "side_pots", "current_round", "hand_serial", "player_list", "dealer", "turn_history"):
+            self.assertEqual(getattr(a, name), getattr(b, name), name)
+        self.assertEqual(a.board.cards, b.board.cards)
+        self.assertEqual(a.moneyMap(), b.moneyMap())
+        for serial in a.serial2player:
+            (x, y) = (a.getPlayer(serial), b.getPlayer(serial))
+            self.assertEqual((x.hand.cards, x.bet, x.fold, x.all_in, x.seat, x.isSit()), (y.hand.cards, y.bet, y.fold, y.all_in, y.seat, y.isSit()))
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Recover(self):
+        """Test Poker Action Log : the games recovered from the log are in the state of the last event"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 16)
+        simulator = PokerTableSimulator("holdem", "1-2_20-200_limit", [self.TestConfDirectory], players = 6, seed = 3)
+        simulator.game.id = 1
+        log.attach(simulator.game)
+        simulator.play(20)
+        game = self.createGame(2)
+        log.attach(game)
+        game.beginTurn(1)
+        self.play(game, 57)
+        self.failUnless(game.isRunning())
+        log.sync()
+
+        games = pokeractionlog.recover(self.path, [self.TestConfDirectory])
+        self.assertEqual(sorted(games.keys()), [1, 2])
+        self.assertSameGame(simulator.game, games[1])
+        self.assertEqual(games[1].hand_serial, 20)
+        self.assertSameGame(game, games[2])
+        #
+        # the recovered game goes on
+        #
+        self.play(game, 5)
+        self.play(games[2], 5)
+        self.assertSameGame(game, games[2])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Batch(self):
+        """Test Poker Action Log : the records are written and synced by groups"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 4)
+        game = self.createGame(1)
+        log.attach(game)
+        self.assertEqual((log.syncs, len(log.pending)), (0, 1))
+        self.assertEqual(open(self.path).read(), pokeractionlog.HEADER)
+        game.beginTurn(1)
+        self.play(game, 2)
+        self.failUnless(log.syncs > 0)
+        self.failIf(len(log.pending) >= 4)
+        records = pokeractionlog.read(self.path)
+        self.assertEqual(len(records) % 4, 0)
+        self.assertEqual(records[0][:2], (1, pokeractionlog.CHECKPOINT))
+        self.assertEqual(records[1][2][0], "game")
+        self.assertEqual(records[2][1], pokeractionlog.DECK)
+        pending = len(log.pending)
+        log.close()
+        self.assertEqual(log.pending, [])
+        self.assertEqual(len(pokeractionlog.read(self.path)), len(records) + pending)
+        self.assertRaises(ValueError, pokeractionlog.read, path.join(TESTS_PATH, "test_pokeractionlog.py"))
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Crash(self):
+        """Test Poker Action Log : a log cut anywhere recovers the game of the last complete record"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 1)
+        game = self.createGame(1, players = 3)
+        log.attach(game)
+        histories = {}
+        def event(game_id, event, *args):
+            histories[game.hand_serial] = game.turn_history
+        game.registerCallback(event)
+        game.beginTurn(1)
+        self.play(game, 40)
+        log.close()
+        self.failUnless(game.hand_serial > 2)
+
+        data = open(self.path, "rb").read()
+        crashed = path.join(self.directory, "crashed.log")
+        (checkpoint, crc) = pokeractionlog.RECORD.unpack_from(data, len(pokeractionlog.HEADER))
+        start = len(pokeractionlog.HEADER) + pokeractionlog.RECORD.size + checkpoint
+        for length in range(start, len(data), 37) + [len(data)]:
+            open(crashed, "wb").write(data[:length])
+            recovered = pokeractionlog.recover(crashed, [self.TestConfDirectory])[1]
+            history = histories[recovered.hand_serial]
+            self.assertEqual(recovered.turn_history, history[:len(recovered.turn_history)])
+        self.assertSameGame(game, recovered)
+        #
+        # a corrupted record ends the log
+        #
+        corrupted = data[:-3] + chr(ord(data[-3]) ^ 1) + data[-2:]
+        open(crashed, "wb").write(corrupted)
+        self.assertEqual(len(pokeractionlog.read(crashed)), len(pokeractionlog.read(self.path)) - 1)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test04_Players(self):
+        """Test Poker Action Log : the changes of the players between the actions are recovered"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 8)
+        game = self.createGame(1, players = 2)
+        log.attach(game)
+        game.beginTurn(1)
+        self.play(game, 10)
+        while not game.isEndOrNull():
+            self.play(game, 1)
+        self.failUnless(game.addPlayer(3, 5))
+        self.failUnless(game.payBuyIn(3, game.bestBuyIn()))
+        self.failUnless(game.sit(3))
+        game.autoBlindAnte(3)
+        self.play(game, 4)
+        game.autoPlayer(2)
+        game.sitOutNextTurn(2)
+        while not game.isEndOrNull():
+            self.play(game, 1)
+        log.sync()
+        recovered = pokeractionlog.recover(self.path, [self.TestConfDirectory])[1]
+        self.assertSameGame(game, recovered)
+        self.assertEqual(sorted(recovered.serialsAll()), [1, 2, 3])
+        self.failUnless(recovered.getPlayer(3).auto_blind_ante)
+        self.failUnless(recovered.getPlayer(2).isAuto())
+        self.failUnless(recovered.isSitOut(2))
+
+        self.failUnless(game.removePlayer(3))
+        self.failUnless(game.sit(2))
+        self.play(game, 6)
+        log.close()
+        recovered = pokeractionlog.recover(self.path, [self.TestConfDirectory])[1]
+        self.assertSameGame(game, recovered)
+        self.assertEqual(sorted(recovered.serialsAll()), [1, 2])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test05_Inconsistent(self):
+        """Test Poker Action Log : a table that cannot be replayed stops at the event that precedes it, the others are recovered"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 8)
+        games = [self.createGame(id) for id in (1, 2)]
+        for game in games:
+            log.attach(game)
+            game.beginTurn(1)
+        self.play(games[0], 5)
+        self.play(games[1], 5)
+        #
+        # a change of the first game that the log does not know
+        #
+        history = list(games[0].turn_history)
+        log.append(1, pokeractionlog.EVENT, ("call", 99))
+        self.play(games[0], 5)
+        self.play(games[1], 5)
+        log.close()
+        recovered = pokeractionlog.recover(self.path, [self.TestConfDirectory])
+        self.assertEqual(sorted(recovered.keys()), [1, 2])
+        self.assertEqual(recovered[1].turn_history, history)
+        self.assertSameGame(games[1], recovered[2])
+        #
+        # a table whose checkpoint cannot be restored is left out
+        #
+        log = pokeractionlog.PokerActionLog(self.path, batch = 1)
+        log.append(3, pokeractionlog.CHECKPOINT, "garbage")
+        log.close()
+        self.assertEqual(sorted(pokeractionlog.recover(self.path, [self.TestConfDirectory]).keys()), [1, 2])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test06_HandEnd(self):
+        """Test Poker Action Log : the records of a hand are synced when it ends, whatever the batch"""
+        log = pokeractionlog.PokerActionLog(self.path, batch = 100000)
+        game = self.createGame(1, players = 3)
+        log.attach(game)
+        game.beginTurn(1)
+        self.play(game, 2)
+        self.assertEqual(log.syncs, 0)
+        while not game.isEndOrNull():
+            self.play(game, 1)
+        self.assertEqual((log.syncs, log.pending), (1, []))
+        recovered = pokeractionlog.recover(self.path, [self.TestConfDirectory])[1]
+        self.assertSameGame(game, recovered)
+        log.close()
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerActionLogTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerActionLogTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys, time
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine.pokerdispatch import PokerEventQueue
+from pokerengine.pokersimulator import PokerTableSimulator
+
+class PokerEventQueueTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.batches = []
+
+    def consumer(self, batch):
+        self.batches.append(batch)
+
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+    def test01_Drain(self):
+        """Without a thread the events are given to the consumer by drain,
+        in order and in batches"""
+        queue = PokerEventQueue(self.consumer, size = 100, batch = 8)
+        for index in xrange(20):
+            queue(1, "call", index, 10)
+        self.assertEqual(self.batches, [])
+        self.assertEqual(queue.drain(), 20)
+        self.assertEqual([len(batch) for batch in self.batches], [8, 8, 4])
+        self.assertEqual(self.events(), [(1, "call", index, 10) for index in xrange(20)])
+        self.assertEqual(queue.drain(), 0)
+        self.assertEqual(queue.stats()['dispatched'], 20)
+
+    def test02_Full(self):
+        """A full queue dispatches the queued events before the next one
+        when blocking, and drops it otherwise"""
+        queue = PokerEventQueue(self.consumer, size = 4, batch = 2)
+        for index in xrange(10):
+            queue(1, "check", index)
+        self.assertEqual(queue.stats()['waits'], 2)
+        queue.drain()
+        self.assertEqual(self.events(), [(1, "check", index) for index in xrange(10)])
+
+        self.batches = []
+        queue = PokerEventQueue(self.consumer, size = 4, block = False)
+        for index in xrange(10):
+            queue(1, "check", index)
+        queue.drain()
+        self.assertEqual(self.events(), [(1, "check", index) for index in xrange(4)])
+        self.assertEqual(queue.stats()['dropped'], 6)
+
+    def test03_Thread(self):
+        """A slow consumer in the thread of the queue gets all the events
+        of a table, in order"""
+        def slow(batch):
+            time.sleep(0.001)
+            self.batches.append(batch)
+        queue = PokerEventQueue(slow, size = 16, batch = 4)
+        queue.start()
+        simulator = PokerTableSimulator("holdem", "1-2_20-200_limit", [self.TestConfDirectory], players = 6, seed = 1)
+        game = simulator.game
+        events = []
+        game.registerCallback(lambda game_id, *args: events.append((game_id,) + args), ("call", "raise", "check", "fold"))
+        game.registerCallback(queue, ("call", "raise", "check", "fold"))
+        simulator.play(5)
+        queue.flush()
+        self.failUnless(len(events) > 16)
+        self.assertEqual(self.events(), events)
+        self.failIf([batch for batch in self.batches if len(batch) > 4])
+        queue.stop()
+        self.assertEqual(queue.thread, None)
+        self.assertEqual(queue.stats()['queued'], 0)
+
+    def test04_Error(self):
+        """A consumer raising does not stop the dispatch"""
+        def consumer(batch):
+            self.batches.append(batch)
+            if len(self.batches) == 1:
+                raise Exception("consumer failed")
+        queue = PokerEventQueue(consumer, batch = 1)
+        queue.start()
+        queue(1, "fold", 1, False)
+        queue(1, "fold", 2, False)
+        queue.stop()
+        self.assertEqual(self.events(), [(1, "fold", 1, False), (1, "fold", 2, False)])
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerEventQueueTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerEventQueueTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
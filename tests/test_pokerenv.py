@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+try:
+    import numpy
+    from pokerengine import pokerenv
+except ImportError:
+    # NumPy is not installed
+    pokerenv = None
+
+class PokerEnvTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def policy(self, rng, observations):
+        """Pick a legal action at random and raise the minimum."""
+        scores = rng.rand(*observations["mask"].shape) * observations["mask"]
+        return (scores.argmax(1), observations["min_raise"])
+
+    def play(self, env, steps):
+        rng = numpy.random.RandomState(1)
+        observations = env.reset()
+        trajectory = []
+        for i in xrange(steps):
+            (actions, amounts) = self.policy(rng, observations)
+            (observations, rewards, dones) = env.step(actions, amounts)
+            trajectory.append((observations, rewards, dones))
+        return trajectory
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Step(self):
+        """Test Poker Env : observations of the player in position and hands rewarded"""
+        env = pokerenv.PokerBatchEnv(4, dirs = [self.TestConfDirectory], players = 3)
+        observations = env.reset()
+        self.assertEqual(observations["mask"].shape, (4, len(pokerenv.ACTIONS)))
+        for (index, table) in enumerate(env.tables):
+            game = table.game
+            serial = game.getSerialInPosition()
+            self.assertEqual(observations["serial"][index], serial)
+            self.assertEqual(observations["mask"][index].tolist(), [action in game.possibleActions(serial) for action in pokerenv.ACTIONS])
+            self.assertEqual(observations["to_call"][index], game.betLimitsForSerial(serial)[2])
+            self.assertEqual(len([card for card in observations["pocket"][index] if card != 255]), 2)
+        #
+        # the observations of a step are not changed by the next ones
+        #
+        first = dict((field, array.copy()) for (field, array) in observations.iteritems())
+        (actions, amounts) = self.policy(numpy.random.RandomState(1), observations)
+        (next_observations, rewards, dones) = env.step(actions, amounts)
+        self.failIf(next_observations["serial"] is observations["serial"])
+        for (field, dtype, width) in pokerenv.OBSERVATION_FIELDS:
+            self.assertEqual(observations[field].tolist(), first[field].tolist())
+        hands = 0
+        for (observations, rewards, dones) in self.play(env, 200):
+            self.failUnless(observations["mask"].any(1).all())
+            self.assertEqual((rewards != 0).any(1).tolist(), [bool(done) and bool(reward.any()) for (done, reward) in zip(dones, rewards)])
+            hands += dones.sum()
+        self.failUnless(hands > 10)
+        self.assertEqual(env.stats()['illegal'], 0)
+        #
+        # an illegal action is replaced by check or fold
+        #
+        env.step(numpy.array([-1, -1, len(pokerenv.ACTIONS), -1]))
+        self.assertEqual(env.stats()['illegal'], 4)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Controlled(self):
+        """Test Poker Env : the seats that are not controlled are played by bots"""
+        env = pokerenv.PokerBatchEnv(3, dirs = [self.TestConfDirectory], players = 4, controlled = [2])
+        for (observations, rewards, dones) in self.play(env, 50):
+            self.assertEqual(observations["serial"].tolist(), [2, 2, 2])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Parallel(self):
+        """Test Poker Env : the tables spread over processes play the same hands"""
+        serial = self.play(pokerenv.PokerBatchEnv(5, dirs = [self.TestConfDirectory], players = 3), 40)
+        env = pokerenv.PokerParallelBatchEnv(5, processes = 2, dirs = [self.TestConfDirectory], players = 3)
+        try:
+            parallel = self.play(env, 40)
+            self.assertEqual(len(env), 5)
+            self.failUnless(env.stats()['hands'] > 0)
+        finally:
+            env.close()
+        for ((observations, rewards, dones), (other_observations, other_rewards, other_dones)) in zip(serial, parallel):
+            for (field, dtype, width) in pokerenv.OBSERVATION_FIELDS:
+                self.assertEqual(observations[field].tolist(), other_observations[field].tolist())
+            self.assertEqual(rewards.tolist(), other_rewards.tolist())
+            self.assertEqual(dones.tolist(), other_dones.tolist())
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    if pokerenv is not None:
+        suite.addTest(unittest.makeSuite(PokerEnvTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerEnvTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys, shutil, tempfile
+from os import path
+from itertools import combinations
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokerequity
+from pokerengine.pokercards import PokerCards
+from pokerengine.pokergame import PokerGameServer
+
+class PokerRankEval:
+    """Deterministic stand in for poker-eval: the ev only depends on
+    the number of pockets and on the ranks of the first one."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def poker_eval(self, game, pockets, board, fill_pockets, iterations):
+        self.calls += 1
+        return {'eval': [{'ev': 1000 / len(pockets) + sum([card % 13 for card in pockets[0]])}]}
+
+def string2card(strings):
+    return PokerCards(strings).tolist(True)
+
+def rank_ev(cards, opponents):
+    return 1000 / (opponents + 1) + sum([card % 13 for card in cards])
+
+class PokerEquityTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        pokerequity.EQUITY_TABLES.clear()
+        pokerequity.EQUITY_CACHE.clear()
+
+    def tearDown(self):
+        pokerequity.EQUITY_TABLES.clear()
+        pokerequity.EQUITY_CACHE.clear()
+        shutil.rmtree(self.directory)
+
+    def buildTable(self, max_opponents):
+        evaluator = PokerRankEval()
+        output = path.join(self.directory, "equity.holdem.bin")
+        self.assertEqual(pokerequity.build("holdem", output, iterations = 1, max_opponents = max_opponents, evaluator = evaluator), 169)
+        self.assertEqual(evaluator.calls, 169 * max_opponents)
+        return output
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Canonical(self):
+        """Test Poker Equity : pockets that only differ by suits share a class"""
+        self.assertEqual(len(pokerequity.pocket_classes(2)), 169)
+        self.assertEqual(pokerequity.canonical(string2card(['As', 'Ks'])), pokerequity.canonical(string2card(['Kh', 'Ah'])))
+        self.assertNotEqual(pokerequity.canonical(string2card(['As', 'Ks'])), pokerequity.canonical(string2card(['Ah', 'Ks'])))
+        self.assertEqual(pokerequity.canonical(string2card(['7c', '7d'])), pokerequity.canonical(string2card(['7s', '7h'])))
+        #
+        # the two cards shortcut gives the same class as the permutations
+        #
+        for pocket in combinations(xrange(52), 2):
+            expected = min([tuple(sorted([permutation[card / 13] * 13 + card % 13 for card in pocket])) for permutation in pokerequity.SUIT_PERMUTATIONS])
+            self.assertEqual(pokerequity.canonical(pocket), expected)
+        self.assertEqual(pokerequity.canonical(string2card(['As', 'Ks', '2d', '3h'])), pokerequity.canonical(string2card(['3s', '2c', 'Kh', 'Ah'])))
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Table(self):
+        """Test Poker Equity : build and read a table"""
+        table = pokerequity.PokerEquityTable(self.buildTable(3))
+        self.assertEqual((table.pocket_size, table.max_opponents), (2, 3))
+        for pocket in ((0, 1), (12, 25), (50, 51), (3, 29)):
+            for opponents in (1, 2, 3):
+                self.assertEqual(table.ev(pocket, opponents), rank_ev(pokerequity.canonical(pocket), opponents))
+        self.assertEqual(table.ev((0, 1), 4), None)
+        self.assertEqual(table.ev((0, 1), 0), None)
+        self.assertEqual(table.ev((0, 1, 2), 1), None)
+
+        invalid = path.join(self.directory, "invalid.bin")
+        open(invalid, "wb").write("XXXX" + "\0" * 8)
+        self.assertRaises(UserWarning, pokerequity.PokerEquityTable, invalid)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_HandEV(self):
+        """Test Poker Equity : handEV answers from the table before the flop"""
+        self.buildTable(9)
+        game = PokerGameServer("poker.%s.xml", [self.directory, self.TestConfDirectory])
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_limit")
+        for (serial, seat) in ((1, 2), (2, 7), (3, 5)):
+            self.failUnless(game.addPlayer(serial, seat))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+        game.beginTurn(1)
+        evaluator = PokerRankEval()
+        game.eval = evaluator
+
+        game.getPlayer(1).hand = PokerCards(['Ad', 'As'])
+        self.assertEqual(game.handEV(1, 10000), rank_ev(string2card(['Ad', 'As']), 2))
+        game.getPlayer(2).hand = PokerCards(['Kd', 'Ks'])
+        self.assertEqual(game.handEV(1, 10000, True), rank_ev(string2card(['Ad', 'As']), 2))
+        self.assertEqual(evaluator.calls, 0)
+        #
+        # the pocket of another player or the board is known
+        #
+        game.handEV(1, 10000)
+        self.assertEqual(evaluator.calls, 1)
+        game.board = PokerCards(['2c', '3c', '4s'])
+        game.handEV(1, 10000, True)
+        self.assertEqual(evaluator.calls, 2)
+        self.assertEqual(game.handEV(4, 10000), None)
+        #
+        # without a table the simulation is run
+        #
+        pokerequity.EQUITY_TABLES.clear()
+        game.dirs = [self.TestConfDirectory]
+        game.board = PokerCards()
+        game.handEV(1, 10000, True)
+        self.assertEqual(evaluator.calls, 3)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test04_Cache(self):
+        """Test Poker Equity : LRU cache of the evaluations"""
+        cache = pokerequity.PokerEquityCache(size = 2)
+        cache.set("a", [1])
+        cache.set("b", [2])
+        self.assertEqual(cache.get("a"), [1])
+        cache.set("c", [3])
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("c"), [3])
+        self.assertEqual(cache.stats(), {'size': 2, 'entries': 2, 'hits': 2, 'misses': 1, 'evictions': 1})
+        cache.resize(0)
+        cache.set("d", [4])
+        self.assertEqual(cache.stats()['entries'], 0)
+        #
+        # a permutation of the suits or the order of the cards do not
+        # change the key, the order of the pockets does
+        #
+        NOCARD = PokerCards.NOCARD
+        key = pokerequity.cache_key("holdem", [string2card(['Ah', 'Kh']), [NOCARD, NOCARD]], string2card(['2h', '3s', '4d']) + [NOCARD, NOCARD], 100)
+        self.assertEqual(pokerequity.cache_key("holdem", [string2card(['Ks', 'As']), [NOCARD, NOCARD]], string2card(['4c', '2s', '3d']) + [NOCARD, NOCARD], 100), key)
+        self.assertNotEqual(pokerequity.cache_key("holdem", [[NOCARD, NOCARD], string2card(['Ah', 'Kh'])], string2card(['2h', '3s', '4d']) + [NOCARD, NOCARD], 100), key)
+        self.assertNotEqual(pokerequity.cache_key("holdem", [string2card(['Ah', 'Kh']), [NOCARD, NOCARD]], string2card(['2h', '3s', '4d']) + [NOCARD, NOCARD], 0), key)
+        #
+        # ways to deal the unknown cards
+        #
+        self.assertEqual(pokerequity.outcomes([string2card(['Ah', 'Kh']), string2card(['2c', '2d'])], string2card(['2h', '3s', '4d', '5d']) + [NOCARD]), 44)
+        self.assertEqual(pokerequity.outcomes([string2card(['Ah', 'Kh']), [NOCARD, NOCARD]], string2card(['2h', '3s', '4d', '5d', '6d'])), 990)
+        self.assertEqual(pokerequity.outcomes([string2card(['Ah', 'Kh']), [NOCARD, NOCARD], [NOCARD, NOCARD]], [NOCARD] * 5), 1225 * 1128 * 1370754)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test05_HandEVCache(self):
+        """Test Poker Equity : handEV hits the cache and enumerates when few cards are left"""
+        game = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_limit")
+        for (serial, seat) in ((1, 2), (2, 7)):
+            self.failUnless(game.addPlayer(serial, seat))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+        game.beginTurn(1)
+        iterations = []
+        class PokerRecordEval(PokerRankEval):
+            def poker_eval(self, **kwargs):
+                iterations.append(kwargs['iterations'])
+                return PokerRankEval.poker_eval(self, **kwargs)
+        game.eval = PokerRecordEval()
+        pokerequity.EQUITY_CACHE.resetStats()
+
+        game.getPlayer(1).hand = PokerCards(['Ad', 'Kd'])
+        game.board = PokerCards(['2c', '3c', '4s'])
+        game.handEV(1, 500, True)
+        game.getPlayer(1).hand = PokerCards(['Ah', 'Kh'])
+        game.board = PokerCards(['2s', '3s', '4c'])
+        game.handEV(1, 500, True)
+        self.assertEqual(iterations, [500])
+        stats = pokerequity.EQUITY_CACHE.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        #
+        # 990 ways to deal the opponent pocket on the river
+        #
+        game.board = PokerCards(['2s', '3s', '4c', '8d', '9d'])
+        game.handEV(1, 500, True)
+        game.handEV(1, 1000, True)
+        self.assertEqual(iterations, [500, 500, 0])
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerEquityTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerEquityTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
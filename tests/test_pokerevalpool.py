@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokerevalpool, pokerequity
+from pokerengine.pokercards import PokerCards
+from pokerengine.pokergame import PokerGameServer
+
+class PokerEvalPoolTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.pool = pokerevalpool.PokerEvalPool(processes = 2, min_iterations = 100, min_chunk = 10, seed = 1)
+        pokerequity.EQUITY_CACHE.clear()
+
+    def tearDown(self):
+        self.pool.close()
+        pokerequity.EQUITY_CACHE.clear()
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Merge(self):
+        """Test Poker Eval Pool : chunks and merge of the results"""
+        self.assertEqual(pokerevalpool.split_iterations(10, 3), [4, 3, 3])
+        self.assertEqual(pokerevalpool.split_iterations(2, 2), [1, 1])
+        results = [
+            {'info': (300, 0, 1), 'eval': [{'ev': 600, 'winhi': 150, 'losehi': 150}, {'ev': 400, 'winhi': 150, 'losehi': 150}]},
+            {'info': (100, 0, 1), 'eval': [{'ev': 200, 'winhi': 20, 'losehi': 80}, {'ev': 800, 'winhi': 80, 'losehi': 20}]},
+        ]
+        self.assertEqual(pokerevalpool.merge_evals(results, [300, 100]), {
+            'info': (400, 0, 1),
+            'eval': [{'ev': 500, 'winhi': 170, 'losehi': 230}, {'ev': 500, 'winhi': 230, 'losehi': 170}],
+        })
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Pool(self):
+        """Test Poker Eval Pool : same result format as poker_eval"""
+        NOCARD = PokerCards.NOCARD
+        kwargs = {'game': 'holdem', 'pockets': [PokerCards(['Ad', 'As']).tolist(True), [NOCARD, NOCARD]], 'board': [NOCARD] * 5, 'fill_pockets': 1}
+        result = self.pool.poker_eval(iterations = 100, **kwargs)
+        self.assertEqual(result['info'][0], 100)
+        self.assertEqual(len(result['eval']), 2)
+        self.assertEqual(sorted(result['eval'][0].keys()), sorted(PokerGameServer("poker.%s.xml", [self.TestConfDirectory]).eval.poker_eval(iterations = 100, **kwargs)['eval'][0].keys()))
+        future = self.pool.poker_eval_async(then = lambda result: result['info'][0], iterations = 0, **kwargs)
+        self.assertEqual(future.get(), 0)
+        self.failUnless(future.ready())
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_HandEV(self):
+        """Test Poker Eval Pool : handEV and handEVAsync with a pool"""
+        game = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_limit")
+        for (serial, seat) in ((1, 2), (2, 7)):
+            self.failUnless(game.addPlayer(serial, seat))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+        game.beginTurn(1)
+        game.getPlayer(1).hand = PokerCards(['Ad', 'As'])
+        expected = game.handEV(1, 1000, True)
+        pokerequity.EQUITY_CACHE.clear()
+
+        game.eval_pool = self.pool
+        self.assertEqual(type(game.handEV(1, 1000, True)), type(expected))
+        pokerequity.EQUITY_CACHE.clear()
+        future = game.handEVAsync(1, 1000, True)
+        ev = future.get()
+        self.assertEqual(type(ev), type(expected))
+        #
+        # the result was cached: the future is ready at once
+        #
+        future = game.handEVAsync(1, 1000, True)
+        self.assertEqual(future.results, ())
+        self.assertEqual(future.get(), ev)
+        self.assertEqual(game.handEVAsync(3, 1000).get(), None)
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerEvalPoolTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerEvalPoolTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
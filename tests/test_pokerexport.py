@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys, shutil, tempfile
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+try:
+    from pokerengine import pokerexport
+except ImportError:
+    # NumPy is not installed
+    pokerexport = None
+
+from pokerengine import pokerhistory
+from pokerengine.pokergame import history2messages
+from pokerengine.pokersimulator import PokerTableSimulator
+
+class PokerExportTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def playHands(self, variant, betting_structure, hands):
+        self.simulator = PokerTableSimulator(variant, betting_structure, [self.TestConfDirectory], players = 4)
+        for i in xrange(hands):
+            self.simulator.play(1)
+            yield self.simulator.game.turn_history[:]
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Export(self):
+        """Test Poker Export : tables of the hands, actions, showdowns and players"""
+        histories = list(self.playHands("holdem", "1-2_20-200_limit", 20))
+        self.assertEqual(pokerexport.export(iter(histories), self.directory, chunk_size = 16), 20)
+        store = pokerexport.PokerHistoryStore(self.directory)
+
+        self.assertEqual(store.rowCount("hands"), 20)
+        self.assertEqual(store.column("hands", "hand_serial").tolist(), range(1, 21))
+        self.assertEqual(store.strings("hands", "variant"), ["holdem"])
+        self.assertEqual(store.column("hands", "board").shape, (20, pokerexport.BOARD_WIDTH))
+        #
+        # one row per player of each hand, the deltas are those of the
+        # showdown stack
+        #
+        self.assertEqual(store.rowCount("players"), 80)
+        for (history, delta) in zip(histories, store.column("players", "delta").reshape(20, 4)):
+            game_state = [event for event in history if event[0] == "end"][0][2][0]
+            self.assertEqual(delta.tolist(), [game_state['serial2delta'].get(serial, 0) for serial in sorted(history[0][9])])
+        #
+        # the actions are those reported by history2messages
+        #
+        actions = store.column("actions", "action")
+        names = store.strings("actions", "action")
+        messages = 0
+        for history in histories:
+            (subject, lines) = history2messages(self.simulator.game, history)
+            messages += len([line for line in lines if line.split(" ")[1] in ("pays", "calls", "raises", "checks", "folds", "is")])
+        self.assertEqual(len(actions), messages)
+        self.failUnless(set(names) <= set(pokerexport.ACTION_EVENTS))
+        self.failUnless(store.rowCount("showdowns") > 0)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Chunks(self):
+        """Test Poker Export : chunks are memory mapped and bounded"""
+        pokerexport.export(self.playHands("7stud", "10-20_100-2000000_ante-limit", 10), self.directory, chunk_size = 8)
+        store = pokerexport.PokerHistoryStore(self.directory)
+        chunks = list(store.chunks("actions", ["serial", "amount"]))
+        self.assertEqual(len(chunks), (store.rowCount("actions") + 7) / 8)
+        for chunk in chunks:
+            self.failUnless(len(chunk["amount"]) <= 8)
+            self.assertEqual(chunk["amount"].__class__.__name__, "memmap")
+        self.assertEqual(sum(len(chunk["serial"]) for chunk in chunks), store.rowCount("actions"))
+        self.assertEqual(store.column("players", "pocket").shape[1], pokerexport.POCKET_WIDTH)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Stream(self):
+        """Test Poker Export : export hands decoded from a turn history stream"""
+        histories = list(self.playHands("holdem", "1-2_20-200_limit", 5))
+        data = "".join([pokerhistory.dumps(history)[len(pokerhistory.HEADER):] for history in histories])
+        events = pokerhistory.loads(pokerhistory.HEADER + data)
+        self.assertEqual(list(pokerexport.split_hands(events)), histories)
+        self.assertEqual(pokerexport.export(pokerexport.split_hands(events), self.directory), 5)
+        store = pokerexport.PokerHistoryStore(self.directory)
+        self.assertEqual(store.column("hands", "hand_serial").tolist(), [history[0][2] for history in histories])
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    if pokerexport is not None:
+        suite.addTest(unittest.makeSuite(PokerExportTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerExportTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
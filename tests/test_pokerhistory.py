@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys, cPickle
+from os import path
+from cStringIO import StringIO
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokerhistory
+from pokerengine.pokercards import PokerCards
+from pokerengine.pokersimulator import PokerTableSimulator
+
+class PokerHistoryTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def playHands(self, variant, betting_structure, hands):
+        simulator = PokerTableSimulator(variant, betting_structure, [self.TestConfDirectory], players = 4)
+        histories = []
+        for i in xrange(hands):
+            simulator.play(1)
+            histories.append(simulator.game.turn_history[:])
+        return histories
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_RoundTrip(self):
+        """Test Poker History : the events of played hands are decoded as they were"""
+        for (variant, betting_structure) in (("holdem", "1-2_20-200_limit"), ("7stud", "10-20_100-2000000_ante-limit")):
+            for history in self.playHands(variant, betting_structure, 5):
+                self.assertEqual(pokerhistory.loads(pokerhistory.dumps(history)), history)
+                for event in history:
+                    self.assertNotEqual(ord(pokerhistory.encode_event(event)[0]), 0, event)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Fallback(self):
+        """Test Poker History : unknown events and unexpected values"""
+        cards = PokerCards([1, 2])
+        cards.cards.append(300)
+        for event in (
+            ('custom', 1.5, u'\xe9t\xe9', {'a': [1, (2, None)], 3: False}, 'player_list'),
+            ('call', -1, 2.5),
+            ('check',),
+            ('position', 0, 'serial'),
+            ('round', 'flop', cards, {}),
+            ('rake', 10, {1: 5L, 2: 10 ** 30}),
+        ):
+            self.assertEqual(pokerhistory.decode_event(pokerhistory.encode_event(event)), event)
+        self.assertEqual(ord(pokerhistory.encode_event(('call', -1, 2.5))[0]), 0)
+        self.assertEqual(ord(pokerhistory.encode_event(('rake', 10, {1: 5L, 2: 10 ** 30}))[0]), pokerhistory.EVENT2CODE['rake'])
+        #
+        # values are never pickled
+        #
+        self.assertRaises(ValueError, pokerhistory.encode_event, ('custom', object()))
+        self.assertRaises(ValueError, pokerhistory.encode_event, ('call', 3, set([1])))
+        self.assertRaises(ValueError, pokerhistory.read_value, "p" + chr(len("N.") << 1) + "N.", 0)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Integers(self):
+        """Test Poker History : varints"""
+        for value in (0, 1, -1, 63, -64, 64, 127, 128, -129, 2 ** 31, -2 ** 63, 10 ** 40):
+            out = []
+            pokerhistory.write_int(out, value)
+            data = "".join(out)
+            self.assertEqual(pokerhistory.read_int(data, 0), (value, len(data)))
+        self.assertEqual(pokerhistory.encode_event(('call', 3, 60)), "\x0d\x03\x78")
+
+    # -----------------------------------------------------------------------------------------------------
+    def test04_Streaming(self):
+        """Test Poker History : write and read records one at a time"""
+        history = self.playHands("holdem", "1-2_20-200_limit", 1)[0]
+        output = StringIO()
+        writer = pokerhistory.HistoryWriter(output)
+        for event in history:
+            writer.write(event)
+        data = output.getvalue()
+        self.assertEqual(data, pokerhistory.dumps(history))
+
+        reader = pokerhistory.HistoryReader()
+        events = []
+        for index in xrange(len(data)):
+            events.extend(reader.feed(data[index]))
+        self.failUnless(reader.isComplete())
+        self.assertEqual(events, history)
+
+        self.assertEqual(list(pokerhistory.HistoryReader(StringIO(data), chunk_size = 7)), history)
+        self.assertRaises(ValueError, list, pokerhistory.HistoryReader(StringIO(data[:-1])))
+        self.assertRaises(ValueError, pokerhistory.loads, data[:-1])
+        self.assertRaises(ValueError, pokerhistory.loads, "XYZ" + data[3:])
+        self.assertRaises(ValueError, pokerhistory.loads, pokerhistory.MAGIC + chr(pokerhistory.VERSION + 1))
+
+    # -----------------------------------------------------------------------------------------------------
+    def test05_Compact(self):
+        """Test Poker History : smaller than pickle"""
+        for history in self.playHands("holdem", "1-2_20-200_limit", 5):
+            self.failUnless(len(pokerhistory.dumps(history)) * 2 < len(cPickle.dumps(history, cPickle.HIGHEST_PROTOCOL)))
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerHistoryTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerHistoryTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -147,7 +147,21 @@ class PokerPlayerTestCase(unittest.TestCase):
                 self.failUnlessEqual(getattr(self.player,attribute), getattr(copy,attribute))
             except:
                 self.fail('Exception during accessing attribute ' + attribute)
-                
+
+    # -----------------------------------------------------------------------------------------------------
+    def testPokerPlayerCopyIndependent(self):
+        """Test Poker Player : Copy does not share the hand and keeps the bot player"""
+
+        player = pokergame.PokerPlayer(1, 'name', None, 'bot')
+        player.hand = pokercards.PokerCards([1, 2])
+        copy = player.copy()
+        self.failUnlessEqual(copy.botPlayer, 'bot')
+        self.failUnlessEqual(copy.hand, player.hand)
+        copy.hand.add(3, True)
+        self.failIfEqual(copy.hand, player.hand)
+        self.failIf(copy.log is player.log)
+        self.failUnless(copy.log is copy.log)
+
     # -----------------------------------------------------------------------------------------------------    
     def testPokerPlayerStringRepresentation(self):
         """Test Poker Player : String representation"""
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokerreplay
+from pokerengine.pokergame import PokerGameClient, PokerGameServer
+from pokerengine.pokersimulator import PokerTableSimulator
+
+class PokerReplayTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def generate(self, variant, betting_structure, hands, seed, players = 6):
+        """Play hands with a table of bots and return the table, the seats
+        of the players and the turn history of each hand."""
+        simulator = PokerTableSimulator(variant, betting_structure, [self.TestConfDirectory], players = players, seed = seed)
+        game = simulator.game
+        game.log_debug = False
+        seats = [(player.serial, player.seat, player.money) for player in game.playersAll()]
+        histories = []
+        for hand in xrange(hands):
+            simulator.play(1)
+            histories.append(game.turn_history)
+        return (game, seats, histories)
+
+    def createClient(self, variant, betting_structure, seats, players = 6):
+        game = PokerGameClient("poker.%s.xml", [self.TestConfDirectory])
+        game.log_debug = False
+        game.setVariant(variant)
+        game.setBettingStructure(betting_structure)
+        game.setMaxPlayers(players)
+        for (serial, seat, money) in seats:
+            self.failUnless(game.addPlayer(serial, seat))
+            player = game.getPlayer(serial)
+            player.money = money
+            player.buy_in_payed = True
+            self.failUnless(game.sit(serial))
+        return game
+
+    def state(self, game):
+        return (
+            dict([(player.serial, (player.money, player.sit_out, player.wait_for, player.fold, player.hand.cards)) for player in game.playersAll()]),
+            game.state, game.win_condition, game.hand_serial, game.hands_count, game.dealer_seat,
+            game.player_list, game.board.cards, game.pot, game.side_pots, game.raked_amount,
+            game.winners, game.side2winners, game.serial2best, game.showdown_stack, game.stats,
+            game.turn_history,
+        )
+
+    def test01_Replay(self):
+        """A game rebuilt from the histories is in the state of the
+        server game"""
+        for (variant, betting_structure, seed) in (
+            ("holdem", "1-2_20-200_limit", 1),
+            ("holdem", "1-2_20-200_no-limit", 2),
+            ("holdem", "1-2_20-200_pot-limit", 3),
+        ):
+            (server, seats, histories) = self.generate(variant, betting_structure, 40, seed)
+            for trusted in (False, True):
+                game = self.createClient(variant, betting_structure, seats)
+                hands = 0
+                for replayed in pokerreplay.replay_histories(game, histories, trusted = trusted):
+                    self.assertEqual(replayed.turn_history, histories[hands])
+                    hands += 1
+                self.assertEqual(hands, len(histories))
+                self.assertEqual(self.state(game), self.state(server), "%s %s trusted = %s" % (variant, betting_structure, trusted))
+
+    def test02_Trusted(self):
+        """A trusted replay ends each hand in the state of a replay that
+        is not trusted"""
+        for (variant, betting_structure, seed, players) in (
+            ("holdem", "1-2_20-200_no-limit", 7, 6),
+            ("omaha8", "1-2_20-200_limit", 4, 6),
+            ("7stud", "10-20_100-2000000_ante-limit", 5, 7),
+        ):
+            (server, seats, histories) = self.generate(variant, betting_structure, 40, seed, players = players)
+            standard = self.createClient(variant, betting_structure, seats, players = players)
+            trusted = self.createClient(variant, betting_structure, seats, players = players)
+            events = []
+            standard.registerCallback(lambda game_id, event, *args: events.append(event))
+            trusted.registerCallback(lambda game_id, event, *args: self.fail("callback run by a trusted replay"))
+            for history in histories:
+                pokerreplay.replay(standard, history)
+                pokerreplay.replay(trusted, history, trusted = True)
+                self.assertEqual(self.state(trusted), self.state(standard), "%s hand %d" % (variant, trusted.hand_serial))
+            self.failUnless(events)
+            self.failIf(trusted.trusted)
+            self.failIf(trusted.log_debug)
+
+    def test03_Unknown(self):
+        """An event that cannot be replayed raises and the game is no
+        longer trusted"""
+        (server, seats, histories) = self.generate("holdem", "1-2_20-200_limit", 1, 1)
+        game = self.createClient("holdem", "1-2_20-200_limit", seats)
+        game.log_debug = True
+        history = histories[0][:3] + [("unknown",)]
+        self.assertRaises(UserWarning, pokerreplay.replay, game, history, True)
+        self.failIf(game.trusted)
+        self.failUnless(game.log_debug)
+
+    def test04_Canceled(self):
+        """A hand canceled because a player sits out during the blind
+        round is replayed, as is the buy out of that player"""
+        server = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        server.log_debug = False
+        server.setVariant("holdem")
+        server.setBettingStructure("1-2_20-200_limit")
+        server.setMaxPlayers(6)
+        for serial in (1, 2):
+            self.failUnless(server.addPlayer(serial))
+            self.failUnless(server.payBuyIn(serial, server.bestBuyIn()))
+            self.failUnless(server.sit(serial))
+        seats = [(player.serial, player.seat, player.money) for player in server.playersAll()]
+        server.beginTurn(1)
+        server.blind(server.getSerialInPosition())
+        serial = server.getSerialInPosition()
+        server.sitOut(serial)
+        server.receiveBuyOut(serial)
+        history = server.turn_history
+        self.assertEqual([event[0] for event in history[-3:]], ["canceled", "position", "buyOut"])
+        for trusted in (False, True):
+            game = self.createClient("holdem", "1-2_20-200_limit", seats)
+            pokerreplay.replay(game, history, trusted = trusted)
+            self.assertEqual(self.state(game), self.state(server), "trusted = %s" % trusted)
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerReplayTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerReplayTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
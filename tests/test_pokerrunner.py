@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+try:
+    import trollius
+    from trollius import From
+    from pokerengine import pokerrunner
+except ImportError:
+    # trollius is not installed
+    pokerrunner = None
+
+from pokerengine.pokergame import PokerGameServer
+
+@unittest.skipIf(pokerrunner is None, "trollius is not installed")
+class PokerTableRunnerTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def setUp(self):
+        self.loop = trollius.new_event_loop()
+        self.runner = pokerrunner.PokerTableRunner(loop = self.loop, timeout = 0.05, delay = 0.01)
+
+    def tearDown(self):
+        self.runner.close()
+        self.loop.close()
+
+    def createGame(self, id, players = 3):
+        game = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        game.id = id
+        game.log_debug = False
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_limit")
+        for serial in xrange(1, players + 1):
+            self.failUnless(game.addPlayer(serial))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+            game.autoBlindAnte(serial)
+        return game
+
+    def complete(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test01_Play(self):
+        """The actions of the players are coroutines and the next hand is
+        dealt once a hand is over"""
+        runner = self.runner
+        game = self.createGame(1)
+        runner.add(game)
+        self.assertEqual(game.state, "null")
+        serial = self.complete(runner.waitTurn(1))
+        self.assertEqual(game.state, "pre-flop")
+        self.assertEqual(serial, game.getSerialInPosition())
+        hand_serial = game.hand_serial
+        #
+        # only the player in position can act
+        #
+        other = [s for s in game.serialsInGame() if s != serial][0]
+        self.failIf(self.complete(runner.act(1, other, "fold")))
+        self.failIf(self.complete(runner.act(1, serial, "jump")))
+        self.failUnless(self.complete(runner.act(1, serial, "fold")))
+        serial = self.complete(runner.waitTurn(1))
+        self.failUnless(self.complete(runner.act(1, serial, "fold")))
+        self.failUnless(game.isEndOrNull())
+        #
+        # the next hand is dealt after the delay
+        #
+        serial = self.complete(runner.waitTurn(1))
+        self.assertEqual(game.hand_serial, hand_serial + 1)
+        self.failUnless(game.isRunning())
+        self.assertEqual(runner.stats()['hands'], 2)
+        self.assertEqual(runner.stats()['actions'], 2)
+
+    def test02_Timeout(self):
+        """A player who does not act in time is played automatically and
+        sits out at the end of the hand"""
+        runner = self.runner
+        game = self.createGame(1)
+        runner.add(game)
+        serial = self.complete(runner.waitTurn(1))
+        hand_serial = game.hand_serial
+        self.complete(runner.waitTurn(1, [s for s in game.serialsInGame() if s != serial][0]))
+        self.assertEqual(runner.stats()['timeouts'], 1)
+        self.failUnless(game.getPlayer(serial).isAuto())
+        self.failUnless(game.getPlayer(serial).sit_out_next_turn or game.isSitOut(serial))
+        #
+        # nobody acts: all the players time out and the hand ends
+        #
+        @trollius.coroutine
+        def ended():
+            while not game.isEndOrNull():
+                yield From(trollius.sleep(0.01, loop = self.loop))
+        self.complete(trollius.wait_for(ended(), 2, loop = self.loop))
+        self.failUnless(game.hand_serial == hand_serial)
+        self.failUnless(game.isSitOut(serial))
+        #
+        # the player comes back
+        #
+        self.failUnless(self.complete(runner.sit(1, serial)))
+        self.failIf(game.getPlayer(serial).isAuto())
+        self.failIf(game.isSitOut(serial))
+
+    def test03_Tables(self):
+        """Clients play many tables concurrently on the loop"""
+        runner = self.runner
+        runner.timeout = 5
+        for game_id in xrange(1, 21):
+            runner.add(self.createGame(game_id, players = 4))
+        @trollius.coroutine
+        def client(game_id, hands):
+            game = runner.tables[game_id].game
+            while True:
+                serial = yield From(runner.waitTurn(game_id))
+                if game.hand_serial > hands:
+                    break
+                yield From(trollius.sleep(0.001, loop = self.loop))
+                action = "check" if "check" in game.possibleActions(serial) else "call"
+                played = yield From(runner.act(game_id, serial, action))
+                self.failUnless(played)
+        self.complete(trollius.wait_for(trollius.gather(*[client(game_id, 60) for game_id in xrange(1, 21)], loop = self.loop), 60, loop = self.loop))
+        self.assertEqual(runner.stats()['timeouts'], 0)
+        self.failUnless(runner.stats()['hands'] > 60)
+        self.assertEqual(len(set([table.game.hand_serial for table in runner.tables.values()])), 20)
+        runner.remove(1)
+        self.assertEqual(runner.stats()['tables'], 19)
+
+    def test04_HandSerials(self):
+        """The hand serials follow those of the game and are not dealt
+        twice by the runners sharing them"""
+        game = self.createGame(1)
+        game.beginTurn(41)
+        while not game.isEndOrNull():
+            game.fold(game.getSerialInPosition())
+        self.runner.add(game)
+        other = pokerrunner.PokerTableRunner(loop = self.loop, delay = 0.01, hand_serials = self.runner.nextHandSerial)
+        try:
+            other.add(self.createGame(2))
+            self.complete(self.runner.waitTurn(1))
+            self.complete(other.waitTurn(2))
+            self.assertEqual(sorted([game.hand_serial, other.tables[2].game.hand_serial]), [42, 43])
+        finally:
+            other.close()
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    if pokerrunner is not None:
+        suite.addTest(unittest.makeSuite(PokerTableRunnerTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerTableRunnerTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokersimulator
+
+class PokerSimulatorTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Latency(self):
+        """Test Poker Simulator : latency histogram"""
+        histogram = {}
+        for i in xrange(1, 101):
+            pokersimulator.latency_add(histogram, i / 1000000.0 + 1e-9)
+        self.assertEqual(pokersimulator.latency_percentile(histogram, 50), 50 / 1000000.0)
+        self.assertEqual(pokersimulator.latency_percentile(histogram, 100), 100 / 1000000.0)
+        pokersimulator.latency_merge(histogram, {1: 100})
+        self.assertEqual(pokersimulator.latency_percentile(histogram, 50), 1 / 1000000.0)
+        self.assertEqual(pokersimulator.latency_percentile({}, 50), 0.0)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Simulate(self):
+        """Test Poker Simulator : play hands on several tables"""
+        results = pokersimulator.simulate('holdem', '1-2_20-200_limit', [self.TestConfDirectory], tables = 2, hands = 5, players = 3)
+        self.assertEqual(results['hands'], 10)
+        self.failUnless(results['actions'] >= 20)
+        self.assertEqual(sum(results['latencies'].values()), results['actions'])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Configurations(self):
+        """Test Poker Simulator : variant and betting structure pairs"""
+        configurations = pokersimulator.configurations([self.TestConfDirectory])
+        self.failUnless(('holdem', '1-2_20-200_limit') in configurations)
+        self.failUnless(('7stud', '10-20_100-2000000_ante-limit') in configurations)
+        self.failIf(('levels-blinds', '1-2_20-200_limit') in configurations)
+        self.failIf(('holdem', 'levels-blinds') in configurations)
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerSimulatorTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerSimulatorTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
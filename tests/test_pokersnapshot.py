@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokersnapshot
+from pokerengine.pokergame import PokerGameServer
+
+class PokerSnapshotTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, '../conf')
+
+    def createGame(self, players = 4, seed = 1):
+        game = PokerGameServer("poker.%s.xml", [self.TestConfDirectory])
+        game.setVariant("holdem")
+        game.setBettingStructure("1-2_20-200_no-limit")
+        game.shuffler.seed(seed)
+        for serial in xrange(1, players + 1):
+            self.failUnless(game.addPlayer(serial, serial * 2 - 1))
+            self.failUnless(game.payBuyIn(serial, game.bestBuyIn()))
+            self.failUnless(game.sit(serial))
+            game.autoBlindAnte(serial)
+        return game
+
+    def play(self, game, count):
+        """Play count actions with a deterministic policy, dealing a new
+        hand when the current one ends."""
+        for k in xrange(count):
+            if game.isEndOrNull():
+                game.beginTurn(game.hand_serial + 1)
+                continue
+            serial = game.getSerialInPosition()
+            (min_raise, max_raise, to_call) = game.betLimitsForSerial(serial)
+            if k % 3 == 0 and not to_call and "raise" in game.possibleActions(serial):
+                game.callNraise(serial, min_raise)
+            elif to_call:
+                game.call(serial)
+            else:
+                game.check(serial)
+
+    def assertSameGame(self, a, b):
+        for name in ("state", "position", "pot", "side_pots", "current_round", "hand_serial", "player_list", "dealer"):
+            self.assertEqual(getattr(a, name), getattr(b, name), name)
+        self.assertEqual(a.board.cards, b.board.cards)
+        self.assertEqual(a.moneyMap(), b.moneyMap())
+        self.assertEqual(a.turn_history, b.turn_history)
+        for serial in a.serial2player:
+            (x, y) = (a.getPlayer(serial), b.getPlayer(serial))
+            self.assertEqual((x.hand.cards, x.bet, x.fold, x.all_in, x.seat), (y.hand.cards, y.bet, y.fold, y.all_in, y.seat))
+        if a.isRunning():
+            self.assertEqual(a.getSerialInPosition(), b.getSerialInPosition())
+            self.assertEqual(a.betLimitsForSerial(a.getSerialInPosition()), b.betLimitsForSerial(b.getSerialInPosition()))
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_RoundTrip(self):
+        """Test Poker Snapshot : a game restored in the middle of a hand plays on as the original"""
+        for actions in (0, 3, 7, 12):
+            game = self.createGame()
+            game.beginTurn(1)
+            self.play(game, actions)
+            restored = pokersnapshot.loads(pokersnapshot.dumps(game, shuffler = True))
+            self.failIf(restored is game)
+            self.assertSameGame(game, restored)
+            #
+            # same actions into the next hands, dealt from the restored shuffler
+            #
+            self.play(game, 40)
+            self.play(restored, 40)
+            self.failUnless(game.hand_serial > 1)
+            self.assertSameGame(game, restored)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Header(self):
+        """Test Poker Snapshot : a snapshot with an unknown header is refused"""
+        data = pokersnapshot.dumps(self.createGame())
+        self.assertEqual(data[:len(pokersnapshot.HEADER)], pokersnapshot.HEADER)
+        self.assertRaises(ValueError, pokersnapshot.loads, "XXX" + data[3:])
+        newer = pokersnapshot.MAGIC + chr(pokersnapshot.VERSION + 1) + data[len(pokersnapshot.HEADER):]
+        self.assertRaises(ValueError, pokersnapshot.loads, newer)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Standby(self):
+        """Test Poker Snapshot : restoring into an existing game keeps its callbacks and bots"""
+        game = self.createGame()
+        game.beginTurn(1)
+        self.play(game, 2)
+        standby = self.createGame(players = 2, seed = 2)
+        bot = object()
+        standby.getPlayer(2).botPlayer = bot
+        events = []
+        standby.registerCallback(lambda game, event, *args: events.append(event))
+        self.failUnless(pokersnapshot.loads(pokersnapshot.dumps(game), standby) is standby)
+        self.assertSameGame(game, standby)
+        self.assertEqual(sorted(standby.serialsAll()), [1, 2, 3, 4])
+        self.failUnless(standby.getPlayer(2).botPlayer is bot)
+        self.assertEqual(standby.getPlayer(3).botPlayer, None)
+        serial = standby.getSerialInPosition()
+        standby.call(serial)
+        self.failUnless(events)
+        self.assertEqual(standby.getPlayer(serial).bet, standby.highestBetNotFold())
+
+    # -----------------------------------------------------------------------------------------------------
+    def test04_PlainStrings(self):
+        """Test Poker Snapshot : the strings of the templates are saved as plain strings"""
+        game = self.createGame()
+        game.beginTurn(1)
+        self.play(game, 8)
+        data = pokersnapshot.dumps(game)
+        self.failUnless(len(data) < 4096)
+        self.failIf("lxml" in data)
+        restored = pokersnapshot.loads(data)
+        for event in restored.turn_history:
+            for value in event:
+                if isinstance(value, str):
+                    self.assertEqual(type(value), str)
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerSnapshotTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerSnapshotTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
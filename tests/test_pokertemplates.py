@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+import shutil
+import tempfile
+from os import path
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine import pokertemplates
+from pokerengine.pokergame import PokerGameServer
+
+class PokerTemplatesTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, 'test-data/conf')
+
+    # -----------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        shutil.copyfile(path.join(self.TestConfDirectory, 'unittest.variant.template.xml'), path.join(self.tmpdir, 'unittest.variant.xml'))
+        shutil.copyfile(path.join(self.TestConfDirectory, 'unittest.config.template.xml'), path.join(self.tmpdir, 'unittest.config.xml'))
+
+    # -----------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    # -----------------------------------------------------------------------------------------------------
+    def createGame(self):
+        game = PokerGameServer("unittest.%s.xml", [self.tmpdir])
+        game.setVariant("variant")
+        game.setBettingStructure("config")
+        return game
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Shared(self):
+        """Test Poker Templates : games share the compiled files"""
+        game1 = self.createGame()
+        game2 = self.createGame()
+        self.assertEqual(game1.getVariantName(), "VariantName")
+        self.assertEqual(game1.getBettingStructureName(), "Bet Description")
+        self.failUnless(game1.round_info_backup is game2.round_info_backup)
+        self.failUnless(game1.bet_info is game2.bet_info)
+        self.assertEqual(game1.bet_info[0]["cap"], "3")
+        self.assertEqual(game1.bet_info[1]["cap"], str(sys.maxint))
+        self.assertEqual(game1.bet_info[2]["cap"], str(sys.maxint))
+        self.assertEqual(game1.getMaxHandSize(), 2)
+        self.assertEqual(game1.getMaxBoardSize(), 5)
+        self.assertEqual(game1.getParam("/poker/variant/@id"), "VariantTest")
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_Isolation(self):
+        """Test Poker Templates : a game does not modify the shared round and blind informations"""
+        game1 = self.createGame()
+        game2 = self.createGame()
+        game1.round_info[0]["cards"].append("up")
+        game1.round_info[0]["name"] = "changed"
+        game1.blind_info["small"] = 1
+        self.assertEqual(game2.round_info[0]["cards"], ["down", "down"])
+        self.assertEqual(game2.round_info[0]["name"], "pre-flop")
+        self.assertEqual(game2.blind_info["small"], 500)
+        game1.resetRoundInfo()
+        self.assertEqual(game1.round_info[0]["cards"], ["down", "down"])
+        self.assertEqual(game1.round_info[0]["name"], "pre-flop")
+
+    # -----------------------------------------------------------------------------------------------------
+    def test03_Reload(self):
+        """Test Poker Templates : a file is not read again until the templates are reloaded"""
+        game = self.createGame()
+        template = pokertemplates.get_variant([self.tmpdir], "unittest.variant.xml", "variant")
+        variant_file = path.join(self.tmpdir, 'unittest.variant.xml')
+        content = open(variant_file).read()
+        open(variant_file, 'w').write(content.replace('name="VariantName"', 'name="OtherName"'))
+        game.setVariant("variant")
+        self.assertEqual(game.getVariantName(), "VariantName")
+        pokertemplates.reload()
+        game.setVariant("variant")
+        self.assertEqual(game.getVariantName(), "OtherName")
+        self.failIf(pokertemplates.get_variant([self.tmpdir], "unittest.variant.xml", "variant") is template)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test04_NotFound(self):
+        """Test Poker Templates : a missing file raises unless a previous template is given"""
+        self.assertRaises(Exception, pokertemplates.get_variant, [self.tmpdir], "unittest.missing.xml", "missing")
+        previous = pokertemplates.get_variant([self.tmpdir], "unittest.variant.xml", "variant")
+        self.failUnless(pokertemplates.get_variant([self.tmpdir], "unittest.missing.xml", "missing", previous) is previous)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test05_BetLimits(self):
+        """Test Poker Templates : the limits of each round are compiled once"""
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "fixed": "20", "cap": "3"})
+        self.assertEqual((limit.min_rule, limit.min_bet, limit.max_bet, limit.cap), (pokertemplates.BET_LIMIT_VALUE, 20, None, 3))
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "min": "big", "max": "pot", "cap": str(sys.maxint)})
+        self.assertEqual((limit.min_rule, limit.max_bet, limit.cap), (pokertemplates.BET_LIMIT_BIG, "pot", sys.maxint))
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "min": "5", "max": "100", "cap": "3"})
+        self.assertEqual((limit.min_bet, limit.max_bet), (5, 100))
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "min_pow_level": "10", "cap": "3"})
+        self.assertEqual((limit.min_rule, limit.max_bet), (pokertemplates.BET_LIMIT_POW_LEVEL, "money"))
+        self.assertEqual([limit.minBetOfLevel(level) for level in (1, 2, 3)], [10, 20, 40])
+        self.assertEqual(limit.level2min_bet, {1: 10, 2: 20, 3: 40})
+        #
+        # placeholders are only an error when the limits are used
+        #
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "fixed": "_BIGBET_", "cap": "3"})
+        self.assertEqual(limit.min_rule, None)
+        self.failUnless("_BIGBET_" in limit.error)
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "fixed": "20", "cap": "_CAP_"})
+        self.assertEqual(limit.min_rule, None)
+        self.failUnless("_CAP_" in limit.error)
+        limit = pokertemplates.PokerBetLimit({"name": "flop", "fixed": "20", "cap": "-1"})
+        self.assertEqual((limit.cap, limit.error), (sys.maxint, None))
+
+        game = self.createGame()
+        self.failUnless(game.bet_limits is self.createGame().bet_limits)
+        self.assertEqual([limit.cap for limit in game.bet_limits], [3, sys.maxint, sys.maxint, 3])
+
+    # -----------------------------------------------------------------------------------------------------
+    def test06_NoRead(self):
+        """Test Poker Templates : a game using a compiled file does not access the disk"""
+        self.createGame()
+        shutil.rmtree(self.tmpdir)
+        game = self.createGame()
+        self.assertEqual(game.getVariantName(), "VariantName")
+        self.assertEqual(game.getBettingStructureName(), "Bet Description")
+        pokertemplates.reload()
+        self.assertRaises(Exception, self.createGame)
+        self.tmpdir = tempfile.mkdtemp()
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerTemplatesTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerTemplatesTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+import unittest, sys
+from os import path
+from random import Random
+
+TESTS_PATH = path.dirname(path.realpath(__file__))
+sys.path.insert(0, path.join(TESTS_PATH, ".."))
+
+from pokerengine.pokergame import PokerGameServer
+
+#
+# The implementation of PokerGame.__makeSidePots that looped over
+# the contributors for each player who is all-in, kept to check that
+# the single sweep implementation builds the same side pots.
+#
+def reference_make_side_pots(game):
+    amount_index = 0
+    total_index = 1
+    last_pot_index = -1
+    round_contributions = game.side_pots['contributions'][game.current_round]
+    pots = game.side_pots['pots']
+    pots[last_pot_index][amount_index] += game.side_pots['building']  # amount
+    pots[last_pot_index][total_index] += game.side_pots['building']  # total
+    game.side_pots['building'] = 0
+    current_pot_index = len(pots) - 1
+    if not round_contributions:
+        return
+
+    serials_by_contribution = round_contributions[len(pots) - 1].items()[:]
+    serials_by_contribution.sort(key=lambda s: s[1], reverse=True)
+    max_contribution_not_fold = 0
+
+    for serial, contribution in serials_by_contribution:
+        if not game.getPlayer(serial).isFold():
+            max_contribution_not_fold = contribution
+            break
+    else:
+        # for: ... else
+        raise UserWarning("every user is fold")
+
+    def filterPlayers(player):
+        if player.side_pot_index == current_pot_index:
+            if not player.isAllIn():
+                if max_contribution_not_fold != serials_by_contribution[0][1] and round_contributions[len(pots) - 1].get(player.serial,0) >= max_contribution_not_fold:
+                    return True
+                return False
+            return True
+        return False
+
+    players = filter(filterPlayers, game.playersAll())
+
+    if not players:
+        return
+    # we need to sort by the pot contribution amount
+    # it is possible that someone folded a blind but the big blind is allready all in
+    # because of this, it is possible that the person who is all in didn't contributet the most money
+    # so we need to check also all players.
+    players.sort(key=lambda player: round_contributions[len(pots) - 1].get(player.serial,0))
+    for player in players:
+        pot_contributions = round_contributions[len(pots) - 1]
+        if player.serial not in pot_contributions:
+            continue
+        if len(pot_contributions) == 1:
+            #
+            # This may happen when a player goes all in and
+            # has more chips than all other players
+            #
+            break
+        new_pot_contributions = {}
+        pot = pots[last_pot_index]
+        new_pot = [0, 0]
+        new_pot_index = len(pots)
+        contribution = pot_contributions[player.serial]
+        for serial in pot_contributions.keys():
+            other_contribution = pot_contributions[serial]
+            pot_contributions[serial] = min(contribution, other_contribution)
+            remainder = other_contribution - pot_contributions[serial]
+            pot[amount_index] -= remainder
+            pot[total_index] -= remainder
+            other_player = game.getPlayer(serial)
+            if other_contribution > contribution:
+                new_pot_contributions[serial] = remainder
+                new_pot[amount_index] += remainder
+                other_player.side_pot_index = new_pot_index
+            elif (other_contribution == contribution and
+                   not other_player.isAllIn()):
+                other_player.side_pot_index = new_pot_index
+        round_contributions[new_pot_index] = new_pot_contributions
+        new_pot[total_index] = new_pot[amount_index] + pot[total_index]
+        pots.append(new_pot)
+
+def create_game(conf, count):
+    game = PokerGameServer("poker.%s.xml", [conf])
+    game.setMaxPlayers(count)
+    for serial in xrange(1, count + 1):
+        game.addPlayer(serial)
+    game.player_list = game.serial2player.keys()
+    return game
+
+CONTRIBUTIONS = (0, 10, 20, 30, 50, 80, 100, 150, 200, 400)
+
+def random_table(seed, conf):
+    """Return a game at the end of a betting round, in a state drawn
+    from seed: players who went all-in in a previous round, players
+    who are all-in, folded or still in game with contributions drawn
+    from a few values so that they often tie."""
+    rng = Random(seed)
+    game = create_game(conf, rng.randint(2, 10))
+    game.current_round = rng.randint(0, 3)
+    pots = [[amount, 0] for amount in [rng.choice(CONTRIBUTIONS[1:]) * 2 for index in xrange(rng.randint(0, 2))]]
+    total = 0
+    for pot in pots:
+        total += pot[0]
+        pot[1] = total
+    pots.append([0, total])
+    current_pot_index = len(pots) - 1
+    pot_contributions = {}
+    for player in game.playersAll():
+        if current_pot_index > 0 and rng.random() < 0.2:
+            player.side_pot_index = rng.randint(0, current_pot_index - 1)
+            player.all_in = True
+            continue
+        player.side_pot_index = current_pot_index
+        state = rng.random()
+        if state < 0.3:
+            player.all_in = True
+        elif state < 0.5:
+            player.fold = True
+        if rng.random() < 0.9:
+            pot_contributions[player.serial] = rng.choice(CONTRIBUTIONS)
+    round_contributions = {current_pot_index: pot_contributions} if pot_contributions else {}
+    game.side_pots = {
+        'contributions': {'total': dict(pot_contributions), game.current_round: round_contributions},
+        'pots': pots,
+        'building': sum(pot_contributions.values()),
+        'last_round': game.current_round,
+    }
+    return game
+
+def make_side_pots(function, game):
+    try:
+        function(game)
+        error = None
+    except UserWarning, e:
+        error = str(e)
+    return (error, game.side_pots, dict((player.serial, player.side_pot_index) for player in game.playersAll()))
+
+class PokerSidePotsTestCase(unittest.TestCase):
+
+    TestConfDirectory = path.join(TESTS_PATH, 'test-data/conf')
+
+    # -----------------------------------------------------------------------------------------------------
+    def test01_Differential(self):
+        """Test Poker Side Pots : the single sweep builds the same pots as the reference"""
+        splits = 0
+        for seed in xrange(2000):
+            expected = make_side_pots(reference_make_side_pots, random_table(seed, self.TestConfDirectory))
+            result = make_side_pots(lambda game: game._PokerGame__makeSidePots(), random_table(seed, self.TestConfDirectory))
+            self.assertEqual(result, expected, "seed %d" % seed)
+            if len(result[1]['pots']) > 2:
+                splits += 1
+        #
+        # the scenarios do split pots
+        #
+        self.failUnless(splits > 300)
+
+    # -----------------------------------------------------------------------------------------------------
+    def test02_FoldAbove(self):
+        """Test Poker Side Pots : the money of a player who folded above the others goes to a side pot"""
+        game = create_game(self.TestConfDirectory, 3)
+        game.getPlayer(1).fold = True
+        game.side_pots = {
+            'contributions': {'total': {1: 300, 2: 100, 3: 100}, 0: {0: {1: 300, 2: 100, 3: 100}}},
+            'pots': [[0, 0]],
+            'building': 500,
+            'last_round': 0,
+        }
+        game.current_round = 0
+        game._PokerGame__makeSidePots()
+        self.assertEqual(game.side_pots['pots'], [[300, 300], [200, 500]])
+        self.assertEqual(game.side_pots['contributions'][0], {0: {1: 100, 2: 100, 3: 100}, 1: {1: 200}})
+        self.assertEqual([game.getPlayer(serial).side_pot_index for serial in (1, 2, 3)], [1, 1, 1])
+
+# -----------------------------------------------------------------------------------------------------
+def GetTestSuite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(PokerSidePotsTestCase))
+    # Comment out above and use line below this when you wish to run just
+    # one test by itself (changing prefix as needed).
+#    suite.addTest(unittest.makeSuite(PokerSidePotsTestCase, prefix = "test2"))
+    return suite
+
+# -----------------------------------------------------------------------------------------------------
+def run():
+    return unittest.TextTestRunner().run(GetTestSuite())
+
+# -----------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    if run().wasSuccessful():
+        sys.exit(0)
+    else:
+        sys.exit(1)